@@ -10,6 +10,9 @@ from db import get_conn,get_db_connection
 from utils_main import getAdvert, getSolution
 
 from data_dictionary import data_dictionary_bp
+from data_dictionary.ai_service_new import OLLAMA_CONFIG, configure_debug_logging
+from llm.client import warmup_in_background, host_of
+from data_dictionary.write_behind import get_write_behind
 
 # --- Basic App Setup ---
 BASE_DIR = Path(__file__).parent
@@ -19,6 +22,14 @@ app = Flask(__name__,
 app.secret_key = "SECRET_KEY"
 
 app.register_blueprint(data_dictionary_bp, url_prefix='/dictionary')
+configure_debug_logging()
+
+# Persist descriptions, mappings and quality rows off the request path
+get_write_behind().start(app)
+
+# Load the description model in the background so the first dictionary job
+# doesn't pay Ollama's cold-load time
+warmup_in_background(OLLAMA_CONFIG['model'], host_of(OLLAMA_CONFIG['url']))
 
 
 # --- Encryption Key (Required to read the files) ---
@@ -1,5 +1,10 @@
-from flask import Blueprint
+import importlib
 
-from .routes import data_dictionary_bp
 
-from . import routes
+def __getattr__(name):
+    # The blueprint (and pyodbc behind its routes) loads on first use, so the
+    # harmonizer can import data_dictionary modules without registering routes
+    if name in ('data_dictionary_bp', 'routes'):
+        routes = importlib.import_module('.routes', __name__)
+        return routes if name == 'routes' else routes.data_dictionary_bp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
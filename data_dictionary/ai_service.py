@@ -1,4 +1,3 @@
-from cohere import Client
 import os
 from dotenv import load_dotenv
 import pandas as pd
@@ -12,13 +11,13 @@ load_dotenv()
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Initialize Cohere client
-co = Client(os.getenv('COHERE_API_KEY'))
-
-# Cache directory
+# Cache directory, created on first write
 CACHE_DIR = 'cohere_cache'
-if not os.path.exists(CACHE_DIR):
-    os.makedirs(CACHE_DIR)
+
+def get_client():
+    """Shared Cohere client, created on first use"""
+    from llm.client import get_cohere_client
+    return get_cohere_client(os.getenv('COHERE_API_KEY'))
 
 def get_cache_key(prompt):
     """Generate a cache key from the prompt."""
@@ -34,6 +33,7 @@ def load_from_cache(cache_key):
 
 def save_to_cache(cache_key, response):
     """Save response to cache."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
     cache_file = os.path.join(CACHE_DIR, f'{cache_key}.pkl')
     with open(cache_file, 'wb') as f:
         pickle.dump(response, f)
@@ -77,7 +77,7 @@ def generate_column_description(table_name, column_info, sample_values):
         return cached_response
     
     try:
-        response = co.generate(
+        response = get_client().generate(
             model=os.getenv('COHERE_MODEL', 'command-r'),  # Default model if not set
             prompt=prompt,
             max_tokens=200,  # Reduced to ensure concise output
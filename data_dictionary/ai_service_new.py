@@ -1,5 +1,6 @@
 import mysql.connector
-from typing import Dict, List, Any, Tuple, Optional, Union
+from mysql.connector import pooling
+from typing import Dict, List, Any, Tuple, Optional, Union, Iterator
 import pandas as pd
 import requests
 import hashlib
@@ -11,75 +12,188 @@ import time
 import json
 import threading
 import traceback
-
-# Configure logging with more detailed format
-logging.basicConfig(
-    level=logging.DEBUG,  # Changed to DEBUG for more detailed logs
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('data_dictionary_debug.log', mode='w'),  # Overwrite each run
-        logging.StreamHandler()
-    ]
-)
+from contextlib import contextmanager
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from .llm_batching import AdaptiveBatcher, get_batcher
+from .column_dedup import group_columns, fan_out
+from .description_index import INDEX_CONFIG, get_description_index, description_entry
+from llm import client as llm_client
+from llm.router import LLMRouter, OllamaBackend, CohereBackend
+from llm.metrics import metrics
+from llm.request_queue import QUEUE_CONFIG
+from .column_profile import profile_column, format_profile
+from .description_store import STORE_CONFIG, bulk_upsert_descriptions
+from .write_behind import get_write_behind, PartialWrite
+from .catalog_search import index_descriptions
 
 # Create logger for this module
 logger = logging.getLogger('DataDictionaryGenerator')
+DEBUG_LOG_FILE = 'data_dictionary_debug.log'
+
+
+def configure_debug_logging(log_file: str = DEBUG_LOG_FILE):
+    """
+    Send detailed generator logs to `log_file`. Called by the app at startup
+    rather than on import, so CLI and batch workers keep their own logging.
+    """
+    if any(isinstance(handler, logging.FileHandler) and handler.baseFilename == os.path.abspath(log_file)
+           for handler in logger.handlers):
+        return
+    handler = logging.FileHandler(log_file)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
 
 # Configuration
 CACHE_DIR = 'ollama_cache'
 OLLAMA_CONFIG = {
-    'url': 'http://localhost:11434/api/generate',
+    'url': f"{llm_client.OLLAMA_HOST}/api/generate",
+    # Every Ollama host serving the model (comma separated in OLLAMA_HOSTS);
+    # batches are routed across them by observed latency and error rate
+    'hosts': [host.strip() for host in os.getenv('OLLAMA_HOSTS', '').split(',') if host.strip()] or [llm_client.OLLAMA_HOST],
+    'hedge': True,
+    'parallel_per_backend': 1,
+    # Also route batches to Cohere when an API key is configured
+    'cohere_backend': os.getenv('LLM_USE_COHERE', '').lower() in ('1', 'true', 'yes'),
     'model': 'llama3.2:1b',
     'timeout': 60,
     'max_workers': 3,
     'batch_size': 4,
+    # Adaptive batching: batch_size is the starting ceiling, grown up to
+    # max_batch_size while batches fit num_ctx and target_latency (seconds)
+    'adaptive_batching': True,
+    'max_batch_size': 16,
+    'num_ctx': 4096,
+    'target_latency': 45,
+    # Generate one description per group of equivalent columns across tables
+    'dedup_columns': True,
+    # Reuse stored descriptions of near-identical columns from the description index
+    'reuse_descriptions': True,
     'retry_attempts': 3,
-    'retry_delay': 2
+    'retry_delay': 2,
+    # 'markdown' splits the batch on COLUMN_MARKER; 'json' asks Ollama for a
+    # schema-constrained object keyed by column and repairs only invalid columns
+    'output_mode': os.getenv('OLLAMA_OUTPUT_MODE', 'markdown'),
+    # Describe columns in prompts by a value profile (type, shapes, lengths) instead of raw samples
+    'profile_samples': True
 }
+COLUMN_MARKER = '---COLUMN---'
+FALLBACK_PURPOSE_PREFIX = 'Unable to determine purpose'
+DESCRIPTION_FIELDS = ('business_purpose', 'data_quality_rules', 'example_usage', 'issues')
+
+# Prompts are laid out as a stable instruction prefix followed by the column
+# blocks of a batch, so the prefix tokens can be evaluated once and reused
+MARKDOWN_PROMPT_PREFIX = f"""As a data governance expert, provide concise descriptions for the columns listed below.
+
+For each column, include:
+- **Business Purpose**: Describe the column's role in business processes (1 sentence).
+- **Data Quality Rules**: List 1-2 rules to ensure data integrity (e.g., format, range, uniqueness).
+- **Example Usage**: Provide 1 example of how the column is used in analysis or operations.
+- **Known Issues/Limitations**: Identify 1-2 possible data quality issues.
+
+Format as markdown bullets, keep each description under 200 words.
+Describe the columns in the order listed and clearly separate each column description with '{COLUMN_MARKER}' marker.
+
+Columns:
+"""
+JSON_PROMPT_PREFIX = """As a data governance expert, provide concise descriptions for the columns listed below.
+
+Return a JSON object with one entry per Key listed. Each entry must contain:
+- "business_purpose": the column's role in business processes (1 sentence).
+- "data_quality_rules": 1-2 rules to ensure data integrity (e.g., format, range, uniqueness).
+- "example_usage": 1 example of how the column is used in analysis or operations.
+- "issues": 1-2 possible data quality issues.
+
+Keep each value under 60 words.
 
-# Ensure cache directory exists
-os.makedirs(CACHE_DIR, exist_ok=True)
-logger.info(f"Cache directory: {CACHE_DIR}")
+Columns:
+"""
 
 class DatabaseConnection:
-    """Database connection handler with connection pooling"""
+    """
+    Pooled database connections, one pool per configuration.
+
+    A connection from `connection()` belongs to the calling thread until the
+    block exits, when it goes back to the pool. Callers wait for a free
+    connection instead of failing when the pool is exhausted. A connection
+    left in an unusable state (e.g. an abandoned unbuffered result) is
+    passed to `discard()` and replaced with a fresh one instead.
+    """
     
-    _connections = {}
+    POOL_SIZE = 8
+    _pools = {}
     _lock = threading.Lock()
     
     @classmethod
-    def get_connection(cls, db_config: Dict[str, Any]):
-        """Get or create a database connection"""
+    def get_pool(cls, db_config: Dict[str, Any]) -> Tuple[pooling.MySQLConnectionPool, threading.BoundedSemaphore]:
+        """Get or create the pool for a database configuration"""
         config_key = json.dumps(db_config, sort_keys=True)
         
         with cls._lock:
-            if config_key not in cls._connections:
+            if config_key not in cls._pools:
                 try:
-                    logger.debug(f"Creating new database connection to {db_config.get('host', 'unknown')}")
-                    conn = mysql.connector.connect(**db_config)
-                    cls._connections[config_key] = conn
-                    logger.info(f"Created new database connection for {db_config['host']}")
+                    logger.debug(f"Creating connection pool for {db_config.get('host', 'unknown')}")
+                    pool = pooling.MySQLConnectionPool(
+                        pool_name=f"dictionary_{hashlib.md5(config_key.encode()).hexdigest()[:16]}",
+                        pool_size=cls.POOL_SIZE,
+                        allow_local_infile=STORE_CONFIG['load_data_local'],
+                        **db_config
+                    )
+                    cls._pools[config_key] = (pool, threading.BoundedSemaphore(cls.POOL_SIZE))
+                    logger.info(f"Created connection pool of {cls.POOL_SIZE} for {db_config['host']}")
                 except mysql.connector.Error as err:
                     logger.error(f"Database connection error: {err}")
                     logger.error(f"Connection config: {db_config}")
                     raise
                 except Exception as e:
-                    logger.error(f"Unexpected error creating connection: {e}")
+                    logger.error(f"Unexpected error creating connection pool: {e}")
                     raise
         
-        return cls._connections[config_key]
+        return cls._pools[config_key]
+    
+    @classmethod
+    @contextmanager
+    def connection(cls, db_config: Dict[str, Any]):
+        """Borrow a pooled connection for the duration of the block"""
+        pool, available = cls.get_pool(db_config)
+        available.acquire()
+        try:
+            conn = pool.get_connection()
+            try:
+                yield conn
+            finally:
+                if getattr(conn, 'discarded', False):
+                    try:
+                        pool.add_connection()
+                    except Exception as e:
+                        logger.warning(f"Could not replace a discarded connection: {e}")
+                else:
+                    # Returns the connection to the pool
+                    conn.close()
+        finally:
+            available.release()
+    
+    @staticmethod
+    def discard(conn):
+        """
+        Close a borrowed connection's socket without reading what is left of
+        its result; the pool gets a new connection when the block exits.
+        """
+        conn.discarded = True
+        conn._cnx.shutdown()
     
     @classmethod
     def close_all(cls):
-        """Close all database connections"""
+        """Close the idle connections of every pool"""
         with cls._lock:
-            for config_key, conn in cls._connections.items():
+            for config_key, (pool, _) in cls._pools.items():
                 try:
-                    conn.close()
-                    logger.debug(f"Closed database connection: {config_key}")
+                    pool._remove_connections()
+                    logger.debug(f"Closed connection pool: {pool.pool_name}")
                 except Exception as e:
-                    logger.warning(f"Error closing connection: {e}")
-            cls._connections.clear()
+                    logger.warning(f"Error closing connection pool: {e}")
+            cls._pools.clear()
             logger.info("All database connections closed")
 
 class OllamaClient:
@@ -110,6 +224,7 @@ class OllamaClient:
         """Save response to cache"""
         cache_file = os.path.join(CACHE_DIR, f'{cache_key}.pkl')
         try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
             with open(cache_file, 'wb') as f:
                 pickle.dump(response, f)
             logger.debug(f"Saved to cache: {cache_key}")
@@ -138,19 +253,108 @@ class OllamaClient:
     
     @classmethod
     def test_ollama_connection(cls) -> bool:
-        """Test if Ollama is running and accessible"""
-        try:
-            logger.info("Testing Ollama connection...")
-            response = requests.get("http://localhost:11434/api/tags", timeout=10)
-            if response.status_code == 200:
-                logger.info(f"Ollama connection successful. Available models: {response.json()}")
-                return True
-            else:
-                logger.error(f"Ollama connection failed: {response.status_code} - {response.text}")
-                return False
-        except Exception as e:
-            logger.error(f"Ollama connection test failed: {e}")
-            return False
+        """Test if any Ollama host is running and accessible (cached for a few seconds across batches)"""
+        return any(llm_client.is_available(host) for host in OLLAMA_CONFIG['hosts'])
+    
+    @classmethod
+    def warmup(cls) -> bool:
+        """Preload the configured model on every host so batches don't pay its cold-load time"""
+        warmed = [llm_client.warmup(OLLAMA_CONFIG['model'], host) for host in OLLAMA_CONFIG['hosts']]
+        return any(warmed)
+    
+    _router = None
+    _router_lock = threading.Lock()
+    
+    @classmethod
+    def get_router(cls) -> LLMRouter:
+        """Router over the configured Ollama hosts (and Cohere when enabled)"""
+        with cls._router_lock:
+            if cls._router is None:
+                backends = [OllamaBackend(host, OLLAMA_CONFIG['model'])
+                            for host in OLLAMA_CONFIG['hosts']]
+                if OLLAMA_CONFIG['cohere_backend'] and os.getenv('COHERE_API_KEY'):
+                    backends.append(CohereBackend(os.getenv('COHERE_API_KEY'), os.getenv('COHERE_MODEL', 'command')))
+                cls._router = LLMRouter(backends, hedge=OLLAMA_CONFIG['hedge'],
+                                        concurrency=OLLAMA_CONFIG['parallel_per_backend'] + QUEUE_CONFIG['interactive_reserve'])
+                logger.info(f"LLM router backends: {[backend.name for backend in backends]}")
+            return cls._router
+    
+    @staticmethod
+    def get_batcher() -> Optional[AdaptiveBatcher]:
+        """Shared adaptive batcher for the configured model, None when disabled"""
+        if not OLLAMA_CONFIG['adaptive_batching']:
+            return None
+        return get_batcher(
+            OLLAMA_CONFIG['model'],
+            num_ctx=OLLAMA_CONFIG['num_ctx'],
+            target_latency=OLLAMA_CONFIG['target_latency'],
+            initial_batch_size=OLLAMA_CONFIG['batch_size'],
+            max_batch_size=OLLAMA_CONFIG['max_batch_size']
+        )
+    
+    @classmethod
+    def generation_options(cls, columns_data: List[Tuple[str, Dict[str, Any], List[Any]]]) -> Dict[str, Any]:
+        """Ollama sampling options for a batch, sized by the adaptive batcher when enabled"""
+        batcher = cls.get_batcher()
+        options = {
+            "temperature": 0.2,
+            "num_predict": batcher.num_predict(columns_data) if batcher else 200 * len(columns_data),
+            "top_p": 0.9
+        }
+        if batcher:
+            options["num_ctx"] = OLLAMA_CONFIG['num_ctx']
+        return options
+    
+    @classmethod
+    def split_timed_out_batch(cls, columns_data, generate):
+        """
+        Record a timeout with the batcher and regenerate the batch as two halves.
+        Returns None when the batch cannot be split further.
+        """
+        batcher = cls.get_batcher()
+        if not batcher:
+            return None
+        batcher.record_timeout(len(columns_data))
+        if len(columns_data) < 2:
+            return None
+        middle = len(columns_data) // 2
+        logger.info(f"Splitting timed out batch of {len(columns_data)} into {middle} + {len(columns_data) - middle}")
+        return {**generate(columns_data[:middle]), **generate(columns_data[middle:])}
+    
+    @classmethod
+    def generate_batch(cls, columns_data: List[Tuple[str, Dict[str, Any], List[Any]]]) -> Dict[str, Union[str, Dict[str, str]]]:
+        """Generate a batch in the configured output mode"""
+        if OLLAMA_CONFIG['output_mode'] == 'json':
+            return cls.generate_descriptions_batch_json(columns_data)
+        return cls.generate_descriptions_batch(columns_data)
+    
+    @classmethod
+    def iter_batches(cls, columns_data: List[Tuple[str, Dict[str, Any], List[Any]]]) -> Iterator[List[Tuple[str, Dict[str, Any], List[Any]]]]:
+        """
+        Yield successive batches of columns. With adaptive batching each batch is
+        sized when it is requested, so rates learned from earlier batches apply.
+        """
+        position = 0
+        while position < len(columns_data):
+            batcher = cls.get_batcher()
+            size = batcher.next_batch_size(columns_data[position:]) if batcher else OLLAMA_CONFIG['batch_size']
+            yield columns_data[position:position + size]
+            position += size
+    
+    @staticmethod
+    def build_batch_prompt(columns_data: List[Tuple[str, Dict[str, Any], List[Any]]]) -> str:
+        """Build the variable part of the markdown batch prompt (follows MARKDOWN_PROMPT_PREFIX)"""
+        prompt = ""
+        for table_name, column_info, sample_values in columns_data:
+            prompt += f"""
+Table: {table_name}
+Column: {column_info['COLUMN_NAME']}
+Type: {column_info['DATA_TYPE']}
+Nullable: {column_info['IS_NULLABLE']}
+Max Length: {column_info.get('CHARACTER_MAXIMUM_LENGTH', 'N/A')}
+{format_profile(column_info.get('PROFILE'), sample_values)}
+"""
+        return prompt
     
     @classmethod
     def generate_descriptions_batch(cls, columns_data: List[Tuple[str, Dict[str, Any], List[Any]]]) -> Dict[str, str]:
@@ -166,36 +370,14 @@ class OllamaClient:
             logger.error("Ollama is not available. Using fallback responses.")
             return cls._generate_fallback_responses(columns_data)
         
-        # Build batch prompt
-        prompt = "As a data governance expert, provide concise descriptions for the following columns:\n\n"
-        
-        for table_name, column_info, sample_values in columns_data:
-            prompt += f"""
-Table: {table_name}
-Column: {column_info['COLUMN_NAME']}
-Type: {column_info['DATA_TYPE']}
-Nullable: {column_info['IS_NULLABLE']}
-Max Length: {column_info.get('CHARACTER_MAXIMUM_LENGTH', 'N/A')}
-Sample Values: {sample_values[:5]}
-
-"""
-        
-        prompt += """
-For each column, include:
-- **Business Purpose**: Describe the column's role in business processes (1 sentence).
-- **Data Quality Rules**: List 1-2 rules to ensure data integrity (e.g., format, range, uniqueness).
-- **Example Usage**: Provide 1 example of how the column is used in analysis or operations.
-- **Known Issues/Limitations**: Identify 1-2 possible data quality issues.
-
-Format as markdown bullets, keep each description under 200 words.
-Clearly separate each column description with '---COLUMN---' marker.
-"""
+        prompt = cls.build_batch_prompt(columns_data)
         
         logger.debug(f"Generated prompt for {len(columns_data)} columns")
         logger.debug(f"Prompt preview: {prompt[:200]}...")
         
-        cache_key = cls.get_cache_key(prompt)
+        cache_key = cls.get_cache_key(MARKDOWN_PROMPT_PREFIX + prompt)
         cached = cls.load_from_cache(cache_key)
+        metrics.record_cache('prompt_cache', bool(cached))
         if cached:
             logger.info(f"Using cached response for {len(columns_data)} columns")
             return cached
@@ -205,35 +387,14 @@ Clearly separate each column description with '---COLUMN---' marker.
             try:
                 logger.info(f"Calling Ollama API for {len(columns_data)} columns (attempt {attempt + 1}/{OLLAMA_CONFIG['retry_attempts']})")
                 
-                # Log the exact request being made
-                request_data = {
-                    "model": OLLAMA_CONFIG['model'],
-                    "prompt": prompt,
-                    "options": {
-                        "temperature": 0.2, 
-                        "num_predict": 200 * len(columns_data),
-                        "top_p": 0.9
-                    },
-                    "stream": False
-                }
-                logger.debug(f"Ollama request data: {json.dumps(request_data, indent=2)}")
-                
-                response = requests.post(
-                    OLLAMA_CONFIG['url'],
-                    json=request_data,
-                    timeout=OLLAMA_CONFIG['timeout']
+                data = cls.get_router().generate(
+                    prompt,
+                    cls.generation_options(columns_data),
+                    timeout=OLLAMA_CONFIG['timeout'],
+                    labels={'operation': 'describe', 'batch_size': len(columns_data), 'attempt': attempt},
+                    prefix=MARKDOWN_PROMPT_PREFIX
                 )
-                
-                logger.debug(f"Ollama response status: {response.status_code}")
-                logger.debug(f"Ollama response headers: {dict(response.headers)}")
-                
-                if response.status_code != 200:
-                    error_msg = f"Ollama error: {response.status_code} {response.text}"
-                    logger.error(error_msg)
-                    raise Exception(error_msg)
-
-                data = response.json()
-                logger.debug(f"Ollama response JSON: {json.dumps(data, indent=2)}")
+                logger.debug(f"Response from {data['backend']}: {data.get('eval_count')} tokens")
                 
                 description = data.get("response", "").strip()
                 logger.debug(f"Raw response: {description[:200]}...")
@@ -241,8 +402,12 @@ Clearly separate each column description with '---COLUMN---' marker.
                 if not description:
                     raise Exception("Empty response from Ollama")
                 
+                batcher = cls.get_batcher()
+                if batcher:
+                    batcher.record(len(columns_data), data)
+                
                 # Parse the batch response
-                descriptions = description.split('---COLUMN---')
+                descriptions = description.split(COLUMN_MARKER)
                 logger.debug(f"Split into {len(descriptions)} description parts")
                 
                 result = {}
@@ -263,6 +428,9 @@ Clearly separate each column description with '---COLUMN---' marker.
                 logger.error("Is Ollama running? Try: ollama serve")
             except requests.exceptions.Timeout as e:
                 logger.error(f"Timeout error with Ollama: {e}")
+                split = cls.split_timed_out_batch(columns_data, cls.generate_descriptions_batch)
+                if split is not None:
+                    return split
             except Exception as e:
                 logger.error(f"Attempt {attempt + 1} failed: {e}")
                 logger.error(f"Error type: {type(e).__name__}")
@@ -278,21 +446,267 @@ Clearly separate each column description with '---COLUMN---' marker.
         logger.error(f"All {OLLAMA_CONFIG['retry_attempts']} attempts failed for batch of {len(columns_data)} columns")
         return cls._generate_fallback_responses(columns_data)
     
+    @staticmethod
+    def build_json_batch_prompt(columns_data: List[Tuple[str, Dict[str, Any], List[Any]]]) -> str:
+        """Build the variable part of the structured-output batch prompt (follows JSON_PROMPT_PREFIX)"""
+        prompt = ""
+        for table_name, column_info, sample_values in columns_data:
+            prompt += f"""
+Key: {table_name}.{column_info['COLUMN_NAME']}
+Type: {column_info['DATA_TYPE']}
+Nullable: {column_info['IS_NULLABLE']}
+Max Length: {column_info.get('CHARACTER_MAXIMUM_LENGTH', 'N/A')}
+{format_profile(column_info.get('PROFILE'), sample_values)}
+"""
+        return prompt
+    
+    @staticmethod
+    def build_json_schema(column_keys: List[str]) -> Dict[str, Any]:
+        """JSON schema passed to Ollama's 'format' option for a batch"""
+        entry_schema = {
+            "type": "object",
+            "properties": {field: {"type": "string"} for field in DESCRIPTION_FIELDS},
+            "required": list(DESCRIPTION_FIELDS)
+        }
+        return {
+            "type": "object",
+            "properties": {key: entry_schema for key in column_keys},
+            "required": list(column_keys)
+        }
+    
+    @staticmethod
+    def validate_json_descriptions(raw: str, column_keys: List[str]) -> Dict[str, Dict[str, str]]:
+        """
+        Parse a structured batch response and keep only the valid column entries.
+        An entry is valid when it is keyed by a requested column and every
+        description field is a non-empty string.
+        """
+        try:
+            data = json.loads(raw)
+        except (TypeError, json.JSONDecodeError) as e:
+            logger.warning(f"Structured response is not valid JSON: {e}")
+            return {}
+        
+        if not isinstance(data, dict):
+            logger.warning(f"Structured response is not an object: {type(data).__name__}")
+            return {}
+        
+        valid = {}
+        for key in column_keys:
+            entry = data.get(key)
+            if not isinstance(entry, dict):
+                continue
+            if all(isinstance(entry.get(field), str) and entry[field].strip() for field in DESCRIPTION_FIELDS):
+                valid[key] = {field: entry[field].strip() for field in DESCRIPTION_FIELDS}
+        return valid
+    
+    @classmethod
+    def generate_descriptions_batch_json(cls, columns_data: List[Tuple[str, Dict[str, Any], List[Any]]]) -> Dict[str, Dict[str, str]]:
+        """
+        Generate structured descriptions for a batch using Ollama's JSON-schema output.
+        Only the columns missing or invalid in a response are re-requested.
+        """
+        logger.info(f"generate_descriptions_batch_json called with {len(columns_data)} columns")
+        
+        if not columns_data:
+            return {}
+        
+        if not cls.test_ollama_connection():
+            logger.error("Ollama is not available. Using fallback responses.")
+            return cls._generate_fallback_structured(columns_data)
+        
+        cache_key = cls.get_cache_key('json:' + JSON_PROMPT_PREFIX + cls.build_json_batch_prompt(columns_data))
+        cached = cls.load_from_cache(cache_key)
+        metrics.record_cache('prompt_cache', bool(cached))
+        if cached:
+            logger.info(f"Using cached structured response for {len(columns_data)} columns")
+            return cached
+        
+        result = {}
+        pending = list(columns_data)
+        
+        for attempt in range(OLLAMA_CONFIG['retry_attempts']):
+            column_keys = [f"{table_name}.{column_info['COLUMN_NAME']}" for table_name, column_info, _ in pending]
+            try:
+                logger.info(f"Requesting structured descriptions for {len(pending)} columns "
+                            f"(attempt {attempt + 1}/{OLLAMA_CONFIG['retry_attempts']})")
+                
+                data = cls.get_router().generate(
+                    cls.build_json_batch_prompt(pending),
+                    cls.generation_options(pending),
+                    format=cls.build_json_schema(column_keys),
+                    timeout=OLLAMA_CONFIG['timeout'],
+                    labels={'operation': 'describe_json', 'batch_size': len(pending), 'attempt': attempt},
+                    prefix=JSON_PROMPT_PREFIX
+                )
+                batcher = cls.get_batcher()
+                if batcher:
+                    batcher.record(len(pending), data)
+                
+                valid = cls.validate_json_descriptions(data.get("response", ""), column_keys)
+                result.update(valid)
+                pending = [
+                    column for column in pending
+                    if f"{column[0]}.{column[1]['COLUMN_NAME']}" not in result
+                ]
+                logger.info(f"Structured response accepted {len(valid)}/{len(column_keys)} columns")
+                
+                if not pending:
+                    cls.save_to_cache(cache_key, result)
+                    return result
+                
+            except requests.exceptions.ConnectionError as e:
+                logger.error(f"Connection error to Ollama: {e}")
+            except requests.exceptions.Timeout as e:
+                logger.error(f"Timeout error with Ollama: {e}")
+                split = cls.split_timed_out_batch(pending, cls.generate_descriptions_batch_json)
+                if split is not None:
+                    result.update(split)
+                    return result
+            except Exception as e:
+                logger.error(f"Structured attempt {attempt + 1} failed: {e}")
+            
+            if attempt < OLLAMA_CONFIG['retry_attempts'] - 1:
+                time.sleep(OLLAMA_CONFIG['retry_delay'] * (attempt + 1))
+        
+        logger.error(f"{len(pending)} of {len(columns_data)} columns still invalid after "
+                     f"{OLLAMA_CONFIG['retry_attempts']} attempts; using fallbacks for those only")
+        result.update(cls._generate_fallback_structured(pending))
+        return result
+    
+    @classmethod
+    def stream_descriptions_batch(cls, columns_data: List[Tuple[str, Dict[str, Any], List[Any]]]) -> Iterator[Tuple[str, str]]:
+        """
+        Stream descriptions for a batch, yielding (column_key, description) as soon as
+        each '---COLUMN---' section of the Ollama NDJSON stream is complete
+        """
+        logger.info(f"stream_descriptions_batch called with {len(columns_data)} columns")
+        
+        if not columns_data:
+            return
+        
+        prompt = cls.build_batch_prompt(columns_data)
+        cache_key = cls.get_cache_key(MARKDOWN_PROMPT_PREFIX + prompt)
+        cached = cls.load_from_cache(cache_key)
+        metrics.record_cache('prompt_cache', bool(cached))
+        if cached:
+            logger.info(f"Using cached response for {len(columns_data)} columns")
+            for table_name, column_info, _ in columns_data:
+                column_key = f"{table_name}.{column_info['COLUMN_NAME']}"
+                yield column_key, cached.get(column_key, "")
+            return
+        
+        result = {}
+        buffer = ""
+        
+        def next_column_key():
+            table_name, column_info, _ = columns_data[len(result)]
+            return f"{table_name}.{column_info['COLUMN_NAME']}"
+        
+        router = cls.get_router()
+        backend = router.acquire(streaming=True)
+        started = time.monotonic()
+        try:
+            request_data = backend.build_payload(prompt, cls.generation_options(columns_data),
+                                                 timeout=OLLAMA_CONFIG['timeout'],
+                                                 prefix=MARKDOWN_PROMPT_PREFIX, stream=True)
+            with llm_client.post(backend.url, request_data,
+                                 timeout=OLLAMA_CONFIG['timeout'], stream=True) as response:
+                if response.status_code != 200:
+                    raise Exception(f"Ollama error: {response.status_code} {response.text}")
+                
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get('error'):
+                        raise Exception(f"Ollama error: {chunk['error']}")
+                    buffer += chunk.get('response', '')
+                    
+                    # Emit every section that has been closed by a marker
+                    while COLUMN_MARKER in buffer and len(result) < len(columns_data):
+                        section, buffer = buffer.split(COLUMN_MARKER, 1)
+                        section = section.strip()
+                        if not section:
+                            # Marker emitted before the first column or twice in a row
+                            continue
+                        column_key = next_column_key()
+                        result[column_key] = section
+                        logger.debug(f"Streamed column {len(result)}/{len(columns_data)}: {column_key}")
+                        yield column_key, section
+                    
+                    if chunk.get('done'):
+                        # The final chunk carries the eval counters for the whole call
+                        batcher = cls.get_batcher()
+                        if batcher:
+                            batcher.record(len(columns_data), chunk)
+                        metrics.record_call(backend.name, backend.model, 'describe_stream', len(columns_data),
+                                            response=chunk, total_seconds=time.monotonic() - started)
+                        break
+            
+            router.record(backend, time.monotonic() - started, False)
+            
+            # Whatever follows the last marker belongs to the next column
+            section = buffer.replace(COLUMN_MARKER, '').strip()
+            if section and len(result) < len(columns_data):
+                column_key = next_column_key()
+                result[column_key] = section
+                yield column_key, section
+        
+        except requests.exceptions.ConnectionError as e:
+            router.record(backend, None, True)
+            metrics.record_call(backend.name, backend.model, 'describe_stream', len(columns_data), error=True)
+            logger.error(f"Connection error to {backend.name} while streaming: {e}")
+        except requests.exceptions.Timeout as e:
+            router.record(backend, None, True)
+            metrics.record_call(backend.name, backend.model, 'describe_stream', len(columns_data), error=True)
+            logger.error(f"Timeout error while streaming from {backend.name}: {e}")
+            batcher = cls.get_batcher()
+            if batcher:
+                batcher.record_timeout(len(columns_data))
+        except Exception as e:
+            router.record(backend, None, True)
+            metrics.record_call(backend.name, backend.model, 'describe_stream', len(columns_data), error=True)
+            logger.error(f"Streaming failed after {len(result)}/{len(columns_data)} columns: {e}")
+        finally:
+            router.release(backend)
+        
+        # Columns the stream did not cover are completed with a regular batch call
+        remaining = columns_data[len(result):]
+        if remaining:
+            logger.warning(f"Stream ended early, generating {len(remaining)} remaining columns without streaming")
+            remaining_descriptions = cls.generate_descriptions_batch(remaining)
+            for table_name, column_info, _ in remaining:
+                column_key = f"{table_name}.{column_info['COLUMN_NAME']}"
+                yield column_key, remaining_descriptions.get(column_key, "")
+        else:
+            cls.save_to_cache(cache_key, result)
+            logger.info(f"Successfully streamed descriptions for {len(columns_data)} columns")
+    
     @classmethod
     def _generate_fallback_responses(cls, columns_data: List[Tuple[str, Dict[str, Any], List[Any]]]) -> Dict[str, str]:
         """Generate fallback responses when Ollama fails"""
         logger.warning("Generating fallback responses due to Ollama failure")
+        metrics.record_fallback('llm_unavailable', len(columns_data))
         result = {}
         for table_name, column_info, sample_values in columns_data:
             column_name = column_info['COLUMN_NAME']
             result[f"{table_name}.{column_name}"] = f"""
-- **Business Purpose**: Unable to determine purpose for {column_name}.
+- **Business Purpose**: {FALLBACK_PURPOSE_PREFIX} for {column_name}.
 - **Data Quality Rules**: Ensure data matches type {column_info['DATA_TYPE']}; check for nulls if {column_info['IS_NULLABLE']}='NO'.
 - **Example Usage**: Analyze {column_name} in {table_name} (e.g., count unique values).
 - **Known Issues/Limitations**: Description generation failed due to Ollama connection issues.
 """
         return result
 
+    @classmethod
+    def _generate_fallback_structured(cls, columns_data: List[Tuple[str, Dict[str, Any], List[Any]]]) -> Dict[str, Dict[str, str]]:
+        """Structured counterpart of _generate_fallback_responses"""
+        return {
+            column_key: cls.parse_markdown_description(description)
+            for column_key, description in cls._generate_fallback_responses(columns_data).items()
+        }
+
 class DataDictionaryGenerator:
     """Main class for generating data dictionary descriptions"""
     
@@ -383,6 +797,8 @@ class DataDictionaryGenerator:
                         'IS_NULLABLE': 'YES' if df[column_name].isna().any() else 'NO',
                         'CHARACTER_MAXIMUM_LENGTH': None
                     }
+                    if OLLAMA_CONFIG['profile_samples']:
+                        column_info['PROFILE'] = profile_column(df[column_name])
                     all_columns_data.append((table_name, column_info, sample_values))
                     logger.debug(f"Added column: {table_name}.{column_name} with {len(sample_values)} samples")
                 except Exception as e:
@@ -396,9 +812,6 @@ class DataDictionaryGenerator:
         """Ensure the column_descriptions table exists"""
         try:
             logger.debug(f"Ensuring table exists with config: {db_config}")
-            conn = DatabaseConnection.get_connection(db_config)
-            cursor = conn.cursor()
-            
             create_table_query = """
             CREATE TABLE IF NOT EXISTS column_descriptions (
                 id INT AUTO_INCREMENT PRIMARY KEY,
@@ -413,8 +826,10 @@ class DataDictionaryGenerator:
                 UNIQUE KEY table_column_idx (table_name, column_name)
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
             """
-            cursor.execute(create_table_query)
-            cursor.close()
+            with DatabaseConnection.connection(db_config) as conn:
+                cursor = conn.cursor()
+                cursor.execute(create_table_query)
+                cursor.close()
             logger.info("Ensured column_descriptions table exists")
             
         except Exception as e:
@@ -424,57 +839,185 @@ class DataDictionaryGenerator:
     
     @staticmethod
     def save_descriptions_to_db(descriptions: List[Dict[str, Any]], db_config: Dict[str, Any]):
-        """Save descriptions to database"""
+        """
+        Save descriptions to database in one bulk upsert transaction, or hand
+        them to the write-behind queue when it is running.
+        """
         logger.debug(f"save_descriptions_to_db called with {len(descriptions)} descriptions")
         
         if not descriptions:
             logger.warning("No descriptions to save to database")
             return
         
+        items = [{'db_config': db_config, 'description': {field: description.get(field) for field in
+                                                          ('table_name', 'column_name') + DESCRIPTION_FIELDS}}
+                 for description in descriptions]
+        if get_write_behind().enqueue('column_descriptions', items):
+            logger.info(f"Queued {len(items)} descriptions for saving")
+            return
+        
         try:
-            conn = DatabaseConnection.get_connection(db_config)
-            cursor = conn.cursor()
-            
-            insert_query = """
-            INSERT INTO column_descriptions 
-            (table_name, column_name, business_purpose, data_quality_rules, example_usage, issues)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-            business_purpose = VALUES(business_purpose),
-            data_quality_rules = VALUES(data_quality_rules),
-            example_usage = VALUES(example_usage),
-            issues = VALUES(issues),
-            updated_at = CURRENT_TIMESTAMP
-            """
-            
-            batch_size = 50
-            for i in range(0, len(descriptions), batch_size):
-                batch = descriptions[i:i + batch_size]
-                values = [
-                    (result['table_name'], result['column_name'], 
-                     result['business_purpose'], result['data_quality_rules'],
-                     result['example_usage'], result['issues'])
-                    for result in batch
-                ]
-                logger.debug(f"Executing batch insert with {len(values)} rows")
-                cursor.executemany(insert_query, values)
-                conn.commit()
-                logger.info(f"Saved {len(batch)} descriptions to database")
-            
-            cursor.close()
+            with DatabaseConnection.connection(db_config) as conn:
+                saved = bulk_upsert_descriptions(conn, descriptions)
+            index_descriptions(db_config, descriptions)
+            logger.info(f"Saved {saved} descriptions to database")
             
         except Exception as e:
             logger.error(f"Error saving to database: {e}")
             logger.error(f"Traceback: {traceback.format_exc()}")
             # Don't raise here to allow the function to continue
     
+    @staticmethod
+    def write_queued_descriptions(items: List[Dict[str, Any]]):
+        """
+        Write-behind writer: one bulk upsert per target database. A database
+        that fails doesn't stop the others; its items are reported back with
+        PartialWrite for a retry.
+        """
+        by_config = {}
+        for item in items:
+            by_config.setdefault(json.dumps(item['db_config'], sort_keys=True), []).append(item)
+        failed = []
+        for grouped in by_config.values():
+            descriptions = [item['description'] for item in grouped]
+            db_config = grouped[0]['db_config']
+            try:
+                with DatabaseConnection.connection(db_config) as conn:
+                    bulk_upsert_descriptions(conn, descriptions)
+            except Exception as e:
+                logger.error(f"Queued descriptions for {db_config.get('host')}/{db_config.get('database')} failed: {e}")
+                if len(by_config) == 1:
+                    raise
+                failed.extend(grouped)
+                continue
+            index_descriptions(db_config, descriptions)
+        if failed:
+            raise PartialWrite(failed, f"{len(failed)} descriptions in {len(by_config)} databases were not written")
+    
+    @staticmethod
+    def group_duplicate_columns(all_columns_data: List[Tuple[str, Dict[str, Any], List[Any]]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Group repeated columns (id, created_at, ...) so each group is generated once.
+        Returns the groups keyed by their representative's 'table.column' key; with
+        dedup disabled every column is its own group.
+        """
+        if OLLAMA_CONFIG['dedup_columns']:
+            groups = group_columns(all_columns_data)
+        else:
+            groups = [{'signature': None, 'representative': column, 'members': [column]}
+                      for column in all_columns_data]
+        return {
+            f"{group['representative'][0]}.{group['representative'][1]['COLUMN_NAME']}": group
+            for group in groups
+        }
+    
+    @staticmethod
+    def load_stored_descriptions_into_index(db_config: Dict[str, Any]):
+        """Seed an empty description index from the column_descriptions table"""
+        index = get_description_index()
+        if len(index):
+            return
+        
+        with DatabaseConnection.connection(db_config) as conn:
+            cursor = conn.cursor(dictionary=True)
+            # The type comes from information_schema; rows whose column no longer exists stay untyped and are never reused
+            cursor.execute("""
+                SELECT d.table_name, d.column_name, d.business_purpose, d.data_quality_rules,
+                       d.example_usage, d.issues, c.DATA_TYPE AS data_type
+                FROM column_descriptions d
+                LEFT JOIN information_schema.COLUMNS c
+                    ON c.TABLE_SCHEMA = DATABASE()
+                    AND c.TABLE_NAME = d.table_name
+                    AND c.COLUMN_NAME = d.column_name
+            """)
+            rows = cursor.fetchall()
+            cursor.close()
+        
+        entries = [
+            description_entry({key: value for key, value in row.items() if key != 'data_type'}, row['data_type'])
+            for row in rows
+            if row['business_purpose'] and not row['business_purpose'].startswith(FALLBACK_PURPOSE_PREFIX)
+        ]
+        index.add(entries)
+        index.save()
+        logger.info(f"Seeded description index with {len(entries)} stored descriptions")
+    
+    @classmethod
+    def reuse_indexed_descriptions(cls, groups_by_key: Dict[str, Dict[str, Any]],
+                                   db_config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Find group representatives with a near-identical indexed neighbour.
+        Returns 'table.column' -> reused result row; empty when reuse is disabled
+        or the index is unavailable.
+        """
+        if not OLLAMA_CONFIG['reuse_descriptions'] or not groups_by_key:
+            return {}
+        
+        try:
+            cls.load_stored_descriptions_into_index(db_config)
+            representatives = [group['representative'] for group in groups_by_key.values()]
+            reused = get_description_index().find_reusable(representatives, INDEX_CONFIG['reuse_threshold'])
+        except Exception as e:
+            logger.warning(f"Description index lookup failed, generating all columns: {e}")
+            return {}
+        
+        logger.info(f"Reusing indexed descriptions for {len(reused)}/{len(groups_by_key)} distinct columns")
+        metrics.record_cache('description_index', True, len(reused))
+        metrics.record_cache('description_index', False, len(groups_by_key) - len(reused))
+        return reused
+    
+    @staticmethod
+    def index_generated_descriptions(generated: List[Tuple[Tuple[str, Dict[str, Any], List[Any]], Dict[str, Any]]]):
+        """Add freshly generated (non-fallback) descriptions to the index and persist it"""
+        if not OLLAMA_CONFIG['reuse_descriptions']:
+            return
+        
+        entries = [
+            description_entry(result, column_info['DATA_TYPE'], sample_values)
+            for (table_name, column_info, sample_values), result in generated
+            if result['business_purpose'] and not result['business_purpose'].startswith(FALLBACK_PURPOSE_PREFIX)
+        ]
+        try:
+            index = get_description_index()
+            index.add(entries)
+            index.save()
+        except Exception as e:
+            logger.warning(f"Could not index generated descriptions: {e}")
+    
+    @staticmethod
+    def build_result(table_name: str, column_info: Dict[str, Any], description: Union[str, Dict[str, str]]) -> Dict[str, Any]:
+        """Turn a markdown or structured description into a column_descriptions row"""
+        if isinstance(description, dict):
+            parsed = description
+        else:
+            parsed = OllamaClient.parse_markdown_description(description)
+        
+        result = {
+            'table_name': table_name,
+            'column_name': column_info['COLUMN_NAME'],
+            'business_purpose': parsed.get('business_purpose', ''),
+            'data_quality_rules': parsed.get('data_quality_rules', ''),
+            'example_usage': parsed.get('example_usage', ''),
+            'issues': parsed.get('issues', '')
+        }
+        
+        logger.debug(f"Processed {table_name}.{column_info['COLUMN_NAME']}: "
+                   f"business_purpose={bool(result['business_purpose'])}, "
+                   f"data_quality_rules={bool(result['data_quality_rules'])}, "
+                   f"example_usage={bool(result['example_usage'])}, "
+                   f"issues={bool(result['issues'])}")
+        return result
+    
     @classmethod
     def generate_column_descriptions_for_tables(cls, data_dict: Dict[str, pd.DataFrame],
                                                connection_string: str,
                                                db_type: str,
-                                               schema_name: str = None) -> List[Dict[str, Any]]:
+                                               schema_name: str = None,
+                                               cancel_event: Optional[threading.Event] = None) -> List[Dict[str, Any]]:
         """
-        Main function to generate column descriptions
+        Main function to generate column descriptions.
+        Setting `cancel_event` stops submitting new batches; batches already
+        running finish and their results are saved and returned.
         """
         logger.info("=" * 60)
         logger.info("STARTING COLUMN DESCRIPTION GENERATION")
@@ -509,62 +1052,141 @@ class DataDictionaryGenerator:
         
         # Ensure database table exists
         cls.ensure_descriptions_table(db_config)
+        OllamaClient.warmup()
+        
+        groups_by_key = cls.group_duplicate_columns(all_columns_data)
+        reused = cls.reuse_indexed_descriptions(groups_by_key, db_config)
+        generation_columns = [group['representative'] for column_key, group in groups_by_key.items()
+                              if column_key not in reused]
         
         results = []
-        total_columns = len(all_columns_data)
+        for column_key, result in reused.items():
+            results.extend(fan_out(groups_by_key[column_key], result))
+        generated = []
+        total_columns = len(generation_columns)
         processed_columns = 0
         
-        logger.info(f"Processing {total_columns} columns from {len(data_dict)} tables")
+        logger.info(f"Processing {total_columns} distinct columns from {len(data_dict)} tables")
         
-        # Process columns in batches
-        for i in range(0, total_columns, OLLAMA_CONFIG['batch_size']):
-            batch = all_columns_data[i:i + OLLAMA_CONFIG['batch_size']]
-            batch_num = i // OLLAMA_CONFIG['batch_size'] + 1
-            total_batches = (total_columns + OLLAMA_CONFIG['batch_size'] - 1) // OLLAMA_CONFIG['batch_size']
-            
-            logger.info(f"Processing batch {batch_num}/{total_batches} with {len(batch)} columns")
-            
-            batch_descriptions = OllamaClient.generate_descriptions_batch(batch)
-            
-            for table_name, column_info, sample_values in batch:
-                column_key = f"{table_name}.{column_info['COLUMN_NAME']}"
-                description = batch_descriptions.get(column_key, "")
-                parsed = OllamaClient.parse_markdown_description(description)
-                
-                result = {
-                    'table_name': table_name,
-                    'column_name': column_info['COLUMN_NAME'],
-                    'business_purpose': parsed.get('business_purpose', ''),
-                    'data_quality_rules': parsed.get('data_quality_rules', ''),
-                    'example_usage': parsed.get('example_usage', ''),
-                    'issues': parsed.get('issues', '')
-                }
-                results.append(result)
-                
-                logger.debug(f"Processed {table_name}.{column_info['COLUMN_NAME']}: "
-                           f"business_purpose={bool(result['business_purpose'])}, "
-                           f"data_quality_rules={bool(result['data_quality_rules'])}, "
-                           f"example_usage={bool(result['example_usage'])}, "
-                           f"issues={bool(result['issues'])}")
-            
-            processed_columns += len(batch)
-            logger.info(f"Processed {processed_columns}/{total_columns} columns ({processed_columns/total_columns*100:.1f}%)")
-            
-            # Add a small delay between batches
-            if i + OLLAMA_CONFIG['batch_size'] < total_columns:
-                time.sleep(1)
+        # Keep one batch in flight per backend slot; the router spreads them across hosts
+        workers = max(1, len(OllamaClient.get_router().backends) * OLLAMA_CONFIG['parallel_per_backend'])
+        
+        def collect(done_futures):
+            nonlocal processed_columns
+            for future in done_futures:
+                batch, batch_descriptions = future.result()
+                for table_name, column_info, sample_values in batch:
+                    column_key = f"{table_name}.{column_info['COLUMN_NAME']}"
+                    description = batch_descriptions.get(column_key, "")
+                    result = cls.build_result(table_name, column_info, description)
+                    generated.append(((table_name, column_info, sample_values), result))
+                    results.extend(fan_out(groups_by_key[column_key], result))
+                processed_columns += len(batch)
+                logger.info(f"Processed {processed_columns}/{total_columns} columns ({processed_columns/total_columns*100:.1f}%)")
+        
+        # Process columns in batches; each batch is sized when a worker frees up
+        # so the adaptive batcher learns from the batches that already finished
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            in_flight = set()
+            for batch_num, batch in enumerate(OllamaClient.iter_batches(generation_columns), start=1):
+                if cancel_event is not None and cancel_event.is_set():
+                    logger.info(f"Generation cancelled before batch {batch_num}")
+                    break
+                logger.info(f"Submitting batch {batch_num} with {len(batch)} columns")
+                # Workers inherit the caller's priority and tenant for the LLM queue
+                in_flight.add(executor.submit(contextvars.copy_context().run,
+                                              lambda batch=batch: (batch, OllamaClient.generate_batch(batch))))
+                if len(in_flight) >= workers:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+            collect(wait(in_flight).done)
         
         # Save to database
         cls.save_descriptions_to_db(results, db_config)
+        cls.index_generated_descriptions(generated)
         
         logger.info("=" * 60)
-        logger.info(f"COMPLETED PROCESSING {total_columns} COLUMNS")
+        logger.info(f"COMPLETED PROCESSING {total_columns} DISTINCT OF {len(all_columns_data)} COLUMNS")
         logger.info(f"Generated {len(results)} descriptions")
         logger.info("=" * 60)
         
         return results
 
+    @classmethod
+    def stream_column_descriptions_for_tables(cls, data_dict: Dict[str, pd.DataFrame],
+                                             connection_string: str,
+                                             db_type: str,
+                                             schema_name: str = None) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming variant of generate_column_descriptions_for_tables.
+        Yields each column_descriptions row as soon as the model finishes it and
+        saves the full result set to the database once the stream is exhausted.
+        """
+        logger.info(f"Streaming column descriptions (db_type={db_type}, schema={schema_name})")
+        
+        db_config = cls.parse_connection_string(connection_string)
+        
+        if not data_dict or not isinstance(data_dict, dict):
+            logger.error(f"Invalid data_dict: expected dict, got {type(data_dict)}")
+            return
+        
+        all_columns_data = cls.prepare_column_data(data_dict)
+        if not all_columns_data:
+            logger.warning("No column data to process")
+            return
+        
+        cls.ensure_descriptions_table(db_config)
+        OllamaClient.warmup()
+        
+        groups_by_key = cls.group_duplicate_columns(all_columns_data)
+        reused = cls.reuse_indexed_descriptions(groups_by_key, db_config)
+        generation_columns = [group['representative'] for column_key, group in groups_by_key.items()
+                              if column_key not in reused]
+        
+        results = []
+        generated = []
+        total_columns = len(all_columns_data)
+        
+        # Reused descriptions need no model call, so they go out first
+        for column_key, result in reused.items():
+            for row in fan_out(groups_by_key[column_key], result):
+                results.append(row)
+                yield row
+        
+        for batch in OllamaClient.iter_batches(generation_columns):
+            for column_key, description in OllamaClient.stream_descriptions_batch(batch):
+                representative = groups_by_key[column_key]['representative']
+                table_name, column_info, _ = representative
+                result = cls.build_result(table_name, column_info, description)
+                generated.append((representative, result))
+                for row in fan_out(groups_by_key[column_key], result):
+                    results.append(row)
+                    yield row
+            
+            logger.info(f"Streamed {len(results)}/{total_columns} columns")
+        
+        cls.save_descriptions_to_db(results, db_config)
+        cls.index_generated_descriptions(generated)
+        logger.info(f"Completed streaming {len(results)} descriptions")
+
 # Cleanup on application exit
 import atexit
 atexit.register(DatabaseConnection.close_all)
 
+get_write_behind().register(
+    'column_descriptions', DataDictionaryGenerator.write_queued_descriptions,
+    key=lambda item: (json.dumps(item['db_config'], sort_keys=True),
+                      item['description']['table_name'], item['description']['column_name'])
+)
+
+
+def _reset_after_fork():
+    # A forked worker builds its own router and database connections on first use
+    OllamaClient._router = None
+    OllamaClient._router_lock = threading.Lock()
+    DatabaseConnection._pools = {}
+    DatabaseConnection._lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,95 @@
+import csv
+import io
+import logging
+import time
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+BULK_CONFIG = {
+    # Rows sent per executemany / execute_values / COPY call
+    'chunk_rows': 5000,
+    # Rows per VALUES list for Redshift, which caps statement size at 16 MB
+    'redshift_page_rows': 1000
+}
+
+
+def _rows(df: pd.DataFrame):
+    """DataFrame rows as tuples of plain Python values, with NaN/NaT as None"""
+    values = df.astype(object).where(df.notna(), None)
+    return [tuple(value.item() if hasattr(value, 'item') else value for value in row)
+            for row in values.itertuples(index=False, name=None)]
+
+
+def _qualified(table_name, schema, quote):
+    name = quote(table_name)
+    return f"{quote(schema)}.{name}" if schema else name
+
+
+def _write_mssql(cursor, target, columns, rows, chunk_rows):
+    # fast_executemany sends each chunk as one parameter array instead of a round trip per row
+    cursor.fast_executemany = True
+    query = f"INSERT INTO {target} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})"
+    for start in range(0, len(rows), chunk_rows):
+        cursor.executemany(query, rows[start:start + chunk_rows])
+
+
+def _write_postgres_copy(cursor, target, columns, rows, chunk_rows):
+    query = f"COPY {target} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    for start in range(0, len(rows), chunk_rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows[start:start + chunk_rows]:
+            writer.writerow(['\\N' if value is None else value for value in row])
+        buffer.seek(0)
+        cursor.copy_expert(query, buffer)
+
+
+def _write_execute_values(cursor, target, columns, rows, chunk_rows):
+    from psycopg2.extras import execute_values
+    query = f"INSERT INTO {target} ({', '.join(columns)}) VALUES %s"
+    for start in range(0, len(rows), chunk_rows):
+        execute_values(cursor, query, rows[start:start + chunk_rows], page_size=BULK_CONFIG['redshift_page_rows'])
+
+
+def bulk_insert(conn, table_name: str, df: pd.DataFrame, schema: str = None, redshift: bool = False) -> int:
+    """
+    Append `df` to `table_name` on an open SQLAlchemy connection, using the
+    fastest path the target supports. The caller owns the transaction.
+
+    - SQL Server: pyodbc executemany with fast_executemany
+    - PostgreSQL: COPY FROM STDIN in CSV
+    - Redshift (no COPY from a client stream): psycopg2 execute_values
+    - anything else: multi-row INSERTs through DataFrame.to_sql
+
+    Returns:
+    - int: number of rows written.
+    """
+    if df.empty:
+        return 0
+
+    started = time.perf_counter()
+    chunk_rows = BULK_CONFIG['chunk_rows']
+    dialect = conn.dialect.name
+    if dialect not in ('mssql', 'postgresql'):
+        df.to_sql(table_name, conn, schema=schema, if_exists='append', index=False,
+                  method='multi', chunksize=chunk_rows)
+    else:
+        quote = conn.dialect.identifier_preparer.quote
+        target = _qualified(table_name, schema, quote)
+        columns = [quote(str(column)) for column in df.columns]
+        rows = _rows(df)
+        cursor = conn.connection.cursor()
+        try:
+            if dialect == 'mssql':
+                _write_mssql(cursor, target, columns, rows, chunk_rows)
+            elif redshift:
+                _write_execute_values(cursor, target, columns, rows, chunk_rows)
+            else:
+                _write_postgres_copy(cursor, target, columns, rows, chunk_rows)
+        finally:
+            cursor.close()
+
+    logger.info(f"Bulk wrote {len(df)} rows to {table_name} in {time.perf_counter() - started:.2f}s")
+    return len(df)
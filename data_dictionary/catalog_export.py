@@ -0,0 +1,181 @@
+import argparse
+import csv
+import io
+import json
+import logging
+import sys
+from typing import Dict, List, Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CONFIG = {
+    # Rows fetched from the server-side cursor and encoded per chunk (one Parquet row group)
+    'chunk_rows': 5000
+}
+
+EXPORT_COLUMNS = ('table_name', 'column_name', 'business_purpose', 'data_quality_rules',
+                  'example_usage', 'issues', 'updated_at')
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet')
+}
+
+
+def catalog_query(table: Optional[str] = None):
+    """SELECT over column_descriptions; `table` is an exact name or a pattern with * wildcards"""
+    query = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM column_descriptions"
+    params = ()
+    if table:
+        if '*' in table:
+            query += " WHERE table_name LIKE %s"
+            params = (table.replace('%', r'\%').replace('_', r'\_').replace('*', '%'),)
+        else:
+            query += " WHERE table_name = %s"
+            params = (table,)
+    # Served by the (table_name, column_name) unique key, so no sort buffer
+    return query + " ORDER BY table_name, column_name", params
+
+
+def iter_catalog(db_config: Dict[str, Any], database: Optional[str] = None,
+                 table: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield the catalog in chunks of `chunk_rows` row dicts. The rows stream from
+    an unbuffered (server-side) cursor, so memory stays flat however large the
+    catalog is. `database` overrides the database holding the catalog. A consumer
+    that stops early (a client disconnect) closes the connection rather than
+    reading the rest of the result.
+    """
+    from .ai_service_new import DatabaseConnection
+
+    if database:
+        db_config = {**db_config, 'database': database}
+    query, params = catalog_query(table)
+    with DatabaseConnection.connection(db_config) as conn:
+        cursor = conn.cursor(dictionary=True, buffered=False)
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(EXPORT_CONFIG['chunk_rows'])
+                if not rows:
+                    break
+                yield rows
+        except BaseException:
+            # Stopped early, e.g. the client disconnected (GeneratorExit): draining up to the
+            # whole catalog just to reuse the connection costs more than opening a new one
+            DatabaseConnection.discard(conn)
+            raise
+        finally:
+            if not getattr(conn, 'discarded', False):
+                cursor.close()
+
+
+def iter_ndjson(chunks: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    for rows in chunks:
+        yield ''.join(json.dumps(row, default=str) + '\n' for row in rows).encode('utf-8')
+
+
+def iter_csv(chunks: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only stream whose contents are drained after every row group"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+
+def iter_parquet(chunks: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    """One Parquet row group per chunk; the footer follows the last one"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(column, pa.string()) for column in EXPORT_COLUMNS[:-1]]
+                       + [('updated_at', pa.timestamp('s'))])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for rows in chunks:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_catalog(db_config: Dict[str, Any], output_format: str = 'ndjson',
+                   database: Optional[str] = None, table: Optional[str] = None) -> Iterator[bytes]:
+    """
+    Encoded catalog export as a byte stream, ready for a streaming response or a file.
+    Parquet needs pyarrow; without it a RuntimeError is raised before streaming starts.
+    """
+    if output_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format {output_format!r}; use one of {', '.join(EXPORT_FORMATS)}")
+    if output_format == 'parquet':
+        # Fail before the response starts rather than halfway through it
+        _require_pyarrow()
+    encode = {'ndjson': iter_ndjson, 'csv': iter_csv, 'parquet': iter_parquet}[output_format]
+    return encode(iter_catalog(db_config, database=database, table=table))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the column_descriptions catalog")
+    parser.add_argument('--conn-str', default='', help="mysql+pymysql:// connection string of the catalog database")
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='ndjson')
+    parser.add_argument('--database', help="database holding the catalog, overriding the connection string")
+    parser.add_argument('--table', help="table name, or a pattern with * wildcards")
+    parser.add_argument('-o', '--output', help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    from .ai_service_new import DataDictionaryGenerator
+    db_config = DataDictionaryGenerator.parse_connection_string(args.conn_str)
+    stream = export_catalog(db_config, args.format, database=args.database, table=args.table)
+
+    output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for chunk in stream:
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Any, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = {
+    'path': 'catalog_search.db',
+    'page_size': 20,
+    'max_page_size': 100,
+    # bm25 weights per indexed field: a hit in a column name outranks one in the rules
+    'weights': {'table_name': 5.0, 'column_name': 10.0, 'business_purpose': 2.0, 'data_quality_rules': 1.0}
+}
+
+INDEXED_FIELDS = ('table_name', 'column_name', 'business_purpose', 'data_quality_rules')
+
+
+def catalog_source(db_config: Dict[str, Any]) -> str:
+    """Name of the catalog a description belongs to: host:port/database"""
+    return f"{db_config.get('host', 'localhost')}:{db_config.get('port') or 3306}/{db_config.get('database', '')}"
+
+
+def build_match_query(text: str) -> Optional[str]:
+    """
+    FTS5 query for user input: every word must match, each as a prefix, so
+    'cust addr' finds customer_address. Returns None when nothing is searchable.
+    """
+    words = re.findall(r'\w+', text.lower())
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+class CatalogSearchIndex:
+    """
+    SQLite FTS5 index over the column description catalog.
+
+    Entries live in a plain table keyed by (source, table, column); an
+    external-content FTS5 table over it is kept in sync by triggers, so an
+    upsert re-indexes only the rows it touches. The unicode61 tokenizer splits
+    on underscores, so column name parts match on their own. A source is
+    marked in backfilled_sources once all its stored descriptions have been
+    indexed; entries written before that (new descriptions saved since
+    startup) don't count as a backfill.
+    """
+
+    def __init__(self, path: str = SEARCH_CONFIG['path']):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(f"""
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    {', '.join(f'{field} TEXT' for field in INDEXED_FIELDS)},
+                    example_usage TEXT,
+                    issues TEXT,
+                    UNIQUE (source, table_name, column_name)
+                );
+                CREATE TABLE IF NOT EXISTS backfilled_sources (
+                    source TEXT PRIMARY KEY,
+                    entries INTEGER NOT NULL,
+                    backfilled_at REAL NOT NULL
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+                    {', '.join(INDEXED_FIELDS)},
+                    content='entries', content_rowid='id', tokenize='unicode61'
+                );
+                CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+                    INSERT INTO entries_fts (rowid, {', '.join(INDEXED_FIELDS)})
+                    VALUES (new.id, {', '.join(f'new.{field}' for field in INDEXED_FIELDS)});
+                END;
+                CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+                    INSERT INTO entries_fts (entries_fts, rowid, {', '.join(INDEXED_FIELDS)})
+                    VALUES ('delete', old.id, {', '.join(f'old.{field}' for field in INDEXED_FIELDS)});
+                END;
+                CREATE TRIGGER IF NOT EXISTS entries_au AFTER UPDATE ON entries BEGIN
+                    INSERT INTO entries_fts (entries_fts, rowid, {', '.join(INDEXED_FIELDS)})
+                    VALUES ('delete', old.id, {', '.join(f'old.{field}' for field in INDEXED_FIELDS)});
+                    INSERT INTO entries_fts (rowid, {', '.join(INDEXED_FIELDS)})
+                    VALUES (new.id, {', '.join(f'new.{field}' for field in INDEXED_FIELDS)});
+                END;
+            """)
+
+    def upsert(self, source: str, descriptions: Iterable[Dict[str, Any]]) -> int:
+        """Add or replace the entries for these (table, column) descriptions of `source`"""
+        rows = [
+            (source, description['table_name'], description['column_name'],
+             description.get('business_purpose'), description.get('data_quality_rules'),
+             description.get('example_usage'), description.get('issues'))
+            for description in descriptions
+        ]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany("""
+                INSERT INTO entries (source, table_name, column_name, business_purpose,
+                                     data_quality_rules, example_usage, issues)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (source, table_name, column_name) DO UPDATE SET
+                    business_purpose = excluded.business_purpose,
+                    data_quality_rules = excluded.data_quality_rules,
+                    example_usage = excluded.example_usage,
+                    issues = excluded.issues
+            """, rows)
+        return len(rows)
+
+    def count(self, source: Optional[str] = None) -> int:
+        with self._lock:
+            if source is None:
+                return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM entries WHERE source = ?", (source,)).fetchone()[0]
+
+    def search(self, text: str, page: int = 1, page_size: Optional[int] = None,
+               source: Optional[str] = None, table: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Ranked prefix search. Returns one page of matches, best first, with the
+        total match count.
+        """
+        page = max(int(page), 1)
+        page_size = min(int(page_size or SEARCH_CONFIG['page_size']), SEARCH_CONFIG['max_page_size'])
+        result = {'query': text, 'page': page, 'page_size': page_size, 'total': 0, 'results': []}
+        match = build_match_query(text)
+        if match is None:
+            return result
+
+        filters, params = '', [match]
+        if source:
+            filters += " AND e.source = ?"
+            params.append(source)
+        if table:
+            filters += " AND e.table_name = ?"
+            params.append(table)
+        weights = ', '.join(str(SEARCH_CONFIG['weights'][field]) for field in INDEXED_FIELDS)
+
+        started = time.perf_counter()
+        with self._lock:
+            try:
+                result['total'] = self._conn.execute(f"""
+                    SELECT COUNT(*) FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid
+                    WHERE entries_fts MATCH ?{filters}
+                """, params).fetchone()[0]
+                rows = self._conn.execute(f"""
+                    SELECT e.source, e.table_name, e.column_name, e.business_purpose,
+                           e.data_quality_rules, e.example_usage, e.issues,
+                           bm25(entries_fts, {weights}) AS score
+                    FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid
+                    WHERE entries_fts MATCH ?{filters}
+                    ORDER BY score
+                    LIMIT ? OFFSET ?
+                """, params + [page_size, (page - 1) * page_size]).fetchall()
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Catalog search for {text!r} failed: {e}")
+                return result
+
+        # bm25() is lower-is-better; report a positive relevance instead
+        result['results'] = [{**dict(row), 'score': round(-row['score'], 4)} for row in rows]
+        result['seconds'] = round(time.perf_counter() - started, 4)
+        return result
+
+    def rebuild_source(self, db_config: Dict[str, Any]) -> int:
+        """(Re)index every stored description of a catalog database, streaming it in chunks"""
+        from .catalog_export import iter_catalog
+
+        source = catalog_source(db_config)
+        indexed = 0
+        for rows in iter_catalog(db_config):
+            indexed += self.upsert(source, rows)
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO backfilled_sources (source, entries, backfilled_at) "
+                               "VALUES (?, ?, ?)", (source, indexed, time.time()))
+        logger.info(f"Indexed {indexed} catalog entries for {source}")
+        return indexed
+
+    def is_backfilled(self, source: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM backfilled_sources WHERE source = ?",
+                                      (source,)).fetchone() is not None
+
+    def ensure_source(self, db_config: Dict[str, Any]):
+        """Index a catalog database's stored descriptions the first time it is searched"""
+        if not self.is_backfilled(catalog_source(db_config)):
+            self.rebuild_source(db_config)
+
+
+_search_index = None
+_search_index_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # SQLite connections must not cross a fork; the child reopens the index
+    global _search_index, _search_index_lock
+    _search_index = None
+    _search_index_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_catalog_search() -> CatalogSearchIndex:
+    """The process-wide catalog search index, opened on first use"""
+    global _search_index
+    with _search_index_lock:
+        if _search_index is None:
+            _search_index = CatalogSearchIndex()
+        return _search_index
+
+
+def index_descriptions(db_config: Dict[str, Any], descriptions: List[Dict[str, Any]]):
+    """Keep the search index in step with an upsert into a catalog database"""
+    try:
+        get_catalog_search().upsert(catalog_source(db_config), descriptions)
+    except Exception as e:
+        logger.warning(f"Could not update the catalog search index: {e}")
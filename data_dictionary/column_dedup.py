@@ -0,0 +1,164 @@
+import logging
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Any, Tuple, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+ColumnData = Tuple[str, Dict[str, Any], List[Any]]
+OverrideHook = Callable[[str, Dict[str, Any], Dict[str, Any]], Optional[Dict[str, Any]]]
+
+_overrides: List[OverrideHook] = []
+_overrides_lock = threading.Lock()
+
+
+def normalize_column_name(name: str) -> str:
+    """Normalize a column name so CreatedAt, created_at and CREATED-AT compare equal"""
+    name = re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', str(name))
+    name = re.sub(r'[^0-9a-zA-Z]+', '_', name).strip('_').lower()
+    return re.sub(r'_+', '_', name)
+
+
+def dtype_family(dtype: str) -> str:
+    """Collapse pandas/SQL type names into a coarse family"""
+    dtype = str(dtype).lower()
+    if 'bool' in dtype or dtype == 'bit':
+        return 'boolean'
+    if 'int' in dtype:
+        return 'integer'
+    if any(token in dtype for token in ('float', 'double', 'decimal', 'numeric', 'real', 'money')):
+        return 'decimal'
+    if any(token in dtype for token in ('date', 'time')):
+        return 'temporal'
+    return 'text'
+
+
+def value_shape(value: Any) -> str:
+    """Character-class shape of a value with runs collapsed, e.g. 'INV-00042' -> 'A-9'"""
+    shape = re.sub(r'[A-Za-z]+', 'A', str(value))
+    shape = re.sub(r'[0-9]+', '9', shape)
+    return shape[:20]
+
+
+def sample_signature(sample_values: List[Any]) -> Tuple[str, ...]:
+    """The most common value shapes among the samples"""
+    shapes = Counter(value_shape(value) for value in sample_values[:5])
+    return tuple(sorted(shape for shape, _ in shapes.most_common(2)))
+
+
+def column_signature(column: ColumnData) -> Tuple[str, str, Tuple[str, ...]]:
+    """Grouping key: normalized name, dtype family and sample-value signature"""
+    _, column_info, sample_values = column
+    return (
+        normalize_column_name(column_info['COLUMN_NAME']),
+        dtype_family(column_info['DATA_TYPE']),
+        sample_signature(sample_values)
+    )
+
+
+def group_columns(columns_data: List[ColumnData]) -> List[Dict[str, Any]]:
+    """
+    Group equivalent columns across tables.
+
+    Returns:
+    - list: One dict per group with 'signature', 'representative' (the column
+      sent to the LLM) and 'members' (every column sharing the description).
+    """
+    groups = {}
+    for column in columns_data:
+        signature = column_signature(column)
+        if signature not in groups:
+            groups[signature] = {'signature': signature, 'representative': column, 'members': []}
+        groups[signature]['members'].append(column)
+
+    logger.info(f"Deduplicated {len(columns_data)} columns into {len(groups)} groups")
+    return list(groups.values())
+
+
+def register_override(hook: OverrideHook):
+    """
+    Register a table-specific override hook.
+
+    The hook is called as hook(table_name, column_info, result) for every fanned
+    out column and may return a dict of fields to replace, or None to keep the
+    shared description.
+    """
+    with _overrides_lock:
+        _overrides.append(hook)
+
+
+def apply_overrides(table_name: str, column_info: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    """Run the registered override hooks over one result row"""
+    with _overrides_lock:
+        hooks = list(_overrides)
+    for hook in hooks:
+        try:
+            changes = hook(table_name, column_info, result)
+            if changes:
+                result.update(changes)
+        except Exception as e:
+            logger.warning(f"Override hook {getattr(hook, '__name__', hook)} failed for "
+                           f"{table_name}.{column_info['COLUMN_NAME']}: {e}")
+    return result
+
+
+# A bare or quoted (`x`, "x", [x]) SQL identifier
+_IDENTIFIER = r'(?:`[^`]+`|"[^"]+"|\[[^\]]+\]|\w+)'
+_QUALIFIED = re.compile(rf'(?<![\w.`"\]])({_IDENTIFIER})\.({_IDENTIFIER})')
+
+
+def _unquote(token: str) -> str:
+    return token[1:-1] if token[:1] in '`"[' else token
+
+
+def _requote(token: str, name: str) -> str:
+    return f"{token[0]}{name}{token[-1]}" if token[:1] in '`"[' else name
+
+
+def rewrite_references(text: str, from_table: str, from_column: str, to_table: str, to_column: str) -> str:
+    """
+    Rewrite identifier references to from_table/from_column in description text.
+    Only qualified names (orders.status) and quoted identifiers (`orders`) are
+    rewritten; bare words are prose ("Tracks orders placed...") and left alone.
+    """
+    def qualified(match):
+        table, column = match.groups()
+        if _unquote(table) != from_table:
+            return match.group(0)
+        if _unquote(column) == from_column:
+            column = _requote(column, to_column)
+        return f"{_requote(table, to_table)}.{column}"
+
+    text = _QUALIFIED.sub(qualified, text)
+    for old, new in ((from_table, to_table), (from_column, to_column)):
+        if old == new:
+            continue
+        for opening, closing in (('`', '`'), ('"', '"'), ('[', ']')):
+            pattern = re.compile(rf'(?<!\.){re.escape(opening + old + closing)}(?!\.)')
+            text = pattern.sub(lambda match: opening + new + closing, text)
+    return text
+
+
+def adapt_result(result: Dict[str, Any], from_table: str, from_column: str,
+                 to_table: str, to_column: str) -> Dict[str, Any]:
+    """Copy a result row to another column, rewriting qualified and quoted references in the text"""
+    row = dict(result)
+    row['table_name'] = to_table
+    row['column_name'] = to_column
+    if (str(from_table), str(from_column)) == (str(to_table), str(to_column)):
+        return row
+    for key, value in row.items():
+        if key not in ('table_name', 'column_name') and isinstance(value, str):
+            row[key] = rewrite_references(value, str(from_table), str(from_column), str(to_table), str(to_column))
+    return row
+
+
+def fan_out(group: Dict[str, Any], result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Copy the representative's result row to every member of its group"""
+    rep_table, rep_info, _ = group['representative']
+    rows = []
+    for table_name, column_info, _ in group['members']:
+        row = adapt_result(result, rep_table, rep_info['COLUMN_NAME'], table_name, column_info['COLUMN_NAME'])
+        rows.append(apply_overrides(table_name, column_info, row))
+    return rows
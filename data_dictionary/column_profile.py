@@ -0,0 +1,137 @@
+import logging
+import re
+from typing import Dict, List, Any, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PROFILE_CONFIG = {
+    # Rows profiled per column; enough for stable ratios without scanning huge frames
+    'max_rows': 1000,
+    'exemplars': 2,
+    'exemplar_chars': 30,
+    'max_shapes': 2,
+    'shape_chars': 24,
+    # Unique integers only mark an identifier without a name hint once the sample is this large
+    'identifier_min_rows': 100
+}
+
+# Checked in order; the first type matched by most non-null values wins
+SEMANTIC_PATTERNS = (
+    ('email', r'^[^@\s]+@[^@\s]+\.[A-Za-z]{2,}$'),
+    ('url', r'^(?:https?|ftp)://\S+$'),
+    ('uuid', r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$'),
+    ('ip_address', r'^(?:\d{1,3}\.){3}\d{1,3}$'),
+    ('date', r'^\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?'),
+    ('date', r'^\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}$'),
+    ('phone', r'^\+?[\d\s().-]{7,20}$'),
+    ('postal_code', r'^(?:\d{5}(?:-\d{4})?|[A-Za-z]\d[A-Za-z] ?\d[A-Za-z]\d|[A-Za-z]{1,2}\d[A-Za-z\d]? ?\d[A-Za-z]{2})$'),
+    ('currency_amount', r'^[$€£¥]\s?-?[\d,]+(?:\.\d+)?$'),
+    ('boolean', r'^(?i:true|false|yes|no|y|n|t|f)$'),
+    ('json', r'^\s*[\[{].*[\]}]\s*$'),
+    ('code', r'^[A-Za-z0-9]+(?:[-_/.][A-Za-z0-9]+)+$'),
+)
+SEMANTIC_MATCH_RATIO = 0.8
+IDENTIFIER_NAME_WORDS = ('id', 'key', 'code', 'no', 'num')
+SHAPELESS_TYPES = ('free_text', 'json', 'binary')
+
+
+def _value_shapes(values: pd.Series) -> pd.Series:
+    """Length-preserving character-class shapes, e.g. 'INV-0042' -> 'AAA-9999'"""
+    shapes = values.str.slice(0, PROFILE_CONFIG['shape_chars'])
+    shapes = shapes.str.replace(r'[A-Za-z]', 'A', regex=True).str.replace(r'[0-9]', '9', regex=True)
+    truncated = values.str.len() > PROFILE_CONFIG['shape_chars']
+    return shapes.where(~truncated, shapes + '…')
+
+
+def _looks_like_identifier_name(name: Optional[str]) -> bool:
+    """True for names like 'id', 'customer_id', 'OrderKey' or 'region_code'"""
+    if not name:
+        return False
+    words = re.findall(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+', str(name))
+    return bool(words) and words[-1].lower() in IDENTIFIER_NAME_WORDS
+
+
+def infer_semantic_type(values: pd.Series, dtype: str, name: Optional[str] = None) -> str:
+    """
+    Semantic type of a column from its dtype and the string form of its values.
+
+    Unique integers are labelled 'identifier' only when the column name hints
+    at one or the sample is large enough that uniqueness is not a coincidence.
+    """
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'boolean'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'datetime'
+    if pd.api.types.is_numeric_dtype(dtype):
+        if pd.api.types.is_integer_dtype(dtype):
+            unique = values.is_unique and len(values) > 1
+            if unique and (_looks_like_identifier_name(name) or len(values) >= PROFILE_CONFIG['identifier_min_rows']):
+                return 'identifier'
+            return 'integer'
+        return 'decimal'
+    if values.empty:
+        return 'unknown'
+
+    for semantic_type, pattern in SEMANTIC_PATTERNS:
+        if values.str.match(pattern).mean() >= SEMANTIC_MATCH_RATIO:
+            return semantic_type
+    if values.str.fullmatch(r'-?\d+(?:\.\d+)?').mean() >= SEMANTIC_MATCH_RATIO:
+        return 'numeric_text'
+    if values.str.contains(r'\s').mean() >= 0.5 and values.str.len().median() > 30:
+        return 'free_text'
+    if values.str.match(r'^[\x00-\x08\x0e-\x1f]|^(?:[A-Za-z0-9+/]{4}){8,}={0,2}$').mean() >= SEMANTIC_MATCH_RATIO:
+        return 'binary'
+    return 'categorical' if values.nunique() <= max(10, len(values) // 20) else 'text'
+
+
+def profile_column(series: pd.Series) -> Dict[str, Any]:
+    """
+    Summarize a column for the prompt instead of sending raw sample values.
+
+    Returns:
+    - dict: semantic_type, shapes (most common value shapes), min/max length,
+      distinct_ratio, null_ratio and a few truncated exemplars.
+    """
+    series = series.head(PROFILE_CONFIG['max_rows'])
+    non_null = series.dropna()
+    values = non_null.astype(str)
+
+    profile = {
+        'semantic_type': infer_semantic_type(values, series.dtype, series.name),
+        'null_ratio': round(1 - len(non_null) / len(series), 3) if len(series) else 0.0,
+        'distinct_ratio': round(values.nunique() / len(values), 3) if len(values) else 0.0,
+        'shapes': [],
+        'min_length': None,
+        'max_length': None,
+        'exemplars': []
+    }
+    if values.empty:
+        return profile
+
+    lengths = values.str.len()
+    profile['min_length'] = int(lengths.min())
+    profile['max_length'] = int(lengths.max())
+    # Shapes of prose and blobs are noise; their type and length say enough
+    if profile['semantic_type'] not in SHAPELESS_TYPES:
+        profile['shapes'] = _value_shapes(values).value_counts().head(PROFILE_CONFIG['max_shapes']).index.tolist()
+
+    limit = PROFILE_CONFIG['exemplar_chars']
+    exemplars = values.drop_duplicates().head(PROFILE_CONFIG['exemplars'])
+    profile['exemplars'] = [value if len(value) <= limit else value[:limit] + '…' for value in exemplars]
+    return profile
+
+
+def format_profile(profile: Optional[Dict[str, Any]], sample_values: List[Any]) -> str:
+    """Prompt line for a column: the profile if one was computed, else the raw samples"""
+    if not profile:
+        return f"Sample Values: {sample_values[:5]}"
+    if profile['max_length'] is None:
+        return f"Profile: {profile['semantic_type']}; all values null"
+    length = (str(profile['min_length']) if profile['min_length'] == profile['max_length']
+              else f"{profile['min_length']}-{profile['max_length']}")
+    shape = f"shape {' | '.join(profile['shapes'])}; " if profile['shapes'] else ''
+    return (f"Profile: {profile['semantic_type']}; {shape}length {length}; "
+            f"distinct {profile['distinct_ratio']:.0%}; null {profile['null_ratio']:.0%}; "
+            f"e.g. {', '.join(profile['exemplars'])}")
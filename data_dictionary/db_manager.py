@@ -14,6 +14,8 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 class DBManager:
     """Manage database connections for SQL Server and Redshift."""
 
+    _engines = {}
+
     @staticmethod
     def get_connection(db_type='local'):
         """
@@ -53,7 +55,8 @@ class DBManager:
     @staticmethod
     def get_dictionary_storage(db_type='local'):
         """
-        Get SQLAlchemy engine for dictionary storage.
+        Get SQLAlchemy engine for dictionary storage. Engines are created once
+        per db_type and shared, so their connection pools are reused.
         
         Parameters:
         - db_type (str): 'local' for SQL Server, 'redshift' for Redshift.
@@ -61,15 +64,17 @@ class DBManager:
         Returns:
         - SQLAlchemy engine.
         """
+        engine = DBManager._engines.get(db_type)
+        if engine is not None:
+            return engine
         try:
             if db_type == 'local':
                 conn_str = (
                     f"mssql+pyodbc://{os.getenv('DB_SERVER')}/{os.getenv('DB_NAME')}"
                     f"?driver={os.getenv('DB_DRIVER').replace(' ', '+')}&Trusted_Connection=yes"
                 )
-                engine = create_engine(conn_str)
+                engine = create_engine(conn_str, fast_executemany=True)
                 logging.info(f"Created SQLAlchemy engine for SQL Server: {os.getenv('DB_NAME')}")
-                return engine
             else:  # Redshift
                 conn_str = (
                     f"postgresql+psycopg2://{os.getenv('REDSHIFT_USER')}:{os.getenv('REDSHIFT_PASSWORD')}"
@@ -77,7 +82,7 @@ class DBManager:
                 )
                 engine = create_engine(conn_str)
                 logging.info(f"Created SQLAlchemy engine for Redshift: {os.getenv('REDSHIFT_DATABASE')}")
-                return engine
+            return DBManager._engines.setdefault(db_type, engine)
         except Exception as e:
             logging.error(f"Error creating storage engine for {db_type}: {str(e)}")
             raise
\ No newline at end of file
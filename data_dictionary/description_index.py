@@ -0,0 +1,269 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Any, Tuple, Optional
+
+import numpy as np
+
+from llm import client as llm_client
+from .column_dedup import normalize_column_name, dtype_family, sample_signature, adapt_result
+
+logger = logging.getLogger(__name__)
+
+ColumnData = Tuple[str, Dict[str, Any], List[Any]]
+
+INDEX_DIR = 'description_index'
+INDEX_CONFIG = {
+    # 'ollama' uses the embeddings endpoint, 'hashing' a local n-gram stand-in
+    'embedder': os.getenv('DESCRIPTION_INDEX_EMBEDDER', 'ollama'),
+    'embed_url': f"{llm_client.OLLAMA_HOST}/api/embed",
+    'embed_model': os.getenv('OLLAMA_EMBED_MODEL', 'nomic-embed-text'),
+    'timeout': 30,
+    # Cosine similarity above which a stored description is reused
+    'reuse_threshold': 0.95
+}
+
+# Bump when column_signature_text or the entry traits change; a persisted index built with another version is discarded
+SIGNATURE_VERSION = 3
+
+DESCRIPTION_KEYS = ('business_purpose', 'data_quality_rules', 'example_usage', 'issues')
+
+
+def column_signature_text(column_name: str) -> str:
+    """
+    Text embedded for a column: its normalized name. Table names are left out
+    so matches work across tables; type and value shape are compared as entry
+    traits instead.
+    """
+    return f"column {normalize_column_name(column_name).replace('_', ' ')}"
+
+
+def description_entry(row: Dict[str, Any], data_type: Optional[str] = None,
+                      sample_values: Optional[List[Any]] = None) -> Dict[str, Any]:
+    """
+    Index entry for a description row. Generated rows record their type and
+    sample shapes as traits; rows loaded from column_descriptions only have the
+    type information_schema reports, if any.
+    """
+    entry = {**row, 'signature': column_signature_text(row['column_name'])}
+    if data_type:
+        entry['type_family'] = dtype_family(data_type)
+    if sample_values:
+        entry['shapes'] = list(sample_signature(sample_values))
+    return entry
+
+
+def _traits_match(entry: Dict[str, Any], data_type: Optional[str], sample_values: Optional[List[Any]]) -> bool:
+    """
+    The type family must be known on both sides and agree, since the name alone
+    can't tell an integer status from a text one. Sample shapes are only
+    compared when both the entry and the column have them.
+    """
+    if not entry.get('type_family') or not data_type or entry['type_family'] != dtype_family(data_type):
+        return False
+    if entry.get('shapes') and sample_values and set(entry['shapes']) != set(sample_signature(sample_values)):
+        return False
+    return True
+
+
+class HashingEmbedder:
+    """Deterministic character n-gram hashing embedder, used offline and in tests"""
+
+    name = 'hashing'
+
+    def __init__(self, dim: int = 256, ngram: int = 3):
+        self.dim = dim
+        self.ngram = ngram
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            padded = f" {text.lower()} "
+            for i in range(max(len(padded) - self.ngram + 1, 1)):
+                digest = hashlib.md5(padded[i:i + self.ngram].encode()).digest()
+                vectors[row, int.from_bytes(digest[:4], 'little') % self.dim] += 1.0
+        return vectors
+
+
+class OllamaEmbedder:
+    """Embeddings from Ollama's /api/embed endpoint"""
+
+    def __init__(self, url: str, model: str, timeout: int = 30):
+        self.url = url
+        self.model = model
+        self.timeout = timeout
+        self.name = f"ollama:{model}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        response = llm_client.post(self.url, {"model": self.model, "input": texts}, timeout=self.timeout)
+        if response.status_code != 200:
+            raise Exception(f"Ollama embed error: {response.status_code} {response.text}")
+        return np.asarray(response.json()['embeddings'], dtype=np.float32)
+
+
+class DescriptionIndex:
+    """
+    Brute-force cosine index over stored column descriptions.
+
+    Vectors are kept L2-normalized in one float32 matrix so a lookup is a single
+    matrix-vector product. Entries are keyed by 'table.column'; re-adding a key
+    replaces its vector. The index persists to `index_dir` as vectors.npy plus
+    entries.json and is discarded on load if the embedder changed.
+    """
+
+    def __init__(self, embedder, index_dir: str = INDEX_DIR):
+        self.embedder = embedder
+        self.index_dir = index_dir
+        self._vectors = None
+        self._entries = []
+        self._positions = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add(self, entries: List[Dict[str, Any]]):
+        """
+        Insert or replace entries. Each entry needs 'table_name', 'column_name',
+        'signature' (text to embed) and the description fields.
+        """
+        if not entries:
+            return
+        vectors = self._normalize(self.embedder.embed([entry['signature'] for entry in entries]))
+
+        with self._lock:
+            new_rows = []
+            for entry, vector in zip(entries, vectors):
+                key = f"{entry['table_name']}.{entry['column_name']}"
+                if key in self._positions:
+                    position = self._positions[key]
+                    self._entries[position] = entry
+                    self._vectors[position] = vector
+                else:
+                    self._positions[key] = len(self._entries)
+                    self._entries.append(entry)
+                    new_rows.append(vector)
+            if new_rows:
+                stacked = np.vstack(new_rows)
+                self._vectors = stacked if self._vectors is None else np.vstack([self._vectors, stacked])
+            self._dirty = True
+        logger.debug(f"Indexed {len(entries)} descriptions ({len(self._entries)} total)")
+
+    def search(self, signatures: List[str], k: int = 1) -> List[List[Tuple[float, Dict[str, Any]]]]:
+        """Top-k (similarity, entry) pairs for each signature"""
+        if not signatures:
+            return []
+        with self._lock:
+            if self._vectors is None or not self._entries:
+                return [[] for _ in signatures]
+            vectors, entries = self._vectors, list(self._entries)
+
+        queries = self._normalize(self.embedder.embed(signatures))
+        scores = queries @ vectors.T
+        k = min(k, len(entries))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+        results = []
+        for row, candidates in enumerate(top):
+            ranked = sorted(candidates, key=lambda index: -scores[row, index])
+            results.append([(float(scores[row, index]), entries[index]) for index in ranked])
+        return results
+
+    def find_reusable(self, columns: List[ColumnData], threshold: float) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up near-identical neighbours for columns.
+
+        Returns:
+        - dict: 'table.column' -> result row adapted from the neighbour, for every
+          column whose best match scores at least `threshold`.
+        """
+        signatures = [column_signature_text(column_info['COLUMN_NAME']) for _, column_info, _ in columns]
+        reused = {}
+        for (table_name, column_info, sample_values), matches in zip(columns, self.search(signatures, k=3)):
+            compatible = [(score, entry) for score, entry in matches
+                          if score >= threshold and _traits_match(entry, column_info.get('DATA_TYPE'), sample_values)]
+            if not compatible:
+                continue
+            score, entry = compatible[0]
+            column_key = f"{table_name}.{column_info['COLUMN_NAME']}"
+            source = {key: entry.get(key, '') for key in DESCRIPTION_KEYS}
+            reused[column_key] = adapt_result(source, entry['table_name'], entry['column_name'],
+                                              table_name, column_info['COLUMN_NAME'])
+            logger.debug(f"Reusing {entry['table_name']}.{entry['column_name']} for {column_key} (similarity {score:.3f})")
+        return reused
+
+    def save(self):
+        """Persist the index if it changed since the last save"""
+        with self._lock:
+            if not self._dirty or self._vectors is None:
+                return
+            os.makedirs(self.index_dir, exist_ok=True)
+            vectors_path = os.path.join(self.index_dir, 'vectors.npy')
+            entries_path = os.path.join(self.index_dir, 'entries.json')
+            # Write to temp files first so a crash never leaves a half-written index
+            with open(vectors_path + '.tmp', 'wb') as f:
+                np.save(f, self._vectors)
+            with open(entries_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump({'embedder': self.embedder.name, 'signature_version': SIGNATURE_VERSION,
+                           'entries': self._entries}, f)
+            os.replace(vectors_path + '.tmp', vectors_path)
+            os.replace(entries_path + '.tmp', entries_path)
+            self._dirty = False
+        logger.info(f"Saved description index with {len(self._entries)} entries to {self.index_dir}")
+
+    def load(self):
+        """Load a persisted index built with the same embedder"""
+        vectors_path = os.path.join(self.index_dir, 'vectors.npy')
+        entries_path = os.path.join(self.index_dir, 'entries.json')
+        if not (os.path.exists(vectors_path) and os.path.exists(entries_path)):
+            return
+        try:
+            with open(entries_path, encoding='utf-8') as f:
+                stored = json.load(f)
+            if stored.get('embedder') != self.embedder.name:
+                logger.warning(f"Description index was built with {stored.get('embedder')}, "
+                               f"not {self.embedder.name}; starting empty")
+                return
+            if stored.get('signature_version') != SIGNATURE_VERSION:
+                logger.warning("Description index was built with older column signatures; starting empty")
+                return
+            vectors = np.load(vectors_path)
+        except Exception as e:
+            logger.warning(f"Could not load description index: {e}")
+            return
+
+        with self._lock:
+            self._vectors = vectors
+            self._entries = stored['entries']
+            self._positions = {f"{entry['table_name']}.{entry['column_name']}": position
+                               for position, entry in enumerate(self._entries)}
+            self._dirty = False
+        logger.info(f"Loaded description index with {len(self._entries)} entries")
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_description_index() -> DescriptionIndex:
+    """Shared index for the configured embedder, loaded from disk on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            if INDEX_CONFIG['embedder'] == 'hashing':
+                embedder = HashingEmbedder()
+            else:
+                embedder = OllamaEmbedder(INDEX_CONFIG['embed_url'], INDEX_CONFIG['embed_model'],
+                                          INDEX_CONFIG['timeout'])
+            _index = DescriptionIndex(embedder)
+            _index.load()
+        return _index
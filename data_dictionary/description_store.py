@@ -0,0 +1,125 @@
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List, Any, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+STORE_CONFIG = {
+    # Rows per multi-row INSERT; keeps statements well under max_allowed_packet
+    'batch_rows': 1000,
+    # Catalogs at least this large are staged with LOAD DATA LOCAL INFILE when enabled
+    'load_data_threshold': 20000,
+    # Requires local_infile on the server; connections are opened with allow_local_infile
+    'load_data_local': False
+}
+
+DESCRIPTION_COLUMNS = ('table_name', 'column_name', 'business_purpose',
+                       'data_quality_rules', 'example_usage', 'issues')
+
+UPSERT_SUFFIX = """
+ON DUPLICATE KEY UPDATE
+business_purpose = VALUES(business_purpose),
+data_quality_rules = VALUES(data_quality_rules),
+example_usage = VALUES(example_usage),
+issues = VALUES(issues),
+updated_at = CURRENT_TIMESTAMP
+"""
+
+
+def description_rows(descriptions: Iterable[Dict[str, Any]]) -> List[Tuple[Any, ...]]:
+    """
+    Parameter tuples in DESCRIPTION_COLUMNS order, one per (table, column);
+    when a key repeats the last description wins.
+    """
+    rows = {}
+    for description in descriptions:
+        row = tuple(description.get(column) for column in DESCRIPTION_COLUMNS)
+        rows[row[:2]] = row
+    return list(rows.values())
+
+
+def _insert_batches(cursor, rows: List[Tuple[Any, ...]], batch_rows: int):
+    placeholders = '(' + ', '.join(['%s'] * len(DESCRIPTION_COLUMNS)) + ')'
+    for start in range(0, len(rows), batch_rows):
+        batch = rows[start:start + batch_rows]
+        query = (f"INSERT INTO column_descriptions ({', '.join(DESCRIPTION_COLUMNS)}) VALUES "
+                 + ', '.join([placeholders] * len(batch)) + UPSERT_SUFFIX)
+        cursor.execute(query, [value for row in batch for value in row])
+
+
+def _tsv_value(value: Any) -> str:
+    # LOAD DATA's default escaping: backslash escapes, \N for NULL
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r').replace('\0', '\\0'))
+
+
+def _load_staged(cursor, rows: List[Tuple[Any, ...]]):
+    """Stream rows into a temporary table with LOAD DATA, then upsert from it in one statement"""
+    cursor.execute("""
+        CREATE TEMPORARY TABLE IF NOT EXISTS column_descriptions_stage (
+            table_name VARCHAR(255) NOT NULL,
+            column_name VARCHAR(255) NOT NULL,
+            business_purpose TEXT,
+            data_quality_rules TEXT,
+            example_usage TEXT,
+            issues TEXT
+        ) DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """)
+    cursor.execute("TRUNCATE TABLE column_descriptions_stage")
+
+    handle, path = tempfile.mkstemp(prefix='column_descriptions_', suffix='.tsv')
+    try:
+        with os.fdopen(handle, 'w', encoding='utf-8', newline='') as f:
+            for row in rows:
+                f.write('\t'.join(_tsv_value(value) for value in row) + '\n')
+        cursor.execute(f"""
+            LOAD DATA LOCAL INFILE %s INTO TABLE column_descriptions_stage
+            CHARACTER SET utf8mb4
+            FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n'
+            ({', '.join(DESCRIPTION_COLUMNS)})
+        """, (path,))
+        cursor.execute(f"""
+            INSERT INTO column_descriptions ({', '.join(DESCRIPTION_COLUMNS)})
+            SELECT {', '.join(DESCRIPTION_COLUMNS)} FROM column_descriptions_stage
+        """ + UPSERT_SUFFIX)
+        cursor.execute("DROP TEMPORARY TABLE column_descriptions_stage")
+    finally:
+        os.unlink(path)
+
+
+def bulk_upsert_descriptions(conn, descriptions: Iterable[Dict[str, Any]]) -> int:
+    """
+    Upsert descriptions into column_descriptions in one transaction on `conn`.
+
+    Rows go out as multi-row INSERT ... ON DUPLICATE KEY UPDATE statements of
+    `batch_rows` rows, or through a LOAD DATA LOCAL INFILE staging table for
+    catalogs past `load_data_threshold` when `load_data_local` is enabled.
+    Rolls back and re-raises on failure. Returns the number of rows written.
+    """
+    rows = description_rows(descriptions)
+    if not rows:
+        return 0
+
+    started = time.perf_counter()
+    staged = STORE_CONFIG['load_data_local'] and len(rows) >= STORE_CONFIG['load_data_threshold']
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        if staged:
+            _load_staged(cursor, rows)
+        else:
+            _insert_batches(cursor, rows, STORE_CONFIG['batch_rows'])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    logger.info(f"Upserted {len(rows)} descriptions in {time.perf_counter() - started:.2f}s"
+                f"{' via LOAD DATA' if staged else ''}")
+    return len(rows)
@@ -0,0 +1,125 @@
+import logging
+import threading
+from typing import Dict, List, Any, Tuple
+
+from .column_profile import format_profile
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveBatcher:
+    """
+    Token-budget-aware batch sizing for LLM description calls.
+
+    Batches are packed until either the model context (prompt + expected
+    response tokens) or the target latency would be exceeded. Token rates and
+    response lengths are learned from the eval_count/eval_duration fields Ollama
+    returns; timeouts halve the batch ceiling and successes grow it back slowly.
+    """
+
+    # Fixed prompt text around the column blocks (instructions + format spec)
+    PROMPT_OVERHEAD_TOKENS = 250
+    # Labels repeated in every column block (Table:, Column:, Type:, ...)
+    COLUMN_OVERHEAD_CHARS = 80
+    CHARS_PER_TOKEN = 4.0
+    SMOOTHING = 0.3
+
+    def __init__(self, num_ctx: int = 4096, target_latency: float = 45.0,
+                 initial_batch_size: int = 4, max_batch_size: int = 16,
+                 response_tokens_per_column: float = 200.0):
+        self.num_ctx = num_ctx
+        self.target_latency = target_latency
+        self.max_batch_size = max_batch_size
+        self.batch_ceiling = max(1, min(initial_batch_size, max_batch_size))
+        self.response_tokens_per_column = response_tokens_per_column
+        # Tokens per second; None until observed
+        self.eval_rate = None
+        self.prompt_eval_rate = None
+        self._lock = threading.Lock()
+
+    def estimate_prompt_tokens(self, column: Tuple[str, Dict[str, Any], List[Any]]) -> int:
+        """Approximate prompt tokens contributed by one column block"""
+        table_name, column_info, sample_values = column
+        chars = (self.COLUMN_OVERHEAD_CHARS + len(str(table_name)) + len(str(column_info.get('COLUMN_NAME', '')))
+                 + len(str(column_info.get('DATA_TYPE', '')))
+                 + len(format_profile(column_info.get('PROFILE'), sample_values)))
+        return int(chars / self.CHARS_PER_TOKEN) + 1
+
+    def estimate_latency(self, prompt_tokens: int, response_tokens: float) -> float:
+        """Predicted seconds for a call, 0 while the rates are still unknown"""
+        latency = 0.0
+        if self.prompt_eval_rate:
+            latency += prompt_tokens / self.prompt_eval_rate
+        if self.eval_rate:
+            latency += response_tokens / self.eval_rate
+        return latency
+
+    def next_batch_size(self, columns: List[Tuple[str, Dict[str, Any], List[Any]]]) -> int:
+        """Number of leading columns from `columns` to send in the next call"""
+        with self._lock:
+            prompt_tokens = self.PROMPT_OVERHEAD_TOKENS
+            response_tokens = 0.0
+            size = 0
+            for column in columns[:self.batch_ceiling]:
+                prompt_tokens += self.estimate_prompt_tokens(column)
+                response_tokens += self.response_tokens_per_column
+                over_context = prompt_tokens + response_tokens > self.num_ctx
+                over_latency = self.estimate_latency(prompt_tokens, response_tokens) > self.target_latency
+                # Always send at least one column, even if it alone is over budget
+                if size and (over_context or over_latency):
+                    break
+                size += 1
+            return size
+
+    def num_predict(self, batch: List[Tuple[str, Dict[str, Any], List[Any]]]) -> int:
+        """Response token limit for a batch, with headroom over the learned average"""
+        with self._lock:
+            return int(self.response_tokens_per_column * len(batch) * 1.25) + 32
+
+    def _smooth(self, current, observed):
+        if current is None:
+            return observed
+        return (1 - self.SMOOTHING) * current + self.SMOOTHING * observed
+
+    def record(self, batch_size: int, response: Dict[str, Any]):
+        """Learn token rates and response lengths from an Ollama response body"""
+        eval_count = response.get('eval_count')
+        eval_duration = response.get('eval_duration')
+        prompt_eval_count = response.get('prompt_eval_count')
+        prompt_eval_duration = response.get('prompt_eval_duration')
+
+        with self._lock:
+            if eval_count and eval_duration:
+                # Ollama reports durations in nanoseconds
+                self.eval_rate = self._smooth(self.eval_rate, eval_count / (eval_duration / 1e9))
+                self.response_tokens_per_column = self._smooth(
+                    self.response_tokens_per_column, eval_count / max(batch_size, 1))
+            if prompt_eval_count and prompt_eval_duration:
+                self.prompt_eval_rate = self._smooth(
+                    self.prompt_eval_rate, prompt_eval_count / (prompt_eval_duration / 1e9))
+
+            # Additive increase once a batch at the ceiling succeeds
+            if batch_size >= self.batch_ceiling and self.batch_ceiling < self.max_batch_size:
+                self.batch_ceiling += 1
+
+            logger.debug(f"Batcher updated: ceiling={self.batch_ceiling}, eval_rate={self.eval_rate}, "
+                         f"prompt_eval_rate={self.prompt_eval_rate}, "
+                         f"response_tokens_per_column={self.response_tokens_per_column:.0f}")
+
+    def record_timeout(self, batch_size: int):
+        """Multiplicative decrease of the batch ceiling after a timeout"""
+        with self._lock:
+            self.batch_ceiling = max(1, min(self.batch_ceiling, batch_size) // 2)
+            logger.warning(f"Batch of {batch_size} timed out, batch ceiling reduced to {self.batch_ceiling}")
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(model: str, **kwargs) -> AdaptiveBatcher:
+    """Return the shared batcher for a model so learned rates carry across jobs"""
+    with _batchers_lock:
+        if model not in _batchers:
+            _batchers[model] = AdaptiveBatcher(**kwargs)
+        return _batchers[model]
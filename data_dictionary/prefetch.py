@@ -0,0 +1,188 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+
+from llm.request_queue import llm_request_context, raise_priority, BACKGROUND, INTERACTIVE
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_CONFIG = {
+    'enabled': True,
+    # Prefetch jobs share a small pool so they never crowd out interactive requests
+    'max_workers': 1,
+    # Finished results are served for this many seconds
+    'result_ttl': 900
+}
+
+
+def _form_value(value: Any) -> str:
+    # Values round-trip through hidden form fields, where None renders as 'None'
+    return '' if value in (None, 'None') else str(value)
+
+
+def selection_fingerprint(doservice_list: Dict[str, Any]) -> str:
+    """Identify a dictionary selection: connection, schema and the set of tables"""
+    key = {
+        'conn_str': _form_value(doservice_list.get('conn_str')),
+        'db_type': _form_value(doservice_list.get('db_type')),
+        'schema': _form_value(doservice_list.get('db_schema_name')),
+        'tables': sorted(str(table) for table in doservice_list.get('dict_tables') or [])
+    }
+    return hashlib.md5(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+class PrefetchJob:
+    """One speculative generation run for a selection"""
+
+    def __init__(self, fingerprint: str, owner: str, tenant: Optional[str] = None):
+        self.fingerprint = fingerprint
+        self.owner = owner
+        self.tenant = tenant
+        self.cancel_event = threading.Event()
+        self.done = threading.Event()
+        # Request context of the running job; None until a prefetch worker picks it up
+        self.request_context = None
+        self.start_lock = threading.Lock()
+        self.results = None
+        self.error = None
+        self.finished_at = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+
+class DescriptionPrefetcher:
+    """
+    Speculatively generates descriptions for the tables picked on the service
+    page, before the user asks for the dictionary.
+
+    Each owner (browser session) has at most one job. Starting a job for a
+    different selection cancels the previous one; the cancelled job stops
+    after its running batches, which still land in the prompt cache and the
+    database. The dictionary route claims a finished or running job for the
+    same selection instead of starting over: a running job is raised to
+    interactive priority and awaited, and one still waiting for a worker is
+    cancelled so the route generates directly.
+    """
+
+    def __init__(self, generate, max_workers: int = PREFETCH_CONFIG['max_workers']):
+        self.generate = generate
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dictionary-prefetch')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        now = time.monotonic()
+        for owner, job in list(self._jobs.items()):
+            if job.finished_at and now - job.finished_at > PREFETCH_CONFIG['result_ttl']:
+                del self._jobs[owner]
+
+    def start(self, owner: str, doservice_list: Dict[str, Any], data: Dict[str, Any],
+              tenant: Optional[str] = None) -> Optional[PrefetchJob]:
+        """Start prefetching for owner's selection, cancelling their previous one if it differs"""
+        if not PREFETCH_CONFIG['enabled'] or not doservice_list.get('dict_tables') or not data:
+            return None
+
+        fingerprint = selection_fingerprint(doservice_list)
+        with self._lock:
+            self._expire()
+            current = self._jobs.get(owner)
+            if current and current.fingerprint == fingerprint and not current.cancelled:
+                return current
+            if current:
+                current.cancel_event.set()
+                logger.info(f"Selection changed, cancelled prefetch {current.fingerprint[:8]}")
+            job = PrefetchJob(fingerprint, owner, tenant)
+            self._jobs[owner] = job
+
+        logger.info(f"Prefetching descriptions for {len(data)} tables ({fingerprint[:8]})")
+        self._executor.submit(self._run, job, doservice_list, data)
+        return job
+
+    def _run(self, job: PrefetchJob, doservice_list: Dict[str, Any], data: Dict[str, Any]):
+        try:
+            # Speculative work yields to every interactive and bulk LLM call
+            with llm_request_context(BACKGROUND, tenant=job.tenant) as context:
+                with job.start_lock:
+                    if job.cancelled:
+                        return
+                    job.request_context = context
+                job.results = self.generate(
+                    data_dict=data,
+                    connection_string=doservice_list['conn_str'],
+                    db_type=doservice_list['db_type'],
+                    schema_name=doservice_list['db_schema_name'],
+                    cancel_event=job.cancel_event
+                )
+        except Exception as e:
+            job.error = e
+            logger.warning(f"Prefetch {job.fingerprint[:8]} failed: {e}")
+        finally:
+            job.finished_at = time.monotonic()
+            job.done.set()
+
+    def cancel(self, owner: str):
+        with self._lock:
+            job = self._jobs.pop(owner, None)
+        if job:
+            job.cancel_event.set()
+
+    def claim(self, owner: str, doservice_list: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Results of owner's prefetch for this selection, waiting for it at
+        interactive priority if it is still running. Returns None when there
+        is no usable prefetch.
+        """
+        fingerprint = selection_fingerprint(doservice_list)
+        with self._lock:
+            job = self._jobs.get(owner)
+        if not job or job.fingerprint != fingerprint or job.cancelled:
+            return None
+
+        with job.start_lock:
+            if job.request_context is None and not job.done.is_set():
+                # Still queued behind other prefetches; generating directly is faster
+                job.cancel_event.set()
+                logger.info(f"Prefetch {fingerprint[:8]} had not started, generating directly")
+                return None
+        if not job.done.is_set():
+            logger.info(f"Waiting for running prefetch {fingerprint[:8]} at interactive priority")
+            raise_priority(job.request_context, INTERACTIVE)
+            job.done.wait()
+        if job.error is not None or job.cancelled or not job.results:
+            return None
+        logger.info(f"Serving {len(job.results)} prefetched descriptions ({fingerprint[:8]})")
+        return job.results
+
+    def status(self, owner: str) -> Dict[str, Any]:
+        with self._lock:
+            job = self._jobs.get(owner)
+        if not job:
+            return {'state': 'none'}
+        if job.cancelled:
+            state = 'cancelled'
+        elif not job.done.is_set():
+            state = 'running'
+        else:
+            state = 'failed' if job.error is not None else 'ready'
+        return {'state': state, 'fingerprint': job.fingerprint,
+                'columns': len(job.results) if job.results else 0}
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher() -> DescriptionPrefetcher:
+    """Shared prefetcher running DataDictionaryGenerator jobs"""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            from .ai_service_new import DataDictionaryGenerator
+            _prefetcher = DescriptionPrefetcher(DataDictionaryGenerator.generate_column_descriptions_for_tables)
+        return _prefetcher
@@ -2,9 +2,11 @@ import pandas as pd
 from datetime import datetime
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import inspect
 import logging
 from .db_manager import DBManager
+from .bulk_writer import bulk_insert
+from .write_behind import get_write_behind, PartialWrite
 import json
 load_dotenv()
 
@@ -71,41 +73,61 @@ def generate_quality_report(df, table_name, column_descriptions=None):
     
     return pd.DataFrame(report_data)
 
-def save_quality_report(report_df, db_type="local"):
+def save_quality_report(report_df, db_type="local", write_behind=False):
     """
     Save quality report to the pre-existing QualityReports table.
     
     Parameters:
     - report_df (pd.DataFrame): Data quality report DataFrame.
     - db_type (str): Database type ('local' for SQL Server, else Redshift).
+    - write_behind (bool): Queue the rows for the write-behind flusher instead
+      of writing them now (falls back to a direct write when it isn't running).
     """
-    conn = DBManager.get_connection(db_type)
-    cursor = conn.cursor()
+    if write_behind and not report_df.empty:
+        rows = json.loads(report_df.to_json(orient='records', date_format='iso'))
+        if get_write_behind().enqueue('quality_reports', [{'db_type': db_type, 'row': row} for row in rows]):
+            logging.info(f"Queued quality report for {report_df['TableName'].iloc[0]}")
+            return
+    
+    schema = 'IDIMDM' if db_type == 'local' else 'public'
+    engine = DBManager.get_dictionary_storage(db_type)
     
     try:
-        # Check table existence
-        schema = 'IDIMDM' if db_type == 'local' else 'public'
-        cursor.execute("SELECT 1 FROM sysobjects WHERE name = ? AND type = 'U'", ('QualityReports',))
-        if not cursor.fetchone():
-            logging.error("QualityReports table does not exist")
-            raise Exception("QualityReports table does not exist")
-        
-        # Create SQLAlchemy engine for bulk insert
-        conn_str = f"mssql+pyodbc://@{os.getenv('DB_SERVER')}/{os.getenv('DB_NAME')}?driver={os.getenv('DB_DRIVER')}&Trusted_Connection=yes"
-        engine = create_engine(conn_str)
+        # One transaction per report: the existence check and the bulk load
+        with engine.begin() as conn:
+            if not inspect(conn).has_table('QualityReports', schema=schema):
+                logging.error("QualityReports table does not exist")
+                raise Exception("QualityReports table does not exist")
+            
+            bulk_insert(conn, 'QualityReports', report_df, schema=schema, redshift=db_type != 'local')
         
-        # Save to QualityReports
-        report_df.to_sql('QualityReports', engine, schema=schema, if_exists='append', index=False)
-        
-        conn.commit()
         logging.info(f"Successfully saved quality report for {report_df['TableName'].iloc[0]}")
     
     except Exception as e:
-        conn.rollback()
         logging.error(f"Error saving quality report: {str(e)}")
         raise
-    finally:
-        conn.close()
+
+def write_queued_quality_rows(items):
+    """Write-behind writer: one bulk load per target database; a failing one doesn't stop the others"""
+    by_db_type = {}
+    for item in items:
+        by_db_type.setdefault(item['db_type'], []).append(item)
+    failed = []
+    for db_type, grouped in by_db_type.items():
+        try:
+            save_quality_report(pd.DataFrame([item['row'] for item in grouped]), db_type)
+        except Exception:
+            if len(by_db_type) == 1:
+                raise
+            failed.extend(grouped)
+    if failed:
+        raise PartialWrite(failed)
+
+def validate_queued_quality_row(item):
+    if item.get('db_type') is None or not isinstance(item.get('row'), dict):
+        raise ValueError("quality rows need a db_type and a row dict")
+
+get_write_behind().register('quality_reports', write_queued_quality_rows, validate=validate_queued_quality_row)
 
 def get_quality_history(table_name, db_type="local", limit=10):
     """
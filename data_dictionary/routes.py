@@ -1,5 +1,6 @@
-from flask import Blueprint, render_template, request, redirect, url_for,jsonify,session
+from flask import Blueprint, render_template, request, redirect, url_for,jsonify,session, Response, stream_with_context
 import logging
+import json
 from sqlalchemy import text
 import pandas as pd
 import os
@@ -9,6 +10,13 @@ from urllib.parse import quote_plus
 from .db_select import *
 from .ai_service_new import *
 from .quality_service import get_dq_rules
+from llm.metrics import metrics
+from .prefetch import get_prefetcher
+from llm.request_queue import llm_request_context, BULK
+from .write_behind import get_write_behind
+from .catalog_export import EXPORT_FORMATS, export_catalog
+from .catalog_search import get_catalog_search, catalog_source
+import uuid
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -191,6 +199,9 @@ def doservice():
     data=get_top_records(doservice_list)
     print("ran")
     print(data)
+    # Start generating descriptions while the user reviews the sample data
+    if generate_dict_tables and isinstance(data, dict):
+        get_prefetcher().start(prefetch_owner(), doservice_list, data, tenant=session.get('company_id'))
     all_column_values = {
         df_name: {col: df[col].iloc[0] for col in df.columns}
         for df_name, df in data.items()
@@ -205,69 +216,99 @@ def doservice():
        )
 
 
+def prefetch_owner():
+    """Key of the browser session owning a description prefetch"""
+    if 'prefetch_owner' not in session:
+        session['prefetch_owner'] = uuid.uuid4().hex
+    return session['prefetch_owner']
+
+
+def parse_dictionary_request():
+    """
+    Parse the dictionary form posted from wizard_data.html.
+
+    Returns:
+    - tuple: (doservice_list, None) on success or (None, (response, status)) on error.
+    """
+    dict_tables_t = request.form.getlist('dict_tables')
+    
+    if not dict_tables_t:
+        return None, (jsonify({'error': 'No tables selected'}), 400)
+    
+    # Parse table list - FIXED to handle different formats
+    try:
+        if isinstance(dict_tables_t[0], str):
+            db_tables = eval(dict_tables_t[0])
+        else:
+            db_tables = dict_tables_t[0]
+            
+        # Ensure it's a list
+        if not isinstance(db_tables, list):
+            db_tables = [db_tables]
+            
+    except Exception as e:
+        logging.error(f"Error parsing table list: {e}")
+        return None, (jsonify({'error': f'Invalid table format: {e}'}), 400)
+    
+    # Construct service parameters
+    doservice_list = {
+        'dict_tables': db_tables,
+        'dq_tables': request.form.get('dq_tables'),
+        'db_type': request.form.get('db_type'),
+        'conn_str': request.form.get('conn_str'),
+        'db_schema_name': request.form.get('db_schema_name'),
+        'conn_params': request.form.get('conn_params')
+    }
+    return doservice_list, None
+
+
+def get_dictionary_sample_data(doservice_list):
+    """
+    Fetch sample records for the dictionary tables.
+
+    Returns:
+    - tuple: (data, None) on success or (None, (response, status)) on error.
+    """
+    # Get sample data - ensure it returns a dictionary
+    data = get_top_records(doservice_list)
+    
+    # Validate that data is a dictionary
+    if not isinstance(data, dict):
+        logging.error(f"Expected dict from get_top_records, got {type(data)}")
+        # Try to convert if it's a list of DataFrames
+        if isinstance(data, list) and len(data) > 0 and isinstance(data[0], pd.DataFrame):
+            data = {f"table_{i}": df for i, df in enumerate(data)}
+        else:
+            return None, (jsonify({'error': 'Invalid data format returned from get_top_records'}), 500)
+    return data, None
+
+
 @data_dictionary_bp.route('/dbdictionary', methods=['POST'])
 def dbdictionary():
     """Flask route for generating data dictionary"""
     try:
-        # Extract and process request data
-        dict_tables_t = request.form.getlist('dict_tables')
-        
-        if not dict_tables_t:
-            return jsonify({'error': 'No tables selected'}), 400
-        
-        # Parse table list - FIXED to handle different formats
-        try:
-            if isinstance(dict_tables_t[0], str):
-                db_tables = eval(dict_tables_t[0])
-            else:
-                db_tables = dict_tables_t[0]
-                
-            # Ensure it's a list
-            if not isinstance(db_tables, list):
-                db_tables = [db_tables]
-                
-        except Exception as e:
-            logging.error(f"Error parsing table list: {e}")
-            return jsonify({'error': f'Invalid table format: {e}'}), 400
-        
-        # Get form fields
-        conn_str = request.form.get('conn_str')
-        dq_tables = request.form.get('dq_tables')
-        db_schema_name = request.form.get('db_schema_name')
-        db_type = request.form.get('db_type')
-        conn_params = request.form.get('conn_params')
+        doservice_list, error = parse_dictionary_request()
+        if error:
+            return error
         
-        # Construct service parameters
-        doservice_list = {
-            'dict_tables': db_tables,
-            'dq_tables': dq_tables,
-            'db_type': db_type,
-            'conn_str': conn_str,
-            'db_schema_name': db_schema_name,
-            'conn_params': conn_params
-        }
+        logging.info(f"Starting data dictionary generation for tables: {doservice_list['dict_tables']}")
         
-        logging.info(f"Starting data dictionary generation for tables: {db_tables}")
+        prefetched = get_prefetcher().claim(prefetch_owner(), doservice_list)
+        if prefetched is not None:
+            return jsonify(prefetched)
         
-        # Get sample data - ensure it returns a dictionary
-        data = get_top_records(doservice_list)
-        
-        # Validate that data is a dictionary
-        if not isinstance(data, dict):
-            logging.error(f"Expected dict from get_top_records, got {type(data)}")
-            # Try to convert if it's a list of DataFrames
-            if isinstance(data, list) and len(data) > 0 and isinstance(data[0], pd.DataFrame):
-                data = {f"table_{i}": df for i, df in enumerate(data)}
-            else:
-                return jsonify({'error': 'Invalid data format returned from get_top_records'}), 500
+        data, error = get_dictionary_sample_data(doservice_list)
+        if error:
+            return error
         
         # Generate descriptions
-        descriptions = DataDictionaryGenerator.generate_column_descriptions_for_tables(
-            data_dict=data,
-            connection_string=doservice_list['conn_str'],
-            db_type=doservice_list['db_type'],
-            schema_name=doservice_list['db_schema_name']
-        )
+        with llm_request_context(BULK, tenant=session.get('company_id')):
+            descriptions = DataDictionaryGenerator.generate_column_descriptions_for_tables(
+                data_dict=data,
+                connection_string=doservice_list['conn_str'],
+                db_type=doservice_list['db_type'],
+                schema_name=doservice_list['db_schema_name']
+            )
         logging.info(f"Generated  column descriptions : {descriptions}")
         logging.info(f"Generated {len(descriptions)} column descriptions")
         
@@ -281,6 +322,162 @@ def dbdictionary():
         return jsonify({'error': str(e)}), 500
 
 
+@data_dictionary_bp.route('/dbdictionary/stream', methods=['POST'])
+def dbdictionary_stream():
+    """Stream column descriptions to the browser as server-sent events"""
+    try:
+        doservice_list, error = parse_dictionary_request()
+        if error:
+            return error
+        
+        logging.info(f"Starting streamed data dictionary generation for tables: {doservice_list['dict_tables']}")
+        
+        data, error = get_dictionary_sample_data(doservice_list)
+        if error:
+            return error
+    except Exception as e:
+        logging.error(f"Error in dbdictionary_stream route: {e}")
+        return jsonify({'error': str(e)}), 500
+    
+    tenant = session.get('company_id')
+    
+    def event_stream():
+        count = 0
+        try:
+            # Someone is watching this stream, so it is scheduled ahead of bulk jobs
+            with llm_request_context(tenant=tenant):
+                for result in DataDictionaryGenerator.stream_column_descriptions_for_tables(
+                    data_dict=data,
+                    connection_string=doservice_list['conn_str'],
+                    db_type=doservice_list['db_type'],
+                    schema_name=doservice_list['db_schema_name']
+                ):
+                    count += 1
+                    yield f"event: column\ndata: {json.dumps(result, default=str)}\n\n"
+            yield f"event: done\ndata: {json.dumps({'count': count})}\n\n"
+        except Exception as e:
+            logging.error(f"Error while streaming descriptions: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+    
+    return Response(
+        stream_with_context(event_stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@data_dictionary_bp.route('/dbdictionary/prefetch', methods=['GET', 'DELETE'])
+def dbdictionary_prefetch():
+    """State of this session's description prefetch; DELETE cancels it"""
+    if request.method == 'DELETE':
+        get_prefetcher().cancel(prefetch_owner())
+    return jsonify(get_prefetcher().status(prefetch_owner()))
+
+
+@data_dictionary_bp.route('/llm/metrics', methods=['GET'])
+def llm_metrics():
+    """LLM call metrics: JSON aggregates, ?format=prometheus, or ?format=recent for raw calls"""
+    output_format = request.args.get('format', 'json')
+    if output_format == 'prometheus':
+        return Response(metrics.to_prometheus(), mimetype='text/plain; version=0.0.4')
+    if output_format == 'recent':
+        return jsonify({'calls': metrics.recent_calls()})
+    router = OllamaClient.get_router()
+    return jsonify({**metrics.snapshot(), 'backends': router.snapshot(), 'queue': router.queue_snapshot()})
+
+
+def catalog_db_config():
+    """
+    Catalog database named by the POSTed conn_str, or (None, error response).
+    conn_str carries credentials, so it is refused in a query string, where it
+    would end up in logs and browser history.
+    """
+    if 'conn_str' in request.args:
+        return None, (jsonify({'error': 'Send conn_str in the POST body, not the query string'}), 400)
+    conn_str = request.form.get('conn_str', '').strip()
+    if not conn_str:
+        return None, (jsonify({'error': 'Missing conn_str'}), 400)
+    return DataDictionaryGenerator.parse_connection_string(conn_str), None
+
+
+@data_dictionary_bp.route('/catalog/export', methods=['POST'])
+def catalog_export():
+    """
+    Stream the column_descriptions catalog as format=ndjson|csv|parquet,
+    optionally filtered by table (exact or * pattern). The source catalog is
+    given by a POSTed conn_str, as on the dictionary forms, and `database`
+    overrides its database.
+    """
+    output_format = request.values.get('format', 'ndjson')
+    if output_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported format {output_format}; use one of {', '.join(EXPORT_FORMATS)}"}), 400
+    
+    db_config, error = catalog_db_config()
+    if error:
+        return error
+    table = request.values.get('table') or None
+    try:
+        stream = export_catalog(db_config, output_format, database=request.values.get('database') or None, table=table)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 501
+    
+    mimetype, extension = EXPORT_FORMATS[output_format]
+    filename = f"column_descriptions_{(table or 'all').replace('*', '')}.{extension}"
+    return Response(
+        stream_with_context(stream),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@data_dictionary_bp.route('/search', methods=['GET', 'POST'])
+def catalog_search():
+    """
+    Ranked prefix search over the description catalog, q=...&page=N.
+    A POST with conn_str limits results to that catalog database, indexing
+    it on its first search; its pages link back with source=host:port/db,
+    which carries no credentials. format=json returns the page as JSON.
+    """
+    search_term = request.values.get('q', '').strip()
+    index = get_catalog_search()
+    source = request.args.get('source') or None
+    if request.method == 'POST' or 'conn_str' in request.args:
+        db_config, error = catalog_db_config()
+        if error:
+            return error
+        source = catalog_source(db_config)
+        try:
+            index.ensure_source(db_config)
+        except Exception as e:
+            logging.error(f"Could not index catalog {source}: {e}")
+    
+    results = index.search(search_term, page=request.values.get('page', 1, type=int),
+                           page_size=request.values.get('page_size', type=int),
+                           source=source, table=request.values.get('table') or None)
+    if request.values.get('format') == 'json':
+        return jsonify(results)
+    
+    tables = list(dict.fromkeys(result['table_name'] for result in results['results']))
+    params = {name: request.values[name] for name in ('q', 'table', 'page_size', 'db_type') if request.values.get(name)}
+    if source:
+        params['source'] = source
+    
+    def page_url(page):
+        return url_for('.catalog_search', **params, page=page)
+    
+    return render_template('data_dictionary/search_results.html', search_term=search_term, source=source,
+                           db_type=request.values.get('db_type', 'local'), tables=tables, search=results,
+                           pages=-(-results['total'] // results['page_size']), page_url=page_url)
+
+
+@data_dictionary_bp.route('/persistence/metrics', methods=['GET'])
+def persistence_metrics():
+    """Write-behind queue depth and flush counters: JSON, or ?format=prometheus"""
+    if request.args.get('format') == 'prometheus':
+        return Response(get_write_behind().to_prometheus(), mimetype='text/plain; version=0.0.4')
+    return jsonify(get_write_behind().snapshot())
+
+
 @data_dictionary_bp.route('/testapp')
 def testapp():
         
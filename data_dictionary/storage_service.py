@@ -1,7 +1,8 @@
 from .db_manager import DBManager
+from .bulk_writer import bulk_insert
 import pandas as pd
 import sqlalchemy
-from sqlalchemy import create_engine
+from sqlalchemy import inspect
 import logging
 import os
 from dotenv import load_dotenv
@@ -13,13 +14,10 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 
 class DictionaryStorage:
     @staticmethod
-    def check_table_exists(cursor, table_name, schema='IDIMDM'):
+    def check_table_exists(conn, table_name, schema='IDIMDM'):
         """Check if a table exists in the database."""
         try:
-            cursor.execute("""
-                SELECT 1 FROM sysobjects WHERE name = ? AND type = 'U'
-            """, (table_name,))
-            return cursor.fetchone() is not None
+            return inspect(conn).has_table(table_name, schema=schema)
         except Exception as e:
             logging.error(f"Error checking table existence for {table_name}: {str(e)}")
             raise
@@ -34,17 +32,10 @@ class DictionaryStorage:
         - dictionary (list): List of dictionaries with column metadata and quality metrics.
         - db_type (str): Database type ('local' for SQL Server, else Redshift).
         """
-        conn = DBManager.get_dictionary_storage()
-        cursor = conn.cursor()
+        schema = 'IDIMDM' if db_type == 'local' else 'public'
+        engine = DBManager.get_dictionary_storage(db_type)
         
         try:
-            # Check table existence
-            schema = 'IDIMDM' if db_type == 'local' else 'public'
-            if not DictionaryStorage.check_table_exists(cursor, 'data_dictionary', schema):
-                raise Exception("data_dictionary table does not exist")
-            if not DictionaryStorage.check_table_exists(cursor, 'QualityReports', schema):
-                raise Exception("QualityReports table does not exist")
-            
             # Prepare DataFrames for bulk insert
             dict_df = pd.DataFrame([{
                 'TableName': table_name,
@@ -74,22 +65,22 @@ class DictionaryStorage:
                 'AuditDate': item['AuditDate']
             } for item in dictionary])
             
-            # Create SQLAlchemy engine
-            conn_str = f"mssql+pyodbc://@{os.getenv('DB_SERVER')}/{os.getenv('DB_NAME')}?driver={os.getenv('DB_DRIVER')}&Trusted_Connection=yes"
-            engine = create_engine(conn_str)
-            
-            # Save to data_dictionary (Option 1)
-            dict_df.to_sql('data_dictionary', engine, schema=schema, if_exists='append', index=False)
+            # Both tables are written in one transaction on the shared engine
+            redshift = db_type != 'local'
+            with engine.begin() as conn:
+                if not DictionaryStorage.check_table_exists(conn, 'data_dictionary', schema):
+                    raise Exception("data_dictionary table does not exist")
+                if not DictionaryStorage.check_table_exists(conn, 'QualityReports', schema):
+                    raise Exception("QualityReports table does not exist")
+                
+                # Save to data_dictionary (Option 1)
+                bulk_insert(conn, 'data_dictionary', dict_df, schema=schema, redshift=redshift)
+                
+                # Save to QualityReports (Option 2)
+                bulk_insert(conn, 'QualityReports', quality_df, schema=schema, redshift=redshift)
             
-            # Save to QualityReports (Option 2)
-            quality_df.to_sql('QualityReports', engine, schema=schema, if_exists='append', index=False)
-            
-            conn.commit()
             logging.info(f"Successfully saved dictionary for {table_name} to data_dictionary and QualityReports")
         
         except Exception as e:
-            conn.rollback()
             logging.error(f"Error saving dictionary to database: {str(e)}")
-            raise
-        finally:
-            conn.close()
\ No newline at end of file
+            raise
\ No newline at end of file
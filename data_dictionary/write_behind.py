@@ -0,0 +1,526 @@
+import atexit
+import glob
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single process owns the spill directory
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_CONFIG = {
+    # Pending writes are flushed at least this often (seconds)...
+    'flush_interval': 1.0,
+    # ...or as soon as this many rows are waiting
+    'flush_rows': 2000,
+    # enqueue() blocks while this many rows are waiting, so a stalled database can't exhaust memory
+    'max_pending': 100000,
+    # Append-only spill segments, one subdirectory per process, replayed on start after a crash
+    'spill_dir': 'write_behind_spill',
+    # fsync every spilled record; slower, but survives power loss and not just a process crash
+    'fsync': False,
+    # Pause after a failed flush before retrying (seconds), doubling per failed flush up to max_retry_delay
+    'retry_delay': 5.0,
+    'max_retry_delay': 300.0,
+    # Items that failed this many writes on their own are moved to the dead-letter file
+    'max_attempts': 8,
+    'dead_letter_file': 'dead_letter.jsonl'
+}
+
+
+class PartialWrite(Exception):
+    """
+    Raised by a writer that stored some items but not `failed` (a subset of
+    the very item dicts it was given); only those are retried.
+    """
+
+    def __init__(self, failed: List[Dict[str, Any]], message: str = ''):
+        super().__init__(message or f"{len(failed)} items were not written")
+        self.failed = failed
+
+
+def _try_lock(handle) -> bool:
+    """Take an exclusive lock on an open file without waiting; released when its process exits"""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class WriteBehindQueue:
+    """
+    In-process write-behind buffer for persistence that doesn't need to finish
+    inside the request.
+
+    Each kind of write (descriptions, mappings, quality rows) registers a
+    writer that stores a list of items in one transaction, and optionally a
+    key function: items with the same key coalesce, the latest one winning.
+    A background thread hands the writers everything pending every
+    `flush_interval` seconds or once `flush_rows` rows are waiting.
+
+    When a batch fails, it is split in halves until the failing items are
+    isolated, so one bad row doesn't hold back the rest of its kind. Items
+    that keep failing are retried with backoff and, after `max_attempts`,
+    appended to the dead-letter file next to the spill directories.
+
+    Every item is appended to a local spill segment before enqueue() returns.
+    Each process spills into its own subdirectory, locked for its lifetime.
+    After a flush the items still queued are re-spilled and the older
+    segments deleted. start() adopts the subdirectories of processes that are
+    gone and replays their segments.
+    """
+
+    def __init__(self, spill_dir: Optional[str] = None):
+        self.spill_root = spill_dir or WRITE_BEHIND_CONFIG['spill_dir']
+        # This process's subdirectory of spill_root, created by start()
+        self.spill_dir = None
+        self._owner_lock = None
+        self._writers = {}
+        self._pending = {}
+        self._inflight = {}
+        self._attempts = {}
+        # Replayed items of kinds that have no writer yet, claimed by register()
+        self._unclaimed = {}
+        self._depth = 0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._segment = None
+        self._sealed = []
+        self._app = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._stats = {'enqueued': 0, 'coalesced': 0, 'written': 0, 'flushes': 0,
+                       'failed_flushes': 0, 'replayed': 0, 'dead_lettered': 0, 'last_flush_seconds': None,
+                       'last_error': None, 'oldest_pending_at': None}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def register(self, kind: str, writer: Callable[[List[Dict[str, Any]]], Any],
+                 key: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                 validate: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        """
+        Register the batch writer for `kind`. `key` makes items with equal keys
+        coalesce; `validate` raises ValueError for an item enqueue() must refuse.
+        """
+        with self._cond:
+            self._writers[kind] = (writer, key, validate)
+            unclaimed = self._unclaimed.pop(kind, [])
+            for item, attempts in unclaimed:
+                self._spill(kind, item, attempts)
+                self._add(kind, item, attempts)
+            if unclaimed:
+                self._write_unclaimed()
+                logger.info(f"Queued {len(unclaimed)} replayed {kind} writes")
+
+    def start(self, app=None):
+        """
+        Replay spilled writes and start the flush thread. Writers run inside
+        `app.app_context()` when an app is given. Call once per process.
+        """
+        with self._cond:
+            if self.running:
+                return
+            self._app = app
+            self._stop.clear()
+            self._claim_spill_dir()
+            self._replay()
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+        logger.info(f"Write-behind queue started ({self._depth} replayed rows pending)")
+
+    def stop(self, timeout: float = 30.0):
+        """Stop the flush thread after a final flush"""
+        if not self.running:
+            return
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        self.flush()
+        with self._cond:
+            if not self._depth and not self._unclaimed:
+                self._release_spill_dir()
+
+    # Spill file
+
+    def _claim_spill_dir(self):
+        os.makedirs(self.spill_root, mode=0o700, exist_ok=True)
+        self.spill_dir = os.path.join(self.spill_root, f"worker-{os.getpid()}-{time.time_ns()}")
+        os.makedirs(self.spill_dir, mode=0o700)
+        self._owner_lock = open(os.path.join(self.spill_dir, 'owner.lock'), 'a')
+        _try_lock(self._owner_lock)
+
+    def _release_spill_dir(self):
+        """Remove this process's (empty) spill directory on a clean stop"""
+        self._seal_segment()
+        for path in self._sealed:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._sealed = []
+        try:
+            os.remove(os.path.join(self.spill_dir, 'owner.lock'))
+            self._owner_lock.close()
+            os.rmdir(self.spill_dir)
+        except OSError as e:
+            logger.debug(f"Left spill directory {self.spill_dir}: {e}")
+
+    def _adopt_orphans(self):
+        """Move the segments of processes that are gone into this process's directory"""
+        # Segments of the single-directory layout, and directories whose owner has exited
+        orphans = [(None, path) for path in glob.glob(os.path.join(self.spill_root, 'segment-*.jsonl'))]
+        for directory in glob.glob(os.path.join(self.spill_root, 'worker-*')):
+            if directory == self.spill_dir:
+                continue
+            try:
+                lock = open(os.path.join(directory, 'owner.lock'), 'a')
+            except OSError:
+                continue
+            if not _try_lock(lock):
+                lock.close()
+                continue
+            orphans.extend((None, path) for path in sorted(glob.glob(os.path.join(directory, '*.jsonl'))))
+            orphans.append((lock, directory))
+        for index, (lock, path) in enumerate(orphans):
+            if lock is None:
+                # The index keeps each directory's segments in write order
+                os.replace(path, os.path.join(self.spill_dir, f"adopted-{index:06d}-{os.path.basename(path)}"))
+            else:
+                try:
+                    for leftover in glob.glob(os.path.join(path, '*.tmp')):
+                        os.remove(leftover)
+                    os.remove(os.path.join(path, 'owner.lock'))
+                    lock.close()
+                    os.rmdir(path)
+                except OSError as e:
+                    logger.warning(f"Could not remove orphaned spill directory {path}: {e}")
+
+    def _open_segment(self):
+        path = os.path.join(self.spill_dir, f"segment-{time.time_ns()}.jsonl")
+        # Items can carry connection details, so the segment is readable by its owner only
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        self._segment = (path, os.fdopen(fd, 'a', encoding='utf-8'))
+
+    def _spill(self, kind: str, item: Dict[str, Any], attempts: int = 0):
+        if self._segment is None:
+            self._open_segment()
+        handle = self._segment[1]
+        handle.write(json.dumps({'kind': kind, 'item': item, 'attempts': attempts}, default=str) + '\n')
+        handle.flush()
+        if WRITE_BEHIND_CONFIG['fsync']:
+            os.fsync(handle.fileno())
+
+    def _seal_segment(self):
+        if self._segment is not None:
+            path, handle = self._segment
+            handle.close()
+            self._sealed.append(path)
+            self._segment = None
+
+    def _write_unclaimed(self):
+        """Rewrite the file holding replayed items no writer has claimed yet"""
+        path = os.path.join(self.spill_dir, 'unclaimed.jsonl')
+        if not self._unclaimed:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        fd = os.open(path + '.tmp', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for kind, items in self._unclaimed.items():
+                for item, attempts in items:
+                    f.write(json.dumps({'kind': kind, 'item': item, 'attempts': attempts}, default=str) + '\n')
+        os.replace(path + '.tmp', path)
+
+    def _dead_letter(self, records: List[Tuple[str, Dict[str, Any], int, str]]):
+        """Append items that won't be retried to the dead-letter file, shared by every process"""
+        path = os.path.join(self.spill_root, WRITE_BEHIND_CONFIG['dead_letter_file'])
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        with os.fdopen(fd, 'a', encoding='utf-8') as f:
+            for kind, item, attempts, error in records:
+                f.write(json.dumps({'kind': kind, 'item': item, 'attempts': attempts, 'error': error,
+                                    'failed_at': time.time()}, default=str) + '\n')
+        self._stats['dead_lettered'] += len(records)
+        logger.error(f"Moved {len(records)} write-behind items to {path}")
+
+    def _replay(self):
+        self._adopt_orphans()
+        for path in sorted(glob.glob(os.path.join(self.spill_dir, '*.jsonl'))):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A crash can leave the last line half-written
+                        logger.warning(f"Skipping unreadable spilled write in {path}")
+                        continue
+                    kind, attempts = record['kind'], record.get('attempts', 0)
+                    if kind in self._writers:
+                        self._add(kind, record['item'], attempts)
+                    else:
+                        self._unclaimed.setdefault(kind, []).append((record['item'], attempts))
+                    self._stats['replayed'] += 1
+            self._sealed.append(path)
+        if self._stats['replayed']:
+            # Replayed items are re-spilled by the next flush; unclaimed ones are kept apart until registered
+            self._write_unclaimed()
+            logger.info(f"Replayed {self._stats['replayed']} spilled writes")
+
+    # Queue
+
+    def _add(self, kind: str, item: Dict[str, Any], attempts: int = 0):
+        key_fn = self._writers.get(kind, (None, None, None))[1]
+        key = key_fn(item) if key_fn else next(self._seq)
+        items = self._pending.setdefault(kind, {})
+        if key in items:
+            self._stats['coalesced'] += 1
+        else:
+            self._depth += 1
+        items[key] = item
+        # A newer item starts over; a replayed one keeps the attempts of its spilled record
+        if attempts:
+            self._attempts.setdefault(kind, {})[key] = attempts
+        else:
+            self._attempts.get(kind, {}).pop(key, None)
+        if self._stats['oldest_pending_at'] is None:
+            self._stats['oldest_pending_at'] = time.time()
+
+    def _validate(self, kind: str, items: List[Dict[str, Any]]):
+        """Raise ValueError for items that could never be spilled, keyed or written"""
+        if kind not in self._writers:
+            raise ValueError(f"No write-behind writer registered for {kind}")
+        _, key_fn, validate = self._writers[kind]
+        for item in items:
+            if not isinstance(item, dict):
+                raise ValueError(f"{kind} items must be dicts, got {type(item).__name__}")
+            try:
+                json.dumps(item, default=str)
+                if key_fn:
+                    hash(key_fn(item))
+                if validate:
+                    validate(item)
+            except ValueError as e:
+                raise ValueError(f"Invalid {kind} item: {e}")
+            except (TypeError, KeyError) as e:
+                raise ValueError(f"Invalid {kind} item: {type(e).__name__} {e}")
+
+    def enqueue(self, kind: str, items: List[Dict[str, Any]]) -> bool:
+        """
+        Queue items for `kind`. Returns False, queueing nothing, when the queue
+        isn't running; the caller then writes directly. Raises ValueError,
+        queueing nothing, if any item is invalid.
+        """
+        if not self.running:
+            return False
+        self._validate(kind, items)
+        with self._cond:
+            while self._depth >= WRITE_BEHIND_CONFIG['max_pending'] and self.running:
+                self._cond.wait(1.0)
+            for item in items:
+                self._spill(kind, item)
+                self._add(kind, item)
+            self._stats['enqueued'] += len(items)
+            if self._depth >= WRITE_BEHIND_CONFIG['flush_rows']:
+                self._cond.notify_all()
+        return True
+
+    def pending(self, kind: str) -> List[Dict[str, Any]]:
+        """Items of `kind` not yet written, so reads can include the caller's own writes"""
+        with self._cond:
+            return list(self._inflight.get(kind, {}).values()) + list(self._pending.get(kind, {}).values())
+
+    def _call(self, writer, items: List[Dict[str, Any]]):
+        if self._app is not None:
+            with self._app.app_context():
+                writer(items)
+        else:
+            writer(items)
+
+    def _write(self, kind: str, entries: List[Tuple[Any, Dict[str, Any]]]) -> Dict[Any, str]:
+        """
+        Write (key, item) entries, halving a failed group until its failing
+        items are isolated. Returns the failed keys with their errors.
+        """
+        writer = self._writers[kind][0]
+        try:
+            self._call(writer, [item for _, item in entries])
+            return {}
+        except PartialWrite as e:
+            failed = {id(item) for item in e.failed}
+            return {key: str(e) for key, item in entries if id(item) in failed}
+        except Exception as e:
+            if len(entries) == 1:
+                return {entries[0][0]: str(e)}
+            logger.warning(f"Write-behind flush of {len(entries)} {kind} rows failed, isolating: {e}")
+            self._stats['last_error'] = f"{kind}: {e}"
+            middle = len(entries) // 2
+            return {**self._write(kind, entries[:middle]), **self._write(kind, entries[middle:])}
+
+    def flush(self) -> bool:
+        """Write everything pending now; returns False if any item failed"""
+        with self._flush_lock:
+            with self._cond:
+                batch = {kind: items for kind, items in self._pending.items() if kind in self._writers}
+                for kind in batch:
+                    del self._pending[kind]
+                self._depth -= sum(len(items) for items in batch.values())
+                self._seal_segment()
+                sealed = list(self._sealed)
+                self._inflight = batch
+                self._stats['oldest_pending_at'] = time.time() if self._depth else None
+                self._cond.notify_all()
+
+            started = time.perf_counter()
+            failed = {}
+            for kind, items in batch.items():
+                errors = self._write(kind, list(items.items()))
+                self._stats['written'] += len(items) - len(errors)
+                if errors:
+                    logger.error(f"Write-behind flush of {len(errors)} of {len(items)} {kind} rows failed: "
+                                 f"{next(iter(errors.values()))}")
+                    self._stats['last_error'] = f"{kind}: {next(iter(errors.values()))}"
+                    failed[kind] = errors
+
+            with self._cond:
+                self._inflight = {}
+                dead = []
+                for kind, items in batch.items():
+                    attempts = self._attempts.setdefault(kind, {})
+                    errors = failed.get(kind, {})
+                    newer = self._pending.get(kind, {})
+                    retry = {}
+                    for key, item in items.items():
+                        if key not in errors or key in newer:
+                            # Written, or superseded by a newer write queued during the flush
+                            if key not in newer:
+                                attempts.pop(key, None)
+                            continue
+                        attempts[key] = attempts.get(key, 0) + 1
+                        if attempts[key] >= WRITE_BEHIND_CONFIG['max_attempts']:
+                            dead.append((kind, item, attempts.pop(key), errors[key]))
+                        else:
+                            retry[key] = item
+                    if retry:
+                        self._pending[kind] = {**retry, **newer}
+                        self._depth += len(retry)
+                if dead:
+                    self._dead_letter(dead)
+                if self._depth and self._stats['oldest_pending_at'] is None:
+                    self._stats['oldest_pending_at'] = time.time()
+                if batch:
+                    self._stats['flushes'] += 1
+                    self._stats['last_flush_seconds'] = round(time.perf_counter() - started, 4)
+                if failed:
+                    self._stats['failed_flushes'] += 1
+                # Items kept for a retry move to the current segment, so the sealed ones can go
+                for kind, items in failed.items():
+                    for key in items:
+                        if key in self._pending.get(kind, {}) and key in self._attempts.get(kind, {}):
+                            self._spill(kind, self._pending[kind][key], self._attempts[kind][key])
+                for path in sealed:
+                    try:
+                        os.remove(path)
+                    except OSError as e:
+                        logger.warning(f"Could not remove spill segment {path}: {e}")
+                self._sealed = [path for path in self._sealed if path not in sealed]
+            return not failed
+
+    def _run(self):
+        delay = WRITE_BEHIND_CONFIG['retry_delay']
+        while not self._stop.is_set():
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stop.is_set() or self._depth >= WRITE_BEHIND_CONFIG['flush_rows'],
+                    timeout=WRITE_BEHIND_CONFIG['flush_interval'])
+            if self._stop.is_set():
+                break
+            if self._depth and not self.flush():
+                self._stop.wait(delay)
+                delay = min(delay * 2, WRITE_BEHIND_CONFIG['max_retry_delay'])
+            else:
+                delay = WRITE_BEHIND_CONFIG['retry_delay']
+
+    # Metrics
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            oldest = self._stats['oldest_pending_at']
+            segments = list(self._sealed) + ([self._segment[0]] if self._segment else [])
+            return {
+                'running': self.running,
+                'depth': self._depth,
+                'depth_by_kind': {kind: len(items) for kind, items in self._pending.items() if items},
+                'in_flight': sum(len(items) for items in self._inflight.values()),
+                'oldest_pending_seconds': round(time.time() - oldest, 3) if oldest else None,
+                'unclaimed': sum(len(items) for items in self._unclaimed.values()),
+                'spill_segments': len(segments),
+                'spill_bytes': sum(os.path.getsize(path) for path in segments if os.path.exists(path)),
+                **{name: value for name, value in self._stats.items() if name != 'oldest_pending_at'}
+            }
+
+    def to_prometheus(self) -> str:
+        """Queue depth and flush counters in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = [f'write_behind_depth {snapshot["depth"]}',
+                 f'write_behind_in_flight {snapshot["in_flight"]}',
+                 f'write_behind_spill_bytes {snapshot["spill_bytes"]}',
+                 f'write_behind_oldest_pending_seconds {snapshot["oldest_pending_seconds"] or 0}']
+        for kind, depth in snapshot['depth_by_kind'].items():
+            lines.append(f'write_behind_depth_by_kind{{kind="{kind}"}} {depth}')
+        for counter in ('enqueued', 'coalesced', 'written', 'flushes', 'failed_flushes', 'replayed', 'dead_lettered'):
+            lines.append(f'write_behind_{counter}_total {snapshot[counter]}')
+        return '\n'.join(lines) + '\n'
+
+    def _after_fork(self):
+        # The flush thread doesn't survive a fork; the child writes directly until started.
+        # The parent keeps writing its own queued items and owns its spill directory
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._segment = None
+        self._sealed = []
+        self._pending, self._inflight, self._attempts, self._unclaimed = {}, {}, {}, {}
+        self._depth = 0
+        if self._owner_lock is not None:
+            # Closing the inherited descriptor leaves the parent's lock in place
+            self._owner_lock.close()
+            self._owner_lock = None
+        self.spill_dir = None
+
+
+_write_behind = None
+_write_behind_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    global _write_behind_lock
+    _write_behind_lock = threading.Lock()
+    if _write_behind is not None:
+        _write_behind._after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_write_behind() -> WriteBehindQueue:
+    """The process-wide write-behind queue; writers register on import, the app starts it"""
+    global _write_behind
+    with _write_behind_lock:
+        if _write_behind is None:
+            _write_behind = WriteBehindQueue()
+        return _write_behind
@@ -1,164 +1,201 @@
-import requests
-import json
 import os
-from flask import current_app
+import threading
+from flask import current_app, session, has_request_context
 import logging
+from llm import client as llm_client
+from llm.router import LLMRouter, OllamaBackend, CohereBackend
+from llm.request_queue import llm_request_context, INTERACTIVE
 
 logger = logging.getLogger(__name__)
 
 class AIHarmonizerService:
-    def __init__(self):
-        self.ollama_host = current_app.config.get('OLLAMA_HOST', 'http://localhost:11434')
-        self.ollama_model = current_app.config.get('OLLAMA_MODEL', 'llama3')
-        self.cohere_api_key = current_app.config.get('COHERE_API_KEY', os.getenv('COHERE_API_KEY'))
-        self.cohere_model = current_app.config.get('COHERE_MODEL', 'command')
-        self.preferred_provider = current_app.config.get('AI_PREFERRED_PROVIDER', 'ollama')
+    def __init__(self, config=None):
+        """
+        Bind provider settings from `config` (a Flask config or plain dict).
+        Use get_ai_harmonizer_service() rather than constructing one per call.
+        """
+        config = config if config is not None else current_app.config
+        self.ollama_host = config.get('OLLAMA_HOST', 'http://localhost:11434')
+        self.ollama_model = config.get('OLLAMA_MODEL', 'llama3')
+        self.cohere_api_key = config.get('COHERE_API_KEY', os.getenv('COHERE_API_KEY'))
+        self.cohere_model = config.get('COHERE_MODEL', 'command')
+        self.preferred_provider = config.get('AI_PREFERRED_PROVIDER', 'ollama')
+        # Cohere is an external API: used only when it is the preferred provider or
+        # explicitly enabled alongside Ollama, as data_dictionary's LLM_USE_COHERE
+        use_cohere = config.get('LLM_USE_COHERE', os.getenv('LLM_USE_COHERE', ''))
+        self.use_cohere = bool(self.cohere_api_key) and (
+            self.preferred_provider == 'cohere' or str(use_cohere).lower() in ('1', 'true', 'yes'))
+        # Extra Ollama hosts serving the same model; calls are routed by observed latency
+        self.ollama_hosts = config.get('OLLAMA_HOSTS') or [self.ollama_host]
+        self._router = None
+        self._router_lock = threading.Lock()
+    
+    @property
+    def router(self):
+        """Backend router, built on the first LLM call"""
+        with self._router_lock:
+            if self._router is None:
+                self._router = self._build_router()
+            return self._router
+    
+    @property
+    def model_id(self):
+        """The models suggestions can come from, so cached results follow a model change"""
+        models = []
+        if self.preferred_provider == 'ollama':
+            models.append(f"ollama:{self.ollama_model}")
+        if self.use_cohere:
+            models.append(f"cohere:{self.cohere_model}")
+        return ','.join(models) or 'none'
+    
+    def _build_router(self):
+        """Router over the Ollama hosts and Cohere, or None if no provider is configured"""
+        backends = []
+        if self.preferred_provider == 'ollama':
+            backends.extend(OllamaBackend(host, self.ollama_model) for host in self.ollama_hosts)
+        if self.use_cohere:
+            backends.append(CohereBackend(self.cohere_api_key, self.cohere_model))
+        return LLMRouter(backends) if backends else None
+    
+    def warmup(self):
+        """Preload the Ollama model before a mapping or description job"""
+        if self.preferred_provider == 'ollama':
+            return any([llm_client.warmup(self.ollama_model, host) for host in self.ollama_hosts])
+        return False
     
     def generate_column_description(self, table_name, column_info, sample_values):
-        """Generate column description using AI (Ollama first, Cohere as fallback)"""
+        """Generate column description using the fastest healthy provider"""
         prompt = self._build_description_prompt(table_name, column_info, sample_values)
         
-        # Try Ollama first if preferred
-        if self.preferred_provider == 'ollama':
-            try:
-                description = self._generate_with_ollama(prompt)
-                if description:
-                    return description
-            except Exception as e:
-                logger.warning(f"Ollama failed, falling back to Cohere: {e}")
-        
-        # Try Cohere
         try:
-            description = self._generate_with_cohere(prompt)
+            description = self._generate(prompt, {"temperature": 0.2, "num_predict": 200}, timeout=120,
+                                         operation='harmonizer_describe')
             if description:
                 return description
         except Exception as e:
-            logger.error(f"Cohere also failed: {e}")
+            logger.error(f"All AI providers failed for description: {e}")
         
-        # If both fail, use fallback
+        # If every provider fails, use fallback
         return self._fallback_description(table_name, column_info, sample_values)
     
-    def suggest_mappings(self, source_table, target_tables, all_columns):
-        """Suggest column mappings using AI"""
-        prompt_data = {
-            "source_table": source_table,
-            "target_tables": target_tables,
-            "columns": all_columns
-        }
+    def generate_column_descriptions(self, table_name, columns, batch_size=8, tenant=None,
+                                     priority=INTERACTIVE, on_batch=None):
+        """
+        Generate descriptions for several columns of a table, `batch_size`
+        columns per LLM call.
         
-        # Try Ollama first if preferred
-        if self.preferred_provider == 'ollama':
+        Parameters:
+        - columns: list of (column_info, sample_values) tuples.
+        - priority: LLM queue class of the calls (BACKGROUND for jobs).
+        - on_batch: called with each batch's {column name: markdown} as it completes.
+        
+        Returns:
+        - dict: column name -> markdown description (fallback text for columns
+          the model did not answer).
+        """
+        # Imported here: ai_service_new pulls in mysql.connector, pandas and the write-behind registration
+        from data_dictionary.ai_service_new import OllamaClient, MARKDOWN_PROMPT_PREFIX, COLUMN_MARKER
+
+        descriptions = {}
+        for start in range(0, len(columns), batch_size):
+            batch_descriptions = {}
+            batch = columns[start:start + batch_size]
+            # The batch prompt builder expects the upper-case information_schema keys
+            columns_data = [
+                (table_name, {
+                    'COLUMN_NAME': self._get_column_name_from_metadata(column_info),
+                    'DATA_TYPE': column_info.get('DATA_TYPE', column_info.get('data_type', 'N/A')),
+                    'IS_NULLABLE': column_info.get('IS_NULLABLE', column_info.get('is_nullable', 'N/A')),
+                    'CHARACTER_MAXIMUM_LENGTH': column_info.get('CHARACTER_MAXIMUM_LENGTH',
+                                                                column_info.get('character_maximum_length', 'N/A'))
+                }, sample_values)
+                for column_info, sample_values in batch
+            ]
             try:
-                suggestions = self._suggest_with_ollama(prompt_data)
-                if suggestions:
-                    return suggestions
+                response = self._generate(OllamaClient.build_batch_prompt(columns_data),
+                                          {"temperature": 0.2, "num_predict": 250 * len(batch)}, timeout=180,
+                                          operation='harmonizer_describe_batch', prefix=MARKDOWN_PROMPT_PREFIX,
+                                          tenant=tenant, priority=priority)
+                sections = [section.strip() for section in response.split(COLUMN_MARKER) if section.strip()]
             except Exception as e:
-                logger.warning(f"Ollama mapping suggestion failed, falling back to Cohere: {e}")
+                logger.error(f"All AI providers failed for a batch of {len(batch)} descriptions: {e}")
+                sections = []
+            
+            for index, (column_info, sample_values) in enumerate(batch):
+                column_name = self._get_column_name_from_metadata(column_info)
+                if index < len(sections):
+                    batch_descriptions[column_name] = sections[index]
+                else:
+                    batch_descriptions[column_name] = self._fallback_description(table_name, column_info, sample_values)
+            descriptions.update(batch_descriptions)
+            if on_batch is not None:
+                on_batch(batch_descriptions)
+        return descriptions
+    
+    def suggest_mappings(self, source_table, target_tables, all_columns):
+        """
+        Suggest column mappings from `source_table` to `target_tables`.
         
-        # Try Cohere
-        try:
-            suggestions = self._suggest_with_cohere(prompt_data)
-            if suggestions:
-                return suggestions
-        except Exception as e:
-            logger.error(f"Cohere mapping suggestion also failed: {e}")
+        `all_columns` maps each table to its column dicts (column_name and
+        optionally data_type, business_purpose and description_version).
+        Suggestions are cached per table; see suggestion_cache.
+        """
+        def columns_of(table):
+            return [{'table': table, 'column': col['column_name'], 'data_type': col.get('data_type'),
+                     'business_purpose': col.get('business_purpose'),
+                     'description_version': col.get('description_version')}
+                    for col in all_columns.get(table, [])]
         
-        # If both fail, use fallback
-        return self._fallback_suggestions(source_table, target_tables, all_columns)
-    
-    def _generate_with_ollama(self, prompt):
-        """Generate description using Ollama"""
-        try:
-            response = requests.post(
-                f"{self.ollama_host}/api/generate",
-                json={
-                    "model": self.ollama_model,
-                    "prompt": prompt,
-                    "options": {"temperature": 0.2},
-                    "stream": False
-                },
-                timeout=120
-            )
-            response.raise_for_status()
-            return response.json()['response'].strip()
-        except Exception as e:
-            logger.error(f"Ollama generation failed: {e}")
-            raise
-    
-    def _generate_with_cohere(self, prompt):
-        """Generate description using Cohere"""
-        if not self.cohere_api_key:
-            logger.error("Cohere API key not configured")
-            raise ValueError("Cohere API key not available")
+        from .schema_harmonization import prompt_version
+        from .suggestion_cache import get_suggestion_cache
         
-        try:
-            import cohere
-            co = cohere.Client(self.cohere_api_key)
-            response = co.generate(
-                model=self.cohere_model,
-                prompt=prompt,
-                max_tokens=200,
-                temperature=0.2
-            )
-            return response.generations[0].text.strip()
-        except ImportError:
-            logger.error("Cohere Python package not installed. Install with: pip install cohere")
-            raise
-        except Exception as e:
-            logger.error(f"Cohere generation failed: {e}")
-            raise
+        target_columns = [column for table in target_tables for column in columns_of(table)]
+        # Only source columns whose name, type or description changed are recomputed
+        return get_suggestion_cache().suggestions(
+            source_table, columns_of(source_table), target_columns, self.model_id, prompt_version(),
+            lambda columns: self.harmonize(columns, target_columns)['suggestions'])
     
-    def _suggest_with_ollama(self, prompt_data):
-        """Suggest mappings using Ollama"""
-        prompt = self._build_mapping_prompt(prompt_data)
+    def harmonize(self, source_columns, target_columns, value_index=None, value_sources=None, tenant=None,
+                  priority=INTERACTIVE):
+        """
+        Map source columns onto a target schema: candidates are blocked on
+        name, type and value overlap, and only ambiguous columns are sent to
+        the LLM with their shortlists. See schema_harmonization.harmonize_schemas.
+        Schema-wide runs pass priority=BULK so page loads overtake them.
+        """
+        from .schema_harmonization import harmonize_schemas
         
-        try:
-            response = requests.post(
-                f"{self.ollama_host}/api/generate",
-                json={
-                    "model": self.ollama_model,
-                    "prompt": prompt,
-                    "options": {"temperature": 0.1},
-                    "stream": False
-                },
-                timeout=180
-            )
-            response.raise_for_status()
-            
-            result = response.json()['response'].strip()
-            return self._parse_ai_response(result)
-                
-        except Exception as e:
-            logger.error(f"Ollama mapping suggestion failed: {e}")
-            raise
+        # Resolver calls run on worker threads, outside the request context
+        if tenant is None and has_request_context():
+            tenant = session.get('company_id')
+        resolve = None
+        if self.router is not None:
+            resolve = lambda batch: self._resolve_ambiguous(batch, tenant, priority)
+        return harmonize_schemas(source_columns, target_columns, resolve=resolve,
+                                 value_index=value_index, value_sources=value_sources)
     
-    def _suggest_with_cohere(self, prompt_data):
-        """Suggest mappings using Cohere"""
-        if not self.cohere_api_key:
-            logger.error("Cohere API key not configured")
-            raise ValueError("Cohere API key not available")
+    def _resolve_ambiguous(self, batch, tenant, priority=INTERACTIVE):
+        """Ask the LLM to pick among the shortlisted targets of a few ambiguous columns"""
+        from .schema_harmonization import build_resolution_prompt, parse_resolution
         
-        prompt = self._build_mapping_prompt(prompt_data)
-        
-        try:
-            import cohere
-            co = cohere.Client(self.cohere_api_key)
-            response = co.generate(
-                model=self.cohere_model,
-                prompt=prompt,
-                max_tokens=500,
-                temperature=0.1
-            )
-            
-            result = response.generations[0].text.strip()
-            return self._parse_ai_response(result)
-            
-        except ImportError:
-            logger.error("Cohere Python package not installed. Install with: pip install cohere")
-            raise
-        except Exception as e:
-            logger.error(f"Cohere mapping suggestion failed: {e}")
-            raise
+        response = self._generate(build_resolution_prompt(batch),
+                                  {"temperature": 0.1, "num_predict": 60 * len(batch) + 40}, timeout=180,
+                                  operation='harmonizer_mapping', tenant=tenant, priority=priority)
+        return parse_resolution(response, len(batch))
+    
+    def _generate(self, prompt, options, timeout, operation, prefix=None, tenant=None, priority=INTERACTIVE):
+        """Generate text on the best backend; the router hedges slow calls and fails over on errors"""
+        if self.router is None:
+            raise ValueError("No AI provider configured")
+        if tenant is None and has_request_context():
+            tenant = session.get('company_id')
+        # Page loads wait with the request timeout as deadline; queued work may wait for a slot
+        deadline = timeout if priority == INTERACTIVE else None
+        with llm_request_context(priority, tenant=tenant, timeout=deadline):
+            data = self.router.generate(prompt, options, timeout=timeout, labels={'operation': operation},
+                                        prefix=prefix)
+        logger.debug(f"Generated with {data['backend']}")
+        return data['response'].strip()
     
     def _build_description_prompt(self, table_name, column_info, sample_values):
         """Build prompt for column description"""
@@ -184,59 +221,6 @@ class AIHarmonizerService:
         Format as markdown bullets, keep total length under 200 words.
         """
     
-    def _build_mapping_prompt(self, prompt_data):
-        """Build prompt for mapping suggestions"""
-        return f"""
-        Analyze these database tables and suggest column mappings for data integration:
-        
-        Source Table: {prompt_data['source_table']}
-        Target Tables: {', '.join(prompt_data['target_tables'])}
-        
-        Available Columns:
-        {json.dumps(prompt_data['columns'], indent=2)}
-        
-        Suggest mappings between source and target columns based on:
-        1. Column name similarity
-        2. Data type compatibility
-        3. Business purpose alignment
-        4. Semantic meaning
-        
-        For each suggestion, provide:
-        - Source table and column
-        - Target table and column
-        - Confidence score (0-1)
-        - Reason for the mapping
-        
-        Return JSON format:
-        {{
-            "suggestions": [
-                {{
-                    "source_table": "table_name",
-                    "source_column": "column_name",
-                    "target_table": "table_name",
-                    "target_column": "column_name",
-                    "confidence": 0.95,
-                    "reason": "Explanation of why these columns should be mapped"
-                }}
-            ]
-        }}
-        """
-    
-    def _parse_ai_response(self, response_text):
-        """Parse AI response to extract JSON"""
-        try:
-            # Extract JSON from the response
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-            if json_start != -1 and json_end != -1:
-                json_str = response_text[json_start:json_end]
-                result = json.loads(json_str)
-                return result.get('suggestions', [])
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse AI response as JSON: {e}")
-        
-        return []
-    
     def _get_column_name_from_metadata(self, col_meta):
         """Extract column name from metadata"""
         possible_keys = ['COLUMN_NAME', 'column_name', 'Column_Name', 'COLUMN', 'column', 'name', 'NAME']
@@ -255,50 +239,28 @@ class AIHarmonizerService:
 - **Example Usage**: Used in data analysis and reporting
 - **Known Issues/Limitations**: Sample values: {sample_values[:3]}
         """
-    
-    def _fallback_suggestions(self, source_table, target_tables, all_columns):
-        """Fallback suggestions when AI fails"""
-        suggestions = []
-        source_columns = all_columns.get(source_table, [])
-        
-        for target_table in target_tables:
-            target_columns = all_columns.get(target_table, [])
-            
-            for src_col in source_columns:
-                for tgt_col in target_columns:
-                    src_name = src_col['column_name'].lower()
-                    tgt_name = tgt_col['column_name'].lower()
-                    
-                    # Exact match
-                    if src_name == tgt_name:
-                        suggestions.append({
-                            "source_table": source_table,
-                            "source_column": src_col['column_name'],
-                            "target_table": target_table,
-                            "target_column": tgt_col['column_name'],
-                            "confidence": 0.95,
-                            "reason": "Exact column name match"
-                        })
-                    
-                    # Common patterns
-                    patterns = [
-                        ('id', 'id'), ('name', 'name'), ('date', 'date'),
-                        ('email', 'email'), ('amount', 'price'), ('total', 'sum'),
-                        ('first', 'given'), ('last', 'family'), ('created', 'date_created')
-                    ]
-                    
-                    for pattern1, pattern2 in patterns:
-                        if pattern1 in src_name and pattern2 in tgt_name:
-                            suggestions.append({
-                                "source_table": source_table,
-                                "source_column": src_col['column_name'],
-                                "target_table": target_table,
-                                "target_column": tgt_col['column_name'],
-                                "confidence": 0.85,
-                                "reason": f"Pattern match: {pattern1} -> {pattern2}"
-                            })
-        
-        return suggestions
 
-# Global AI service instance
-ai_harmonizer_service = AIHarmonizerService()
\ No newline at end of file
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_ai_harmonizer_service(app=None):
+    """
+    The service for `app` (default: the current app), created on first use
+    with that app's config. Works in request handlers, background jobs
+    inside app.app_context() and scripts that pass their app explicitly.
+    """
+    app = app or current_app._get_current_object()
+    with _services_lock:
+        service = app.extensions.get('ai_harmonizer_service')
+        if service is None:
+            service = AIHarmonizerService(app.config)
+            app.extensions['ai_harmonizer_service'] = service
+        return service
+
+
+def __getattr__(name):
+    # Older callers import a module-level instance; resolve it against the current app
+    if name in ('ai_harmonizer_service', 'ai_service'):
+        return get_ai_harmonizer_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
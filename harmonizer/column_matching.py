@@ -0,0 +1,173 @@
+import logging
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List, Any, Tuple, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MATCH_CONFIG = {
+    'ngram': 3,
+    # Candidates kept per source column
+    'top_k': 3,
+    # Cosine similarity below which a pair is not a candidate
+    'min_score': 0.35,
+    # Feature space of the hashed fallback used when scipy is unavailable
+    'hash_features': 4096,
+    # Source rows scored per block, bounding the dense score block to chunk_rows x targets
+    'chunk_rows': 1024
+}
+
+# Abbreviations common in legacy schemas, expanded before matching
+ABBREVIATIONS = {
+    'acct': 'account', 'addr': 'address', 'amt': 'amount', 'avg': 'average', 'bal': 'balance',
+    'cat': 'category', 'cd': 'code', 'cnt': 'count', 'cust': 'customer', 'desc': 'description',
+    'dept': 'department', 'dob': 'birth date', 'dt': 'date', 'emp': 'employee', 'fname': 'first name',
+    'lname': 'last name', 'inv': 'invoice', 'loc': 'location', 'mgr': 'manager', 'mth': 'month',
+    'nbr': 'number', 'no': 'number', 'num': 'number', 'ord': 'order', 'org': 'organization',
+    'pct': 'percent', 'ph': 'phone', 'prod': 'product', 'qty': 'quantity', 'ref': 'reference',
+    'tel': 'phone', 'tot': 'total', 'ts': 'timestamp', 'txn': 'transaction', 'upd': 'updated',
+    'usr': 'user', 'yr': 'year', 'zip': 'postal code', 'postcode': 'postal code'
+}
+
+# Words that mean the same in a mapping, folded onto one spelling
+SYNONYMS = {
+    'given': 'first', 'family': 'last', 'surname': 'last', 'price': 'amount', 'sum': 'total',
+    'mail': 'email', 'telephone': 'phone', 'mobile': 'phone', 'modified': 'updated',
+    'identifier': 'id', 'key': 'id'
+}
+
+
+def column_tokens(name: str) -> List[str]:
+    """
+    Words of a column name: snake, kebab and camel case are split, digits
+    separated, abbreviations expanded and synonyms folded, so custAddr1 and
+    customer_address_1 give the same tokens.
+    """
+    name = re.sub(r'([a-z0-9])([A-Z])', r'\1 \2', str(name))
+    name = re.sub(r'([A-Z]+)([A-Z][a-z])', r'\1 \2', name)
+    name = re.sub(r'([A-Za-z])([0-9])|([0-9])([A-Za-z])', r'\1\3 \2\4', name)
+    tokens = []
+    for token in re.split(r'[^0-9a-z]+', name.lower()):
+        if token:
+            tokens.extend(ABBREVIATIONS.get(token, token).split())
+    return [SYNONYMS.get(token, token) for token in tokens]
+
+
+def normalized_name(name: str) -> str:
+    return ' '.join(column_tokens(name))
+
+
+def _features(text: str) -> Counter:
+    """Character n-grams of the padded name plus one feature per whole word"""
+    n = MATCH_CONFIG['ngram']
+    padded = f" {text} "
+    features = Counter(padded[i:i + n] for i in range(max(len(padded) - n + 1, 1)))
+    features.update(f"w:{word}" for word in text.split())
+    return features
+
+
+def _tfidf_sparse(documents: List[Counter]):
+    from scipy.sparse import csr_matrix
+
+    vocabulary = {}
+    indptr, indices, data = [0], [], []
+    for features in documents:
+        for feature, count in features.items():
+            indices.append(vocabulary.setdefault(feature, len(vocabulary)))
+            data.append(count)
+        indptr.append(len(indices))
+    matrix = csr_matrix((np.asarray(data, dtype=np.float32), np.asarray(indices), np.asarray(indptr)),
+                        shape=(len(documents), len(vocabulary)))
+    document_frequency = np.bincount(matrix.indices, minlength=len(vocabulary))
+    idf = np.log((1 + len(documents)) / (1 + document_frequency)).astype(np.float32) + 1
+    matrix = matrix.multiply(idf).tocsr()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return csr_matrix(matrix.multiply(1 / norms[:, None]))
+
+
+def _tfidf_hashed(documents: List[Counter]) -> np.ndarray:
+    size = MATCH_CONFIG['hash_features']
+    matrix = np.zeros((len(documents), size), dtype=np.float32)
+    for row, features in enumerate(documents):
+        for feature, count in features.items():
+            matrix[row, zlib.crc32(feature.encode()) % size] += count
+    idf = np.log((1 + len(documents)) / (1 + np.count_nonzero(matrix, axis=0))).astype(np.float32) + 1
+    matrix *= idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+def tfidf_vectors(names: List[str]):
+    """
+    L2-normalized char n-gram TF-IDF rows for `names`: a scipy CSR matrix
+    when scipy is installed, else a dense hashed matrix.
+    """
+    documents = [_features(normalized_name(name)) for name in names]
+    try:
+        return _tfidf_sparse(documents)
+    except ImportError:
+        return _tfidf_hashed(documents)
+
+
+def top_k_pairs(source_vectors, target_vectors, top_k: int, min_score: float) -> List[Tuple[int, int, float]]:
+    """(source row, target row, cosine) for each source row's best `top_k` targets above `min_score`"""
+    pairs = []
+    sparse = hasattr(source_vectors, 'tocsr')
+    target_t = target_vectors.T.tocsr() if sparse else target_vectors.T
+    k = min(top_k, target_vectors.shape[0])
+    if k == 0:
+        return pairs
+    for start in range(0, source_vectors.shape[0], MATCH_CONFIG['chunk_rows']):
+        block = source_vectors[start:start + MATCH_CONFIG['chunk_rows']] @ target_t
+        block = block.toarray() if sparse else block
+        best = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(block, best, axis=1)
+        # Order each row's k candidates best first, then keep those above the cutoff
+        order = np.argsort(-scores, axis=1, kind='stable')
+        best = np.take_along_axis(best, order, axis=1)
+        scores = np.take_along_axis(scores, order, axis=1)
+        rows, ranks = np.nonzero(scores >= min_score)
+        pairs.extend(zip((rows + start).tolist(), best[rows, ranks].tolist(), scores[rows, ranks].tolist()))
+    return pairs
+
+
+def match_columns(sources: List[Dict[str, Any]], targets: List[Dict[str, Any]],
+                  top_k: Optional[int] = None, min_score: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Rank target columns for every source column by name similarity.
+
+    Parameters:
+    - sources, targets: dicts with 'table' and 'column' (extra keys are ignored).
+
+    Returns:
+    - list: one dict per (source, target) candidate with source_table,
+      source_column, target_table, target_column and score, best first per
+      source column and without duplicates.
+    """
+    if not sources or not targets:
+        return []
+    top_k = top_k or MATCH_CONFIG['top_k']
+    min_score = MATCH_CONFIG['min_score'] if min_score is None else min_score
+
+    # Shared vocabulary and IDF, so scores are comparable across both sides
+    vectors = tfidf_vectors([column['column'] for column in sources] + [column['column'] for column in targets])
+    source_vectors, target_vectors = vectors[:len(sources)], vectors[len(sources):]
+
+    matches, seen = [], set()
+    for source_index, target_index, score in top_k_pairs(source_vectors, target_vectors, top_k, min_score):
+        source, target = sources[source_index], targets[target_index]
+        key = (source['table'], source['column'], target['table'], target['column'])
+        if key in seen:
+            continue
+        seen.add(key)
+        matches.append({
+            'source_table': source['table'], 'source_column': source['column'],
+            'target_table': target['table'], 'target_column': target['column'],
+            'score': round(min(score, 1.0), 4)
+        })
+    return matches
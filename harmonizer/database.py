@@ -1,8 +1,11 @@
-from sqlalchemy import create_engine, text, inspect
+from sqlalchemy import create_engine, text, inspect, func, tuple_
 from sqlalchemy.orm import sessionmaker
 import pandas as pd
 from flask import current_app
 import logging
+import threading
+from data_dictionary.write_behind import get_write_behind
+from data_dictionary.catalog_search import index_descriptions
 
 logger = logging.getLogger(__name__)
 
@@ -180,6 +183,47 @@ def get_column_metadata(connection_string=None, db_type='mysql', table_name=None
         logger.error(f"Error getting column metadata for {table_name}: {e}")
         return []
 
+def get_schema_columns(connection_string=None, db_type='mysql', schema_name=None, tables=None):
+    """
+    Columns of every table in a schema in one information_schema query, as
+    dicts with table, column and data_type. `tables` limits the result.
+    """
+    engine = get_source_db_connection(connection_string)
+    wanted = set(tables) if tables else None
+
+    try:
+        if db_type.lower() in ['mysql', 'mariadb', 'mssql', 'sqlserver', 'azure_sql', 'postgresql', 'redshift']:
+            if schema_name:
+                condition, params = "table_schema = :schema", {'schema': schema_name}
+            elif db_type.lower() in ['mysql', 'mariadb']:
+                condition, params = "table_schema = DATABASE()", {}
+            elif db_type.lower() in ['postgresql', 'redshift']:
+                condition, params = "table_schema = 'public'", {}
+            else:
+                condition, params = "1 = 1", {}
+            query = text(f"""
+                SELECT table_name, column_name, data_type
+                FROM information_schema.columns
+                WHERE {condition}
+                ORDER BY table_name, ordinal_position
+            """)
+            with engine.connect() as conn:
+                rows = conn.execute(query, params).fetchall()
+            columns = [{'table': row[0], 'column': row[1], 'data_type': row[2]} for row in rows]
+        else:
+            # Fallback for other database types
+            inspector = inspect(engine)
+            columns = [{'table': table, 'column': column['name'], 'data_type': str(column['type'])}
+                       for table in inspector.get_table_names(schema=schema_name)
+                       if wanted is None or table in wanted
+                       for column in inspector.get_columns(table, schema=schema_name)]
+
+        return [column for column in columns if wanted is None or column['table'] in wanted]
+
+    except Exception as e:
+        logger.error(f"Error getting columns of schema {schema_name}: {e}")
+        return []
+
 def get_sample_data(connection_string=None, db_type='mysql', table_name=None, schema_name=None, limit=5):
     """Get sample data from table"""
     if not table_name:
@@ -218,40 +262,239 @@ def get_sample_data(connection_string=None, db_type='mysql', table_name=None, sc
         logger.error(f"Error getting sample data from {table_name}: {e}")
         return pd.DataFrame()
 
+DESCRIPTION_FIELDS = ('business_purpose', 'data_quality_rules', 'example_usage', 'issues')
+# Rows per upsert statement or key lookup
+UPSERT_CHUNK_SIZE = 1000
+
+
+def _description_rows(descriptions):
+    """One row per (table_name, column_name); the last description for a key wins"""
+    rows = {}
+    for desc in descriptions:
+        row = {'table_name': desc['table_name'], 'column_name': desc['column_name']}
+        row.update({field: desc.get(field, '') for field in DESCRIPTION_FIELDS})
+        rows[(row['table_name'], row['column_name'])] = row
+    return list(rows.values())
+
+
+def _native_upsert(model, dialect_name, key_columns, update_fields):
+    """INSERT ... ON DUPLICATE KEY / ON CONFLICT statement for the model, or None if unsupported"""
+    if dialect_name in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(model.__table__)
+        return stmt.on_duplicate_key_update(
+            updated_at=func.now(),
+            **{field: stmt.inserted[field] for field in update_fields}
+        )
+    if dialect_name in ('postgresql', 'sqlite'):
+        if dialect_name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(model.__table__)
+        return stmt.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={'updated_at': func.now(), **{field: stmt.excluded[field] for field in update_fields}}
+        )
+    return None
+
+
+def _upsert_rows(model, rows, key_columns, update_fields):
+    """
+    Upsert `rows` (dicts) into the model's table inside the current session,
+    matching on `key_columns`. Uses the dialect's native upsert where there is
+    one; elsewhere existing ids are loaded with one IN query per chunk and the
+    chunk is written with one bulk update and one bulk insert.
+    """
+    from .models import db
+    
+    upsert = _native_upsert(model, db.session.get_bind().dialect.name, key_columns, update_fields)
+    key_attributes = [getattr(model, column) for column in key_columns]
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        chunk = rows[start:start + UPSERT_CHUNK_SIZE]
+        if upsert is not None:
+            db.session.execute(upsert, chunk)
+            continue
+        
+        keys = [tuple(row[column] for column in key_columns) for row in chunk]
+        existing = {
+            tuple(found[1:]): found[0]
+            for found in db.session.query(model.id, *key_attributes).filter(tuple_(*key_attributes).in_(keys))
+        }
+        updates = [{**row, 'id': existing[key]} for key, row in zip(keys, chunk) if key in existing]
+        inserts = [row for key, row in zip(keys, chunk) if key not in existing]
+        if updates:
+            db.session.bulk_update_mappings(model, updates)
+        if inserts:
+            db.session.bulk_insert_mappings(model, inserts)
+
+
 def save_column_descriptions(descriptions):
-    """Save column descriptions to database"""
+    """
+    Upsert column descriptions in one transaction, a constant number of
+    round trips per chunk of UPSERT_CHUNK_SIZE rows.
+    """
     from .models import ColumnDescription, db
     
+    rows = _description_rows(descriptions)
+    if not rows:
+        return True
+    
     try:
-        for desc in descriptions:
-            # Check if description already exists
-            existing = ColumnDescription.query.filter_by(
-                TableName=desc['table_name'],
-                ColumnName=desc['column_name']
-            ).first()
-            
-            if existing:
-                # Update existing
-                existing.business_purpose = desc.get('business_purpose', '')
-                existing.data_quality_rules = desc.get('data_quality_rules', '')
-                existing.example_usage = desc.get('example_usage', '')
-                existing.issues = desc.get('issues', '')
-            else:
-                # Create new
-                new_desc = ColumnDescription(
-                    TableName=desc['table_name'],
-                    ColumnName=desc['column_name'],
-                    business_purpose=desc.get('business_purpose', ''),
-                    data_quality_rules=desc.get('data_quality_rules', ''),
-                    example_usage=desc.get('example_usage', ''),
-                    issues=desc.get('issues', '')
-                )
-                db.session.add(new_desc)
-        
+        _upsert_rows(ColumnDescription, rows, ('table_name', 'column_name'), DESCRIPTION_FIELDS)
         db.session.commit()
+        url = db.session.get_bind().url
+        # The URL omits the default port; the catalog source key always carries one
+        index_descriptions({'host': url.host, 'port': url.port or 3306, 'database': url.database}, rows)
+        logger.info(f"Saved {len(rows)} column descriptions")
         return True
         
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error saving column descriptions: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+MAPPING_KEY = ('source_table', 'source_column', 'target_table', 'target_column')
+MAPPING_FIELDS = ('mapping_type', 'confidence_score', 'created_by')
+# Values of the ColumnMapping.mapping_type enum
+MAPPING_TYPES = ('exact', 'fuzzy', 'transformed')
+MAPPING_PAGE_SIZE = 100
+MAPPING_MAX_PAGE_SIZE = 1000
+
+_mapping_schema_ready = False
+_mapping_schema_lock = threading.Lock()
+
+
+def mapping_key(mapping):
+    return tuple(mapping[column] for column in MAPPING_KEY)
+
+
+def ensure_mapping_schema():
+    """
+    Create the mapping_version table and any column_mappings index an older
+    table lacks. Runs once per process.
+    """
+    global _mapping_schema_ready
+    from .models import ColumnMapping, MappingVersion, db
+    
+    with _mapping_schema_lock:
+        if _mapping_schema_ready:
+            return
+        try:
+            MappingVersion.__table__.create(db.engine, checkfirst=True)
+            existing = {index['name'] for index in inspect(db.engine).get_indexes(ColumnMapping.__tablename__)}
+            for index in ColumnMapping.__table__.indexes:
+                if index.name not in existing:
+                    index.create(db.engine)
+                    logger.info(f"Created index {index.name} on {ColumnMapping.__tablename__}")
+        except Exception as e:
+            logger.warning(f"Could not update the column_mappings schema: {e}")
+        _mapping_schema_ready = True
+
+
+def bump_mapping_version():
+    """Advance the mapping version inside the current transaction; call before committing a mapping write"""
+    from .models import MappingVersion, db
+    
+    ensure_mapping_schema()
+    updated = (db.session.query(MappingVersion).filter_by(id=1)
+               .update({MappingVersion.version: MappingVersion.version + 1}, synchronize_session=False))
+    if not updated:
+        db.session.add(MappingVersion(id=1, version=1))
+
+
+def get_mapping_version():
+    from .models import MappingVersion, db
+    
+    return db.session.query(MappingVersion.version).filter_by(id=1).scalar() or 0
+
+
+def mapping_matches(mapping, filters):
+    """Whether a mapping dict passes the filters of query_mappings"""
+    for column in ('source_table', 'target_table', 'mapping_type'):
+        if column in filters and mapping.get(column) != filters[column]:
+            return False
+    confidence = mapping.get('confidence_score')
+    if 'min_confidence' in filters and (confidence is None or confidence < filters['min_confidence']):
+        return False
+    if 'max_confidence' in filters and (confidence is None or confidence > filters['max_confidence']):
+        return False
+    return True
+
+
+def query_mappings(filters, after=None, limit=MAPPING_PAGE_SIZE):
+    """
+    One page of column mappings, newest first, with keyset pagination on id.
+    
+    Parameters:
+    - filters: any of source_table, target_table, mapping_type (exact
+      matches), min_confidence and max_confidence (inclusive).
+    - after: the id of the last mapping of the previous page.
+    
+    Returns:
+    - tuple: (mappings, next cursor or None on the last page).
+    """
+    from .models import ColumnMapping
+    
+    query = ColumnMapping.query
+    for column in ('source_table', 'target_table', 'mapping_type'):
+        if column in filters:
+            query = query.filter(getattr(ColumnMapping, column) == filters[column])
+    if 'min_confidence' in filters:
+        query = query.filter(ColumnMapping.confidence_score >= filters['min_confidence'])
+    if 'max_confidence' in filters:
+        query = query.filter(ColumnMapping.confidence_score <= filters['max_confidence'])
+    if after is not None:
+        query = query.filter(ColumnMapping.id < after)
+    
+    # One extra row tells whether there is a next page without a COUNT
+    rows = query.order_by(ColumnMapping.id.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1].id
+    return rows, None
+
+
+def save_column_mappings(mappings):
+    """
+    Upsert column mappings in one transaction; a repeated mapping updates its
+    type, confidence and author. Raises on failure so the write-behind queue
+    keeps the mappings for a retry.
+    """
+    from .models import ColumnMapping, db
+    
+    rows = {}
+    for mapping in mappings:
+        row = {column: mapping[column] for column in MAPPING_KEY}
+        row.update({
+            'mapping_type': mapping.get('mapping_type', 'exact'),
+            'confidence_score': mapping.get('confidence_score', 1.0),
+            'created_by': mapping.get('created_by', 'system')
+        })
+        rows[mapping_key(row)] = row
+    if not rows:
+        return
+    
+    try:
+        _upsert_rows(ColumnMapping, list(rows.values()), MAPPING_KEY, MAPPING_FIELDS)
+        bump_mapping_version()
+        db.session.commit()
+        logger.info(f"Saved {len(rows)} column mappings")
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def validate_mapping(mapping):
+    """Raise ValueError for a mapping the write-behind queue must refuse"""
+    for column in MAPPING_KEY:
+        if not isinstance(mapping.get(column), str) or not mapping[column]:
+            raise ValueError(f"{column} must be a non-empty string")
+    if mapping.get('mapping_type', 'exact') not in MAPPING_TYPES:
+        raise ValueError(f"mapping_type must be one of {', '.join(MAPPING_TYPES)}")
+    confidence = mapping.get('confidence_score', 1.0)
+    if confidence is not None and (isinstance(confidence, bool) or not isinstance(confidence, (int, float))):
+        raise ValueError("confidence_score must be a number")
+
+
+get_write_behind().register('column_mappings', save_column_mappings, key=mapping_key, validate=validate_mapping)
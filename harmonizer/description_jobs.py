@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from llm.request_queue import BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+JOB_CONFIG = {
+    'max_workers': 2,
+    # Columns per LLM call
+    'batch_size': 8,
+    # Finished jobs are kept this many seconds for follow-up requests
+    'result_ttl': 900
+}
+
+
+class DescriptionJob:
+    """Background generation of the missing descriptions of one table"""
+
+    def __init__(self, table_name, column_names, tenant=None):
+        self.id = uuid.uuid4().hex
+        self.table_name = table_name
+        self.column_names = list(column_names)
+        self.tenant = tenant
+        self.status = 'pending'
+        self.descriptions = {}
+        self.error = None
+        self.finished_at = None
+
+    def publish(self, descriptions):
+        """Make a finished batch visible to pollers; the dict is replaced, never mutated"""
+        self.descriptions = {**self.descriptions, **descriptions}
+
+    def to_dict(self):
+        descriptions = self.descriptions
+        return {
+            'job_id': self.id,
+            'table_name': self.table_name,
+            'status': self.status,
+            'descriptions': descriptions,
+            'pending': [name for name in self.column_names if name not in descriptions],
+            'error': self.error
+        }
+
+
+class DescriptionJobs:
+    """
+    Runs description generation off the request thread.
+
+    A table's missing columns are generated as one job in batches at
+    background priority; each batch is published on the job as it completes
+    and the whole job is saved in a single call. Asking again for the same table and columns while a
+    job is pending returns that job instead of starting another.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=JOB_CONFIG['max_workers'],
+                                            thread_name_prefix='harmonizer-descriptions')
+        self._jobs = {}
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        now = time.monotonic()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at and now - job.finished_at > JOB_CONFIG['result_ttl']:
+                del self._jobs[job_id]
+        for key, job in list(self._active.items()):
+            if job.id not in self._jobs:
+                del self._active[key]
+
+    def submit(self, app, table_name, columns, tenant=None):
+        """
+        Queue generation for `columns`, a list of (column_info, sample_values)
+        tuples, and return the job.
+        """
+        from .harmoniser_routes import get_column_name_from_metadata
+
+        column_names = [get_column_name_from_metadata(column_info) for column_info, _ in columns]
+        key = (table_name, tuple(sorted(column_names)))
+        with self._lock:
+            self._expire()
+            active = self._active.get(key)
+            if active and active.status in ('pending', 'running'):
+                return active
+            job = DescriptionJob(table_name, column_names, tenant)
+            self._jobs[job.id] = job
+            self._active[key] = job
+
+        self._executor.submit(self._run, app, job, columns)
+        return job
+
+    def _run(self, app, job, columns):
+        from .ai_harmonizer_service import get_ai_harmonizer_service
+        from .harmoniser_routes import parse_markdown_description
+        from .database import save_column_descriptions
+
+        def publish(markdown):
+            job.publish({column_name: parse_markdown_description(text) for column_name, text in markdown.items()})
+
+        job.status = 'running'
+        try:
+            # Database access and the service's config need the application context
+            with app.app_context():
+                get_ai_harmonizer_service(app).generate_column_descriptions(
+                    job.table_name, columns, batch_size=JOB_CONFIG['batch_size'], tenant=job.tenant,
+                    priority=BACKGROUND, on_batch=publish)
+                save_column_descriptions([{'table_name': job.table_name, 'column_name': column_name, **description}
+                                          for column_name, description in job.descriptions.items()])
+            job.status = 'done'
+        except Exception as e:
+            logger.error(f"Description job {job.id} for {job.table_name} failed: {e}")
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.monotonic()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+
+description_jobs = DescriptionJobs()
@@ -52,6 +52,11 @@ class ColumnMapping(db.Model):
     __table_args__ = (
         db.UniqueConstraint('source_table', 'source_column', 'target_table', 'target_column', 
                            name='unique_mapping'),
+        # Filters of GET /api/mappings, each paired with id for keyset pagination
+        db.Index('ix_mapping_source_id', 'source_table', 'id'),
+        db.Index('ix_mapping_target_id', 'target_table', 'id'),
+        db.Index('ix_mapping_type_id', 'mapping_type', 'id'),
+        db.Index('ix_mapping_confidence_id', 'confidence_score', 'id'),
     )
     
     def to_dict(self):
@@ -69,6 +74,13 @@ class ColumnMapping(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+class MappingVersion(db.Model):
+    """Single-row counter bumped by every write to column_mappings; the mappings ETag"""
+    __tablename__ = 'mapping_version'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
 class MappingSession(db.Model):
     __tablename__ = 'mapping_sessions'
     
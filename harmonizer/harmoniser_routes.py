@@ -1,9 +1,14 @@
-from flask import render_template, jsonify, request, current_app
+from flask import render_template, jsonify, request, current_app, url_for
+from flask import session as user_session
 from . import data_mapping_bp
 from .models import db  # Only import db here
 import pandas as pd
+import hashlib
+import json
 import logging
 import re
+from data_dictionary.write_behind import get_write_behind
+from llm.request_queue import BULK
 
 logger = logging.getLogger(__name__)
 
@@ -33,7 +38,14 @@ def get_tables():
 
 @data_mapping_bp.route('/api/columns/<table_name>', methods=['GET'])
 def get_columns(table_name):
-    """Get columns for a specific table with descriptions"""
+    """
+    Get columns for a specific table with descriptions.
+    
+    Stored descriptions are returned immediately. Columns without one come
+    back with empty description fields and description_status 'pending'
+    while a background job generates them; the job's URL is in the
+    X-Description-Job header and each pending column's description_job.
+    """
     try:
         connection_string = current_app.config.get('GLOBAL_CONNECTION_STRING')
         if not connection_string:
@@ -58,6 +70,7 @@ def get_columns(table_name):
         desc_dict = {desc.column_name: desc for desc in existing_descriptions}
         
         columns = []
+        missing = []
         for col_meta in column_metadata:
             # Handle different database column name cases
             column_name = get_column_name_from_metadata(col_meta)
@@ -69,32 +82,25 @@ def get_columns(table_name):
             if not sample_df.empty and column_name in sample_df.columns:
                 sample_values = sample_df[column_name].dropna().head(3).tolist()
             
-            # Get or generate description
+            # Use the stored description or leave a placeholder for the background job
             if column_name in desc_dict:
                 desc = desc_dict[column_name]
                 description = {
                     'business_purpose': desc.business_purpose,
                     'data_quality_rules': desc.data_quality_rules,
                     'example_usage': desc.example_usage,
-                    'issues': desc.issues
+                    'issues': desc.issues,
+                    'description_status': 'ready'
                 }
             else:
-                from .ai_harmonizer_service import ai_service
-                # Generate new description using AI
-                ai_description = ai_service.generate_column_description(
-                    table_name, col_meta, sample_values
-                )
-                description = parse_markdown_description(ai_description)
-                
-                # Save to database
-                save_column_descriptions([{
-                    'table_name': table_name,
-                    'column_name': column_name,
-                    'business_purpose': description.get('business_purpose', ''),
-                    'data_quality_rules': description.get('data_quality_rules', ''),
-                    'example_usage': description.get('example_usage', ''),
-                    'issues': description.get('issues', '')
-                }])
+                description = {
+                    'business_purpose': '',
+                    'data_quality_rules': '',
+                    'example_usage': '',
+                    'issues': '',
+                    'description_status': 'pending'
+                }
+                missing.append((col_meta, sample_values))
             
             columns.append({
                 'column_name': column_name,
@@ -105,11 +111,34 @@ def get_columns(table_name):
                 **description
             })
         
-        return jsonify(columns)
+        job_url = None
+        if missing:
+            from .description_jobs import description_jobs
+            job = description_jobs.submit(current_app._get_current_object(), table_name, missing,
+                                          tenant=user_session.get('company_id'))
+            job_url = url_for('.get_column_descriptions_job', table_name=table_name, job_id=job.id)
+            for column in columns:
+                if column['description_status'] == 'pending':
+                    column['description_job'] = job_url
+        
+        response = jsonify(columns)
+        if job_url:
+            response.headers['X-Description-Job'] = job_url
+        return response
     except Exception as e:
         logger.error(f"Error getting columns for table {table_name}: {e}")
         return jsonify({'error': str(e)}), 500
 
+@data_mapping_bp.route('/api/columns/<table_name>/descriptions/<job_id>', methods=['GET'])
+def get_column_descriptions_job(table_name, job_id):
+    """Descriptions generated so far by a get_columns background job"""
+    from .description_jobs import description_jobs
+    
+    job = description_jobs.get(job_id)
+    if not job or job.table_name != table_name:
+        return jsonify({'error': 'Unknown or expired description job'}), 404
+    return jsonify(job.to_dict())
+
 @data_mapping_bp.route('/api/ai/suggestions', methods=['POST'])
 def get_ai_suggestions():
     """Get AI-powered mapping suggestions"""
@@ -122,7 +151,8 @@ def get_ai_suggestions():
             return jsonify({'error': 'Missing source_table or target_tables'}), 400
         
         from .models import ColumnDescription
-        from .ai_harmonizer_service import ai_service
+        from .ai_harmonizer_service import get_ai_harmonizer_service
+        ai_service = get_ai_harmonizer_service()
         
         # Get all column descriptions
         all_columns = {}
@@ -135,7 +165,8 @@ def get_ai_suggestions():
                     'column_name': desc.column_name,
                     'business_purpose': desc.business_purpose,
                     'data_type': 'Unknown',
-                    'example_usage': desc.example_usage
+                    'example_usage': desc.example_usage,
+                    'description_version': desc.updated_at.isoformat() if desc.updated_at else None
                 }
                 for desc in descriptions
             ]
@@ -147,14 +178,128 @@ def get_ai_suggestions():
         logger.error(f"Error getting AI suggestions: {e}")
         return jsonify({'error': str(e)}), 500
 
+@data_mapping_bp.route('/api/ai/harmonize', methods=['POST'])
+def harmonize_schemas():
+    """
+    Suggest mappings from every column of one schema to another.
+
+    JSON body: source_schema, target_schema, optional db_type, source_tables
+    and target_tables (to narrow either side) and use_values (also match on
+    sampled value overlap; slower on the first run, incremental after).
+    """
+    try:
+        connection_string = current_app.config.get('GLOBAL_CONNECTION_STRING')
+        if not connection_string:
+            return jsonify({'error': 'No database connection configured'}), 400
+
+        data = request.json or {}
+        source_schema = data.get('source_schema')
+        target_schema = data.get('target_schema')
+        db_type = data.get('db_type', 'mysql')
+        if not source_schema or not target_schema:
+            return jsonify({'error': 'Missing source_schema or target_schema'}), 400
+
+        from .models import ColumnDescription
+        from .database import get_schema_columns
+        from .ai_harmonizer_service import get_ai_harmonizer_service
+
+        source_columns = get_schema_columns(connection_string, db_type, source_schema, data.get('source_tables'))
+        target_columns = get_schema_columns(connection_string, db_type, target_schema, data.get('target_tables'))
+        if not source_columns or not target_columns:
+            return jsonify({'error': 'No columns found in the source or target schema'}), 404
+
+        # Stored business purposes give the LLM context for ambiguous columns
+        tables = sorted({column['table'] for column in source_columns + target_columns})
+        purposes = {(desc.table_name, desc.column_name): desc.business_purpose
+                    for desc in ColumnDescription.query.filter(ColumnDescription.table_name.in_(tables)).all()}
+        for column in source_columns + target_columns:
+            column['business_purpose'] = purposes.get((column['table'], column['column']))
+
+        value_index = value_sources = None
+        if data.get('use_values'):
+            from .value_signatures import get_value_index, index_source_values
+            value_index = get_value_index()
+            value_sources = tuple(
+                index_source_values(connection_string, db_type, schema,
+                                    sorted({column['table'] for column in columns}), index=value_index)
+                for schema, columns in ((source_schema, source_columns), (target_schema, target_columns)))
+
+        # A whole schema is bulk work: mapping suggestions for page loads go first
+        result = get_ai_harmonizer_service().harmonize(source_columns, target_columns,
+                                                       value_index=value_index, value_sources=value_sources,
+                                                       priority=BULK)
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error harmonizing schemas: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def _mapping_filters(args):
+    """Filters of GET /api/mappings from the query string; raises ValueError on a bad number"""
+    filters = {column: args[column] for column in ('source_table', 'target_table', 'mapping_type') if args.get(column)}
+    for bound in ('min_confidence', 'max_confidence'):
+        if args.get(bound):
+            filters[bound] = float(args[bound])
+    return filters
+
 @data_mapping_bp.route('/api/mappings', methods=['GET', 'POST'])
 def handle_mappings():
-    """Get or save column mappings"""
+    """
+    Get or save column mappings.
+    
+    GET returns one page, newest first, filtered by source_table,
+    target_table, mapping_type, min_confidence and max_confidence. Pass the
+    X-Next-Cursor header of a page as `after` for the next one (also in the
+    Link header); `limit` sets the page size. Mappings still waiting in the
+    write-behind queue come first, marked pending, and count toward `limit`;
+    a cursor of the form p<N> continues after the first N of them. Responses
+    carry an ETag that changes with every mapping write, so If-None-Match
+    gets a 304 without a query.
+    
+    POST answers 202 with queued: true and the mapping's key instead of an
+    id when the write goes through the write-behind queue; the mapping is
+    listed as pending until it is stored, and 400 means it was refused.
+    """
     if request.method == 'GET':
         try:
-            from .models import ColumnMapping
-            mappings = ColumnMapping.query.all()
-            return jsonify([{
+            from .database import (MAPPING_PAGE_SIZE, MAPPING_MAX_PAGE_SIZE, ensure_mapping_schema,
+                                   get_mapping_version, mapping_key, mapping_matches, query_mappings)
+            try:
+                filters = _mapping_filters(request.args)
+                after, pending_offset = request.args.get('after') or None, 0
+                if after is not None and after.startswith('p'):
+                    after, pending_offset = None, int(after[1:])
+                elif after is not None:
+                    after = int(after)
+                limit = int(request.args.get('limit') or MAPPING_PAGE_SIZE)
+            except ValueError:
+                return jsonify({'error': 'after, limit and the confidence bounds must be numbers'}), 400
+            limit = max(1, min(limit, MAPPING_MAX_PAGE_SIZE))
+            
+            ensure_mapping_schema()
+            # Queued mappings supersede their stored rows on every page, so they are part of the ETag
+            pending = get_write_behind().pending('column_mappings')
+            etag = str(get_mapping_version())
+            if pending:
+                digest = hashlib.sha1(json.dumps(pending, sort_keys=True, default=str).encode()).hexdigest()
+                etag += '-' + digest[:12]
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                return response
+            
+            queued = list({mapping_key(m): m for m in pending if mapping_matches(m, filters)}.values())
+            queued_keys = {mapping_key(m) for m in queued}
+            shown = queued[pending_offset:pending_offset + limit] if after is None else []
+            mappings = [{**m, 'created_at': None, 'pending': True} for m in shown]
+            room = limit - len(shown)
+            if room:
+                rows, next_cursor = query_mappings(filters, after, room)
+            else:
+                # The page is all pending mappings; continue with the rest of them, then the stored ones
+                more = len(queued) > pending_offset + limit or query_mappings(filters, None, 1)[0]
+                rows, next_cursor = [], f"p{pending_offset + limit}" if more else None
+            mappings += [{
+                'id': m.id,
                 'source_table': m.source_table,
                 'source_column': m.source_column,
                 'target_table': m.target_table,
@@ -162,7 +307,18 @@ def handle_mappings():
                 'mapping_type': m.mapping_type,
                 'confidence_score': m.confidence_score,
                 'created_at': m.created_at.isoformat() if m.created_at else None
-            } for m in mappings])
+            } for m in rows]
+            mappings = [m for m in mappings if m.get('pending') or mapping_key(m) not in queued_keys]
+            
+            response = jsonify(mappings)
+            response.set_etag(etag)
+            # Let browsers keep the page but revalidate it every time
+            response.headers['Cache-Control'] = 'no-cache'
+            if next_cursor is not None:
+                next_url = url_for('.handle_mappings', **{**request.args.to_dict(), 'after': next_cursor})
+                response.headers['X-Next-Cursor'] = str(next_cursor)
+                response.headers['Link'] = f'<{next_url}>; rel="next"'
+            return response
         except Exception as e:
             logger.error(f"Error getting mappings: {e}")
             return jsonify({'error': str(e)}), 500
@@ -170,7 +326,23 @@ def handle_mappings():
     else:  # POST
         try:
             from .models import ColumnMapping
+            from .database import MAPPING_KEY, bump_mapping_version
             data = request.json
+            queued = {column: data[column] for column in MAPPING_KEY}
+            queued.update({
+                'mapping_type': data.get('mapping_type', 'exact'),
+                'confidence_score': data.get('confidence_score', 1.0),
+                'created_by': data.get('created_by', 'system')
+            })
+            try:
+                enqueued = get_write_behind().enqueue('column_mappings', [queued])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            if enqueued:
+                # No id until the batch is written; the key identifies the mapping meanwhile
+                return jsonify({'success': True, 'queued': True,
+                                'key': {column: queued[column] for column in MAPPING_KEY}}), 202
+            
             mapping = ColumnMapping(
                 source_table=data['source_table'],
                 source_column=data['source_column'],
@@ -181,6 +353,7 @@ def handle_mappings():
                 created_by=data.get('created_by', 'system')
             )
             db.session.add(mapping)
+            bump_mapping_version()
             db.session.commit()
             return jsonify({'success': True, 'id': mapping.id})
         except Exception as e:
@@ -204,7 +377,7 @@ def create_session():
         return jsonify({'success': True, 'session_id': session.id})
     except Exception as e:
         db.session.rollback()
-        logger.error(f"Error creating session: {e})
+        logger.error(f"Error creating session: {e}")
         return jsonify({'error': str(e)}), 500
 
 def get_column_name_from_metadata(col_meta):
@@ -0,0 +1,316 @@
+import hashlib
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from string import ascii_lowercase
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from data_dictionary.column_dedup import dtype_family
+from .column_matching import match_columns
+
+logger = logging.getLogger(__name__)
+
+HARMONIZATION_CONFIG = {
+    # Name-similarity candidates kept per source column
+    'top_k': 4,
+    # Candidates scoring below this are dropped; a column with none left is unmatched
+    'min_score': 0.35,
+    # A best candidate at or above this, clearly ahead of the runner-up, is accepted without the LLM
+    'accept_score': 0.9,
+    'accept_margin': 0.15,
+    # Ambiguous source columns per LLM prompt, and concurrent prompts
+    'llm_batch_columns': 8,
+    'llm_workers': 3,
+    # Ambiguous source columns sent to the LLM per run; the rest keep their best candidate
+    'max_llm_columns': 400,
+    'purpose_chars': 120
+}
+
+# Coarse type families that can hold the same data; a pair of families not listed
+# (and not equal) is incompatible and never becomes a candidate
+TYPE_COMPATIBILITY = {
+    ('decimal', 'integer'): 0.9,
+    ('boolean', 'integer'): 0.8,
+    ('boolean', 'text'): 0.7,
+    ('decimal', 'text'): 0.7,
+    ('integer', 'text'): 0.7,
+    ('temporal', 'text'): 0.7
+}
+
+# Bump when the resolution prompt or the candidate scoring changes; cached suggestions are keyed on it
+PROMPT_VERSION = 1
+
+# A resolver takes a batch of (source column, candidates) and returns the chosen
+# candidate index (or None for no mapping), a confidence and a reason per column
+Resolver = Callable[[List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]], Dict[int, Dict[str, Any]]]
+
+
+def type_compatibility(type_a: Optional[str], type_b: Optional[str]) -> float:
+    """1.0 for the same family or an unknown type, a discount for convertible families, else 0"""
+    if not type_a or not type_b or 'unknown' in (str(type_a).lower(), str(type_b).lower()):
+        return 1.0
+    family_a, family_b = dtype_family(type_a), dtype_family(type_b)
+    if family_a == family_b:
+        return 1.0
+    return TYPE_COMPATIBILITY.get(tuple(sorted((family_a, family_b))), 0.0)
+
+
+def prompt_version() -> str:
+    """PROMPT_VERSION plus a hash of the settings that shape the suggestions"""
+    settings = json.dumps([HARMONIZATION_CONFIG, sorted(TYPE_COMPATIBILITY.items())], sort_keys=True)
+    return f"{PROMPT_VERSION}-{hashlib.sha1(settings.encode()).hexdigest()[:8]}"
+
+
+def _column_key(source: Optional[str], column: Dict[str, Any]):
+    return (source, column['table'], column['column'])
+
+
+def generate_candidates(source_columns: List[Dict[str, Any]], target_columns: List[Dict[str, Any]],
+                        value_index=None, value_sources: Optional[Tuple[str, str]] = None) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Cheap blocking stage: candidate target columns per source column.
+
+    Pairs come from name similarity over the whole target schema and, when a
+    value index and the (source, target) labels it was filled under are given,
+    from LSH value overlap, so cryptic names with shared values still meet.
+    Each pair is scored as the noisy-or of name and value evidence, scaled by
+    type compatibility.
+
+    Returns:
+    - dict: source column index -> candidates, best first, each with the
+      target index, name, value and combined scores.
+    """
+    top_k, min_score = HARMONIZATION_CONFIG['top_k'], HARMONIZATION_CONFIG['min_score']
+    source_index = {(column['table'], column['column']): i for i, column in enumerate(source_columns)}
+    target_index = {(column['table'], column['column']): i for i, column in enumerate(target_columns)}
+
+    pairs = {}
+    # Name evidence: a lower cutoff than min_score, since value overlap can lift a pair
+    for match in match_columns(source_columns, target_columns, top_k=top_k, min_score=min_score / 2):
+        pair = (source_index[(match['source_table'], match['source_column'])],
+                target_index[(match['target_table'], match['target_column'])])
+        pairs[pair] = {'name_score': match['score'], 'value_score': None}
+
+    if value_index is not None and value_sources:
+        source_label, target_label = value_sources
+        source_keys = {_column_key(source_label, column): i for i, column in enumerate(source_columns)}
+        target_keys = {_column_key(target_label, column): i for i, column in enumerate(target_columns)}
+        # Value evidence for the name candidates...
+        for (s, t), scores in pairs.items():
+            overlap = value_index.overlap(_column_key(source_label, source_columns[s]),
+                                          _column_key(target_label, target_columns[t]))
+            if overlap:
+                scores['value_score'] = max(overlap['jaccard'], overlap['containment'], overlap['containment_reverse'])
+        # ...and pairs found by value overlap alone
+        for overlap in value_index.candidates(sources={source_label, target_label},
+                                              cross_source=source_label != target_label):
+            a = (overlap['source'], overlap['source_table'], overlap['source_column'])
+            b = (overlap['target'], overlap['target_table'], overlap['target_column'])
+            if a in source_keys and b in target_keys:
+                pair = (source_keys[a], target_keys[b])
+                containment, reverse = overlap['containment'], overlap['containment_reverse']
+            elif b in source_keys and a in target_keys:
+                pair = (source_keys[b], target_keys[a])
+                containment, reverse = overlap['containment_reverse'], overlap['containment']
+            else:
+                continue
+            scores = pairs.setdefault(pair, {'name_score': 0.0, 'value_score': None})
+            scores['value_score'] = max(overlap['jaccard'], containment, reverse)
+
+    candidates = {}
+    for (s, t), scores in pairs.items():
+        compatibility = type_compatibility(source_columns[s].get('data_type'), target_columns[t].get('data_type'))
+        if not compatibility:
+            continue
+        value_score = scores['value_score'] or 0.0
+        score = compatibility * (1 - (1 - scores['name_score']) * (1 - value_score))
+        if score >= min_score:
+            candidates.setdefault(s, []).append({'target': t, 'score': round(score, 4), **scores})
+    for source_candidates in candidates.values():
+        source_candidates.sort(key=lambda candidate: -candidate['score'])
+        del source_candidates[top_k:]
+    return candidates
+
+
+def is_confident(candidates: List[Dict[str, Any]]) -> bool:
+    """True when the best candidate is strong and clearly ahead, so the LLM isn't needed"""
+    best = candidates[0]['score']
+    runner_up = candidates[1]['score'] if len(candidates) > 1 else 0.0
+    return best >= HARMONIZATION_CONFIG['accept_score'] and best - runner_up >= HARMONIZATION_CONFIG['accept_margin']
+
+
+def candidate_reason(candidate: Dict[str, Any]) -> str:
+    reason = f"Name similarity {candidate['name_score']:.2f}"
+    if candidate['value_score'] is not None:
+        reason += f", value overlap {candidate['value_score']:.2f}"
+    return reason
+
+
+def _describe(column: Dict[str, Any]) -> str:
+    text = f"{column['table']}.{column['column']}"
+    if column.get('data_type') and str(column['data_type']).lower() != 'unknown':
+        text += f" ({column['data_type']})"
+    purpose = (column.get('business_purpose') or '').strip()
+    if purpose:
+        limit = HARMONIZATION_CONFIG['purpose_chars']
+        text += f": {purpose if len(purpose) <= limit else purpose[:limit] + '…'}"
+    return text
+
+
+def build_resolution_prompt(batch: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]) -> str:
+    """
+    Prompt for a small batch of ambiguous source columns, each listed with
+    only its shortlisted target columns.
+
+    Parameters:
+    - batch: (source column, candidates) tuples; each candidate carries its
+      target column under 'column'.
+    """
+    blocks = []
+    for number, (source, candidates) in enumerate(batch, 1):
+        lines = [f"{number}. {_describe(source)}"]
+        for letter, candidate in zip(ascii_lowercase, candidates):
+            lines.append(f"   {letter}) {_describe(candidate['column'])} [{candidate_reason(candidate).lower()}]")
+        blocks.append('\n'.join(lines))
+
+    return (
+        "You are mapping columns of a source schema to a target schema for data integration.\n"
+        "For each numbered source column pick the candidate target column holding the same data, "
+        "or \"none\" if no candidate does. Use names, types, business purpose and the similarity hints.\n\n"
+        + '\n\n'.join(blocks)
+        + '\n\nReturn JSON only, one entry per source column:\n'
+        '{"choices": [{"id": 1, "target": "a", "confidence": 0.9, "reason": "short explanation"}]}'
+    )
+
+
+def parse_resolution(response_text: str, batch_size: int) -> Dict[int, Dict[str, Any]]:
+    """
+    Choices from a resolution response: batch position -> {'candidate': index
+    or None, 'confidence', 'reason'}. Entries that can't be read are left out.
+    """
+    start, end = response_text.find('{'), response_text.rfind('}') + 1
+    if start == -1 or end == 0:
+        return {}
+    try:
+        choices = json.loads(response_text[start:end]).get('choices', [])
+    except (ValueError, AttributeError) as e:
+        logger.error(f"Failed to parse mapping resolution as JSON: {e}")
+        return {}
+
+    resolved = {}
+    for choice in choices:
+        try:
+            position = int(choice['id']) - 1
+            target = str(choice.get('target', 'none')).strip().lower()
+            confidence = float(choice.get('confidence', 0.5))
+        except (KeyError, TypeError, ValueError):
+            continue
+        if not 0 <= position < batch_size:
+            continue
+        candidate = None if target in ('', 'none', 'null') else ascii_lowercase.find(target[0])
+        if candidate == -1:
+            continue
+        resolved[position] = {'candidate': candidate, 'confidence': max(0.0, min(confidence, 1.0)),
+                              'reason': str(choice.get('reason', '')).strip()}
+    return resolved
+
+
+def _suggestion(source: Dict[str, Any], target: Dict[str, Any], confidence: float,
+                reason: str, method: str) -> Dict[str, Any]:
+    return {
+        "source_table": source['table'],
+        "source_column": source['column'],
+        "target_table": target['table'],
+        "target_column": target['column'],
+        "confidence": round(confidence, 2),
+        "reason": reason,
+        "method": method
+    }
+
+
+def harmonize_schemas(source_columns: List[Dict[str, Any]], target_columns: List[Dict[str, Any]],
+                      resolve: Optional[Resolver] = None, value_index=None,
+                      value_sources: Optional[Tuple[str, str]] = None) -> Dict[str, Any]:
+    """
+    Suggest a mapping for every source column against a whole target schema.
+
+    Candidates come from generate_candidates(). Columns with one clear
+    candidate are mapped directly; only the ambiguous ones go to `resolve`
+    (the LLM), a few columns per call with just their shortlists. Without a
+    resolver, or when a call fails, an ambiguous column keeps its best
+    candidate.
+
+    Parameters:
+    - source_columns, target_columns: dicts with 'table', 'column' and
+      optionally 'data_type' and 'business_purpose'.
+
+    Returns:
+    - dict: 'suggestions' (at most one per source column, with method
+      'blocking', 'llm' or 'best_candidate') and 'stats'.
+    """
+    started = time.perf_counter()
+    candidates = generate_candidates(source_columns, target_columns, value_index, value_sources)
+    for source_candidates in candidates.values():
+        for candidate in source_candidates:
+            candidate['column'] = target_columns[candidate['target']]
+
+    suggestions, ambiguous = {}, []
+    for s, source_candidates in candidates.items():
+        if is_confident(source_candidates):
+            best = source_candidates[0]
+            suggestions[s] = _suggestion(source_columns[s], best['column'], best['score'],
+                                         candidate_reason(best), 'blocking')
+        else:
+            ambiguous.append(s)
+
+    to_resolve = ambiguous[:HARMONIZATION_CONFIG['max_llm_columns']] if resolve else []
+    batch_columns = HARMONIZATION_CONFIG['llm_batch_columns']
+    batches = [to_resolve[start:start + batch_columns] for start in range(0, len(to_resolve), batch_columns)]
+
+    def run(batch):
+        try:
+            return batch, resolve([(source_columns[s], candidates[s]) for s in batch])
+        except Exception as e:
+            logger.error(f"LLM resolution of {len(batch)} ambiguous columns failed: {e}")
+            return batch, {}
+
+    resolved_columns = 0
+    if batches:
+        with ThreadPoolExecutor(max_workers=HARMONIZATION_CONFIG['llm_workers']) as executor:
+            for batch, choices in executor.map(run, batches):
+                for position, s in enumerate(batch):
+                    choice = choices.get(position)
+                    if choice is None:
+                        continue
+                    resolved_columns += 1
+                    if choice['candidate'] is None or choice['candidate'] >= len(candidates[s]):
+                        # The model rejected every candidate
+                        suggestions[s] = None
+                        continue
+                    chosen = candidates[s][choice['candidate']]
+                    suggestions[s] = _suggestion(source_columns[s], chosen['column'], choice['confidence'],
+                                                 choice['reason'] or candidate_reason(chosen), 'llm')
+
+    for s in ambiguous:
+        if s not in suggestions:
+            best = candidates[s][0]
+            suggestions[s] = _suggestion(source_columns[s], best['column'], best['score'],
+                                         candidate_reason(best), 'best_candidate')
+
+    stats = {
+        'source_columns': len(source_columns),
+        'target_columns': len(target_columns),
+        'candidate_pairs': sum(len(source_candidates) for source_candidates in candidates.values()),
+        'unmatched': len(source_columns) - len(candidates),
+        'accepted_by_blocking': len(candidates) - len(ambiguous),
+        'ambiguous': len(ambiguous),
+        'llm_calls': len(batches),
+        'llm_resolved': resolved_columns,
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+    logger.info(f"Harmonized {stats['source_columns']} source columns against {stats['target_columns']} "
+                f"targets: {stats['candidate_pairs']} candidate pairs, {stats['ambiguous']} ambiguous, "
+                f"{stats['llm_calls']} LLM calls in {stats['seconds']}s")
+    ordered = [suggestions[s] for s in sorted(suggestions) if suggestions[s] is not None]
+    return {'suggestions': ordered, 'stats': stats}
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Any, Callable, Optional
+
+from llm.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SUGGESTION_CACHE_CONFIG = {
+    'path': 'mapping_suggestions.db',
+    # Entries untouched for this long are dropped (seconds)
+    'max_age': 30 * 24 * 3600
+}
+
+# Suggestions not worth keeping: the LLM was unavailable or over budget, so the
+# next visit should try again
+UNCACHED_METHODS = ('best_candidate',)
+
+
+def column_fingerprint(column: Dict[str, Any]) -> str:
+    """Hash of what a suggestion depends on: table, name, type and description version"""
+    parts = (column['table'], column['column'], column.get('data_type') or '', column.get('description_version') or '')
+    return hashlib.sha1('\0'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:20]
+
+
+def table_fingerprint(columns: List[Dict[str, Any]]) -> str:
+    """Hash of a set of columns, independent of their order"""
+    return hashlib.sha1('\n'.join(sorted(column_fingerprint(column) for column in columns)).encode()).hexdigest()
+
+
+class SuggestionCache:
+    """
+    SQLite cache of mapping suggestions, shared by every worker process.
+
+    An entry is keyed by (source table, target fingerprint, model, prompt
+    version) and holds the source table's fingerprint plus one suggestion
+    (or None for no mapping) per source column fingerprint. A visit with an
+    unchanged source table is answered from the entry alone; when some source
+    columns changed, only those are recomputed. Any change on the target
+    side, or a new model or prompt version, is a different key.
+    """
+
+    def __init__(self, path: str = SUGGESTION_CACHE_CONFIG['path']):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS suggestions (
+                    source_table TEXT NOT NULL,
+                    target_fingerprint TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    source_fingerprint TEXT NOT NULL,
+                    columns TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (source_table, target_fingerprint, model, prompt_version)
+                )
+            """)
+            self._conn.execute("DELETE FROM suggestions WHERE updated_at < ?",
+                               (time.time() - SUGGESTION_CACHE_CONFIG['max_age'],))
+
+    def get(self, source_table: str, target_fingerprint: str, model: str, prompt_version: str):
+        """(source fingerprint, {column fingerprint: suggestion}) or None"""
+        with self._lock:
+            row = self._conn.execute("""
+                SELECT source_fingerprint, columns FROM suggestions
+                WHERE source_table = ? AND target_fingerprint = ? AND model = ? AND prompt_version = ?
+            """, (source_table, target_fingerprint, model, prompt_version)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def put(self, source_table: str, target_fingerprint: str, model: str, prompt_version: str,
+            source_fingerprint: str, columns: Dict[str, Any]):
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO suggestions
+                    (source_table, target_fingerprint, model, prompt_version, source_fingerprint, columns, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (source_table, target_fingerprint, model, prompt_version, source_fingerprint,
+                  json.dumps(columns), time.time()))
+
+    def clear(self, source_table: Optional[str] = None):
+        with self._lock, self._conn:
+            if source_table is None:
+                self._conn.execute("DELETE FROM suggestions")
+            else:
+                self._conn.execute("DELETE FROM suggestions WHERE source_table = ?", (source_table,))
+
+    def suggestions(self, source_table: str, source_columns: List[Dict[str, Any]],
+                    target_columns: List[Dict[str, Any]], model: str, prompt_version: str,
+                    compute: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Suggestions for `source_columns`, calling compute(columns) only for the
+        columns the cache can't answer.
+        """
+        target_fingerprint = table_fingerprint(target_columns)
+        source_fingerprint = table_fingerprint(source_columns)
+        fingerprints = [column_fingerprint(column) for column in source_columns]
+
+        cached = self.get(source_table, target_fingerprint, model, prompt_version)
+        known = cached[1] if cached else {}
+        if cached and cached[0] == source_fingerprint:
+            metrics.record_cache('mapping_suggestions', True, len(source_columns))
+            return [known[fingerprint] for fingerprint in fingerprints if known.get(fingerprint)]
+
+        missing = [column for column, fingerprint in zip(source_columns, fingerprints) if fingerprint not in known]
+        metrics.record_cache('mapping_suggestions', True, len(source_columns) - len(missing))
+        metrics.record_cache('mapping_suggestions', False, len(missing))
+
+        computed = {}
+        if missing:
+            logger.info(f"Computing mapping suggestions for {len(missing)} of {len(source_columns)} "
+                        f"columns of {source_table}")
+            for suggestion in compute(missing):
+                computed[(suggestion['source_table'], suggestion['source_column'])] = suggestion
+
+        columns, results, complete = {}, [], True
+        for column, fingerprint in zip(source_columns, fingerprints):
+            if fingerprint in known:
+                suggestion = known[fingerprint]
+            else:
+                suggestion = computed.get((column['table'], column['column']))
+            if suggestion is not None:
+                results.append(suggestion)
+            if suggestion is not None and suggestion.get('method') in UNCACHED_METHODS:
+                complete = False
+                continue
+            # Columns dropped from the table fall out of the entry here
+            columns[fingerprint] = suggestion
+
+        # An incomplete entry never matches the table fingerprint, so its gaps are retried next time
+        self.put(source_table, target_fingerprint, model, prompt_version,
+                 source_fingerprint if complete else '', columns)
+        return results
+
+
+_suggestion_cache = None
+_suggestion_cache_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # SQLite connections must not cross a fork; the child reopens the cache
+    global _suggestion_cache, _suggestion_cache_lock
+    _suggestion_cache = None
+    _suggestion_cache_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_suggestion_cache() -> SuggestionCache:
+    """The process-wide suggestion cache, opened on first use"""
+    global _suggestion_cache
+    with _suggestion_cache_lock:
+        if _suggestion_cache is None:
+            _suggestion_cache = SuggestionCache()
+        return _suggestion_cache
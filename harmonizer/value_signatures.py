@@ -0,0 +1,308 @@
+import hashlib
+import logging
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from itertools import combinations
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VALUE_SIGNATURE_CONFIG = {
+    # MinHash permutations per signature; the Jaccard estimate's error is about 1/sqrt(num_perm)
+    'num_perm': 128,
+    # LSH bands x rows must equal num_perm. Containment matters more than Jaccard here: a code list
+    # of q values inside a domain of s has Jaccard q / s, e.g. 0.04 for 20 of 500 codes, which
+    # 64 x 2 bands find only 1 time in 10. One row per band pairs any two columns sharing a minimum,
+    # catching Jaccard 0.04 with p = 0.99 and 0.01 with p = 0.72; below that (lists over ~100x
+    # smaller than their domain) containment is missed. Pairs are then filtered by estimated overlap
+    'bands': 128,
+    # Rows read per table to sample distinct values
+    'sample_rows': 1000,
+    # Columns with fewer distinct values (flags, Y/N) would pair with everything; they aren't indexed
+    'min_distinct': 3,
+    # Buckets holding more columns than this are skipped when pairing, so one shared domain can't go quadratic
+    'max_bucket': 500,
+    # Candidate pairs below this estimated Jaccard and containment are dropped
+    'min_overlap': 0.2,
+    # Signatures kept in the fingerprint cache
+    'cache_size': 50000,
+    'seed': 1
+}
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+ColumnKey = Tuple[str, str, str]
+
+
+def normalize_value(value: Any) -> Optional[str]:
+    """Comparable form of a sampled value: trimmed, lower-cased, 42.0 read as 42; None for blanks"""
+    if value is None:
+        return None
+    if isinstance(value, float):
+        if value != value:
+            return None
+        if value.is_integer():
+            value = int(value)
+    text = str(value).strip().lower()
+    return text or None
+
+
+def distinct_values(values: Iterable[Any]) -> List[str]:
+    return sorted({normalized for normalized in map(normalize_value, values) if normalized is not None})
+
+
+def sample_fingerprint(values: List[str]) -> str:
+    """Digest of a sorted distinct value set; equal samples share one signature"""
+    digest = hashlib.sha1()
+    for value in values:
+        digest.update(value.encode('utf-8', 'replace'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class MinHasher:
+    """
+    MinHash over universal hashes (a * x + b) mod (2^61 - 1) of each value's
+    CRC32, computed for all permutations at once with numpy.
+    """
+
+    def __init__(self, num_perm: int, seed: int):
+        generator = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self._a = generator.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        self._b = generator.randint(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+
+    def signature(self, values: List[str]) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(value.encode('utf-8', 'replace')) for value in values),
+                             dtype=np.uint64, count=len(values))
+        # uint64 products wrap like the reference implementation; the modulus keeps them uniform
+        permuted = (hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+def estimate_overlap(signature_a: np.ndarray, size_a: int,
+                     signature_b: np.ndarray, size_b: int) -> Dict[str, float]:
+    """
+    Estimated Jaccard of two samples and the containment of each in the other,
+    |A ∩ B| / |A| and |A ∩ B| / |B|, from their signatures and distinct counts.
+    """
+    jaccard = float(np.mean(signature_a == signature_b))
+    intersection = jaccard * (size_a + size_b) / (1 + jaccard)
+    return {
+        'jaccard': round(jaccard, 4),
+        'containment': round(min(intersection / size_a, 1.0), 4) if size_a else 0.0,
+        'containment_reverse': round(min(intersection / size_b, 1.0), 4) if size_b else 0.0
+    }
+
+
+class ValueSignatureIndex:
+    """
+    MinHash/LSH index of column value samples, for instance-based matching.
+
+    Each column is keyed by (source, table, column). Its signature is cached
+    by the fingerprint of its distinct sample, so re-indexing an unchanged
+    column costs one hash of the sample. Signatures are cut into bands and
+    each band is bucketed; columns sharing a bucket are candidate pairs, found
+    without comparing every column with every other. The default of one row
+    per band sets the threshold low enough for containment rather than
+    Jaccard; see VALUE_SIGNATURE_CONFIG['bands'].
+    """
+
+    def __init__(self, num_perm: Optional[int] = None, bands: Optional[int] = None):
+        self.num_perm = num_perm or VALUE_SIGNATURE_CONFIG['num_perm']
+        self.bands = bands or VALUE_SIGNATURE_CONFIG['bands']
+        if self.num_perm % self.bands:
+            raise ValueError(f"num_perm ({self.num_perm}) must be a multiple of bands ({self.bands})")
+        self.rows = self.num_perm // self.bands
+        self._hasher = MinHasher(self.num_perm, VALUE_SIGNATURE_CONFIG['seed'])
+        self._cache = OrderedDict()
+        self._columns = {}
+        self._buckets = [{} for _ in range(self.bands)]
+        self._lock = threading.RLock()
+        self._stats = {'signatures_computed': 0, 'cache_hits': 0, 'unchanged': 0}
+
+    def __len__(self):
+        return len(self._columns)
+
+    def _signature(self, fingerprint: str, values: List[str]) -> np.ndarray:
+        signature = self._cache.get(fingerprint)
+        if signature is not None:
+            self._cache.move_to_end(fingerprint)
+            self._stats['cache_hits'] += 1
+            return signature
+        signature = self._hasher.signature(values)
+        self._stats['signatures_computed'] += 1
+        self._cache[fingerprint] = signature
+        if len(self._cache) > VALUE_SIGNATURE_CONFIG['cache_size']:
+            self._cache.popitem(last=False)
+        return signature
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def add(self, source: str, table: str, column: str, values: Iterable[Any]) -> bool:
+        """
+        Index a column's sampled values. Returns True if its entry changed;
+        a column whose sample has the same fingerprint is left as it is.
+        """
+        key = (source, table, column)
+        values = distinct_values(values)
+        with self._lock:
+            if len(values) < VALUE_SIGNATURE_CONFIG['min_distinct']:
+                return self.remove(*key)
+            fingerprint = sample_fingerprint(values)
+            current = self._columns.get(key)
+            if current is not None and current['fingerprint'] == fingerprint:
+                self._stats['unchanged'] += 1
+                return False
+            self.remove(*key)
+            signature = self._signature(fingerprint, values)
+            band_keys = self._band_keys(signature)
+            for band, band_key in enumerate(band_keys):
+                self._buckets[band].setdefault(band_key, set()).add(key)
+            self._columns[key] = {'fingerprint': fingerprint, 'signature': signature,
+                                  'distinct': len(values), 'bands': band_keys}
+            return True
+
+    def add_frame(self, source: str, table: str, df) -> int:
+        """Index every column of a sampled DataFrame; returns how many entries changed"""
+        return sum(self.add(source, table, str(column), df[column].tolist()) for column in df.columns)
+
+    def remove(self, source: str, table: str, column: str) -> bool:
+        key = (source, table, column)
+        with self._lock:
+            entry = self._columns.pop(key, None)
+            if entry is None:
+                return False
+            for band, band_key in enumerate(entry['bands']):
+                bucket = self._buckets[band].get(band_key)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self._buckets[band][band_key]
+            return True
+
+    def remove_table(self, source: str, table: str):
+        with self._lock:
+            for key in [key for key in self._columns if key[:2] == (source, table)]:
+                self.remove(*key)
+
+    def overlap(self, key_a: ColumnKey, key_b: ColumnKey) -> Optional[Dict[str, float]]:
+        """Estimated overlap of two indexed columns, or None if either isn't indexed"""
+        with self._lock:
+            a, b = self._columns.get(tuple(key_a)), self._columns.get(tuple(key_b))
+        if a is None or b is None:
+            return None
+        return estimate_overlap(a['signature'], a['distinct'], b['signature'], b['distinct'])
+
+    def candidate_pairs(self, sources: Optional[Iterable[str]] = None,
+                        cross_source: bool = False) -> set:
+        """Unordered pairs of column keys in different tables that share at least one LSH bucket"""
+        sources = set(sources) if sources is not None else None
+        max_bucket = VALUE_SIGNATURE_CONFIG['max_bucket']
+        pairs, skipped = set(), 0
+        with self._lock:
+            for buckets in self._buckets:
+                for bucket in buckets.values():
+                    if len(bucket) < 2:
+                        continue
+                    members = sorted(key for key in bucket if sources is None or key[0] in sources)
+                    if len(members) > max_bucket:
+                        skipped += 1
+                        continue
+                    for a, b in combinations(members, 2):
+                        if a[:2] == b[:2] or (cross_source and a[0] == b[0]):
+                            continue
+                        pairs.add((a, b))
+        if skipped:
+            logger.info(f"Skipped {skipped} LSH buckets with more than {max_bucket} columns")
+        return pairs
+
+    def candidates(self, sources: Optional[Iterable[str]] = None, cross_source: bool = False,
+                   min_overlap: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Column pairs with overlapping values across every indexed table, best
+        first. A pair is kept if its estimated Jaccard or either containment
+        reaches `min_overlap`, so a code column fully contained in a larger
+        domain is reported even though their Jaccard is low.
+        """
+        min_overlap = VALUE_SIGNATURE_CONFIG['min_overlap'] if min_overlap is None else min_overlap
+        results = []
+        for a, b in self.candidate_pairs(sources, cross_source):
+            estimate = self.overlap(a, b)
+            if estimate is None:
+                continue
+            if max(estimate['jaccard'], estimate['containment'], estimate['containment_reverse']) < min_overlap:
+                continue
+            results.append({
+                'source': a[0], 'source_table': a[1], 'source_column': a[2],
+                'target': b[0], 'target_table': b[1], 'target_column': b[2],
+                **estimate
+            })
+        results.sort(key=lambda row: (-row['jaccard'], -max(row['containment'], row['containment_reverse'])))
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'columns': len(self._columns), 'cached_signatures': len(self._cache),
+                    'buckets': sum(len(buckets) for buckets in self._buckets), **self._stats}
+
+
+def source_label(connection_string: str, schema_name: Optional[str] = None) -> str:
+    """Name of a source database without its credentials: host/database[.schema]"""
+    from sqlalchemy.engine import make_url
+
+    url = make_url(connection_string)
+    label = f"{url.host or 'localhost'}/{url.database or ''}"
+    return f"{label}.{schema_name}" if schema_name else label
+
+
+def index_source_values(connection_string: str, db_type: str = 'mysql', schema_name: Optional[str] = None,
+                        tables: Optional[List[str]] = None, index: Optional['ValueSignatureIndex'] = None) -> str:
+    """
+    Sample every table of a source (or just `tables`) and index its columns.
+    Tables whose samples haven't changed keep their entries. Returns the
+    source label the columns are indexed under.
+    """
+    from .database import get_table_names, get_sample_data
+
+    index = index or get_value_index()
+    source = source_label(connection_string, schema_name)
+    tables = tables if tables is not None else get_table_names(connection_string, db_type, schema_name)
+    changed = 0
+    for table in tables:
+        df = get_sample_data(connection_string, db_type, table, schema_name,
+                             limit=VALUE_SIGNATURE_CONFIG['sample_rows'])
+        if not df.empty:
+            changed += index.add_frame(source, table, df)
+    logger.info(f"Indexed values of {len(tables)} tables from {source} ({changed} columns changed)")
+    return source
+
+
+_value_index = None
+_value_index_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    global _value_index_lock
+    _value_index_lock = threading.Lock()
+    if _value_index is not None:
+        _value_index._lock = threading.RLock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_value_index() -> ValueSignatureIndex:
+    """The process-wide value signature index, shared by every source"""
+    global _value_index
+    with _value_index_lock:
+        if _value_index is None:
+            _value_index = ValueSignatureIndex()
+        return _value_index
@@ -0,0 +1,5 @@
+"""
+LLM plumbing shared by data_dictionary and harmonizer: the pooled Ollama
+client, the backend router, the priority request queue and call metrics.
+Kept outside both packages so importing it loads neither blueprint.
+"""
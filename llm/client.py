@@ -0,0 +1,145 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
+CLIENT_CONFIG = {
+    # How long Ollama keeps a model loaded after the last request
+    'keep_alive': os.getenv('OLLAMA_KEEP_ALIVE', '30m'),
+    'pool_connections': 4,
+    'pool_maxsize': 16,
+    # Seconds an availability check or warmup stays valid
+    'health_ttl': 30,
+    'warmup_ttl': 600,
+    'warmup_timeout': 300
+}
+
+# Endpoints whose payload accepts keep_alive
+_KEEP_ALIVE_PATHS = ('/api/generate', '/api/chat', '/api/embed', '/api/embeddings')
+
+_session = None
+_session_lock = threading.Lock()
+_cohere_clients = {}
+_cohere_lock = threading.Lock()
+_health = {}
+_warmed = {}
+_state_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # Pooled sockets and locks must not be shared with a forked worker
+    global _session, _session_lock, _cohere_lock, _state_lock
+    _session = None
+    _session_lock = threading.Lock()
+    _cohere_clients.clear()
+    _cohere_lock = threading.Lock()
+    _health.clear()
+    _warmed.clear()
+    _state_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_session() -> requests.Session:
+    """Process-wide pooled session so calls reuse TCP connections to Ollama"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=CLIENT_CONFIG['pool_connections'],
+                                  pool_maxsize=CLIENT_CONFIG['pool_maxsize'])
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+def get_cohere_client(api_key: str):
+    """Shared Cohere client per API key instead of one per request"""
+    import cohere
+    with _cohere_lock:
+        if api_key not in _cohere_clients:
+            _cohere_clients[api_key] = cohere.Client(api_key)
+        return _cohere_clients[api_key]
+
+
+def host_of(url: str) -> str:
+    """Base URL (scheme://host:port) of an Ollama endpoint URL"""
+    for path in _KEEP_ALIVE_PATHS + ('/api/tags',):
+        if url.endswith(path):
+            return url[:-len(path)]
+    return url.rstrip('/')
+
+
+def post(url: str, payload: Dict[str, Any], timeout: float, stream: bool = False) -> requests.Response:
+    """POST to Ollama over the pooled session, adding keep_alive to model calls"""
+    if url.endswith(_KEEP_ALIVE_PATHS) and 'keep_alive' not in payload:
+        payload = {**payload, 'keep_alive': CLIENT_CONFIG['keep_alive']}
+    return get_session().post(url, json=payload, timeout=timeout, stream=stream)
+
+
+def is_available(host: str = OLLAMA_HOST, force: bool = False) -> bool:
+    """Check that Ollama answers /api/tags, caching the answer for health_ttl seconds"""
+    now = time.monotonic()
+    with _state_lock:
+        checked = _health.get(host)
+        if checked and not force and now - checked[0] < CLIENT_CONFIG['health_ttl']:
+            return checked[1]
+
+    try:
+        response = get_session().get(f"{host}/api/tags", timeout=10)
+        available = response.status_code == 200
+        if not available:
+            logger.error(f"Ollama availability check failed: {response.status_code} - {response.text}")
+    except Exception as e:
+        logger.error(f"Ollama availability check failed: {e}")
+        available = False
+
+    with _state_lock:
+        _health[host] = (now, available)
+    return available
+
+
+def warmup(model: str, host: str = OLLAMA_HOST, force: bool = False) -> bool:
+    """
+    Load `model` into memory ahead of the first real request.
+
+    An empty generate request makes Ollama load the model and keep it resident
+    for keep_alive. Skipped when the model was warmed within warmup_ttl.
+    """
+    key = (host, model)
+    now = time.monotonic()
+    with _state_lock:
+        if not force and now - _warmed.get(key, float('-inf')) < CLIENT_CONFIG['warmup_ttl']:
+            return True
+
+    try:
+        started = time.monotonic()
+        response = post(f"{host}/api/generate", {"model": model}, timeout=CLIENT_CONFIG['warmup_timeout'])
+        if response.status_code != 200:
+            logger.warning(f"Warmup of {model} on {host} failed: {response.status_code} {response.text}")
+            return False
+        logger.info(f"Warmed up {model} on {host} in {time.monotonic() - started:.1f}s")
+    except Exception as e:
+        logger.warning(f"Warmup of {model} on {host} failed: {e}")
+        return False
+
+    with _state_lock:
+        _warmed[key] = time.monotonic()
+    return True
+
+
+def warmup_in_background(model: str, host: str = OLLAMA_HOST) -> threading.Thread:
+    """Run warmup on a daemon thread so app startup is not blocked by model loading"""
+    thread = threading.Thread(target=warmup, args=(model, host), name=f"ollama-warmup-{model}", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,195 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+# Per-call measurements aggregated into histograms, with their buckets
+HISTOGRAMS = {
+    'batch_size': BATCH_BUCKETS,
+    'prompt_tokens': TOKEN_BUCKETS,
+    'completion_tokens': TOKEN_BUCKETS,
+    'queue_seconds': SECONDS_BUCKETS,
+    'load_seconds': SECONDS_BUCKETS,
+    'prompt_eval_seconds': SECONDS_BUCKETS,
+    'generation_seconds': SECONDS_BUCKETS,
+    'total_seconds': SECONDS_BUCKETS
+}
+
+
+class Histogram:
+    """Fixed-bucket histogram with count and sum, in the Prometheus layout"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given quantile"""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 4),
+            'mean': round(self.sum / self.count, 4) if self.count else None,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'buckets': {str(bound): count for bound, count in zip(self.buckets + ('+Inf',), self.counts)}
+        }
+
+
+class LLMMetrics:
+    """
+    In-process aggregation of LLM call measurements.
+
+    Calls are grouped by (backend, model, operation). Each group keeps call,
+    error, retry and hedge counters plus one histogram per entry of
+    HISTOGRAMS. Cache lookups and fallback use are counted per source. The
+    most recent calls are kept as raw records for export.
+    """
+
+    def __init__(self, recent: int = 500):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=recent)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._groups = {}
+            self._cache = {}
+            self._fallbacks = {}
+            self._recent.clear()
+            self.started = time.time()
+
+    def _group(self, backend: str, model: str, operation: str) -> Dict[str, Any]:
+        key = (backend, model, operation)
+        if key not in self._groups:
+            self._groups[key] = {
+                'calls': 0, 'errors': 0, 'retries': 0, 'hedged': 0,
+                'histograms': {name: Histogram(buckets) for name, buckets in HISTOGRAMS.items()}
+            }
+        return self._groups[key]
+
+    def record_call(self, backend: str, model: Optional[str], operation: str = 'generate',
+                    batch_size: Optional[int] = None, response: Optional[Dict[str, Any]] = None,
+                    queue_seconds: Optional[float] = None, total_seconds: Optional[float] = None,
+                    attempt: int = 0, hedged: bool = False, error: bool = False,
+                    priority: Optional[str] = None):
+        """
+        Record one backend call. Token counts and load/prompt/generation times
+        are read from the Ollama counters in `response` when present.
+        """
+        response = response or {}
+        observed = {
+            'batch_size': batch_size,
+            'prompt_tokens': response.get('prompt_eval_count'),
+            'completion_tokens': response.get('eval_count'),
+            'queue_seconds': queue_seconds,
+            # Ollama reports durations in nanoseconds
+            'load_seconds': response['load_duration'] / 1e9 if response.get('load_duration') else None,
+            'prompt_eval_seconds': response['prompt_eval_duration'] / 1e9 if response.get('prompt_eval_duration') else None,
+            'generation_seconds': response['eval_duration'] / 1e9 if response.get('eval_duration') else None,
+            'total_seconds': total_seconds
+        }
+
+        with self._lock:
+            group = self._group(backend, model or 'unknown', operation)
+            group['calls'] += 1
+            group['errors'] += int(error)
+            group['retries'] += int(attempt > 0)
+            group['hedged'] += int(hedged)
+            if not error:
+                for name, value in observed.items():
+                    if value is not None:
+                        group['histograms'][name].observe(value)
+            self._recent.append({
+                'time': time.time(), 'backend': backend, 'model': model, 'operation': operation,
+                'priority': priority, 'attempt': attempt, 'hedged': hedged, 'error': error,
+                **{name: round(value, 4) if isinstance(value, float) else value for name, value in observed.items()}
+            })
+
+    def record_cache(self, source: str, hit: bool, count: int = 1):
+        """Count cache lookups, e.g. source='prompt_cache' or 'description_index'"""
+        with self._lock:
+            counters = self._cache.setdefault(source, {'hits': 0, 'misses': 0})
+            counters['hits' if hit else 'misses'] += count
+
+    def record_fallback(self, reason: str, columns: int):
+        """Count columns answered with a fallback description instead of the LLM"""
+        with self._lock:
+            self._fallbacks[reason] = self._fallbacks.get(reason, 0) + columns
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = [
+                {
+                    'backend': backend, 'model': model, 'operation': operation,
+                    'calls': group['calls'], 'errors': group['errors'],
+                    'retries': group['retries'], 'hedged': group['hedged'],
+                    'histograms': {name: histogram.to_dict() for name, histogram in group['histograms'].items()}
+                }
+                for (backend, model, operation), group in self._groups.items()
+            ]
+            cache = {
+                source: {**counters, 'hit_rate': round(counters['hits'] / max(counters['hits'] + counters['misses'], 1), 4)}
+                for source, counters in self._cache.items()
+            }
+            return {
+                'since': self.started,
+                'calls': calls,
+                'cache': cache,
+                'fallback_columns': dict(self._fallbacks)
+            }
+
+    def recent_calls(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._recent)
+
+    def to_prometheus(self) -> str:
+        """Render the aggregates in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for (backend, model, operation), group in self._groups.items():
+                labels = f'backend="{backend}",model="{model}",operation="{operation}"'
+                for counter in ('calls', 'errors', 'retries', 'hedged'):
+                    lines.append(f'llm_{counter}_total{{{labels}}} {group[counter]}')
+                for name, histogram in group['histograms'].items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        lines.append(f'llm_{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f'llm_{name}_sum{{{labels}}} {histogram.sum}')
+                    lines.append(f'llm_{name}_count{{{labels}}} {histogram.count}')
+            for source, counters in self._cache.items():
+                lines.append(f'llm_cache_hits_total{{source="{source}"}} {counters["hits"]}')
+                lines.append(f'llm_cache_misses_total{{source="{source}"}} {counters["misses"]}')
+            for reason, columns in self._fallbacks.items():
+                lines.append(f'llm_fallback_columns_total{{reason="{reason}"}} {columns}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = LLMMetrics()
@@ -0,0 +1,226 @@
+import contextvars
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, most urgent first
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+BACKGROUND = 'background'
+PRIORITIES = {INTERACTIVE: 0, BULK: 1, BACKGROUND: 2}
+
+QUEUE_CONFIG = {
+    # Requests this close to their deadline are scheduled as interactive
+    'promote_within': 10.0,
+    # Slots per backend that only interactive requests may use
+    'interactive_reserve': 1
+}
+
+_request_context = contextvars.ContextVar('llm_request_context', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed while it was waiting for a backend slot"""
+
+
+@contextmanager
+def llm_request_context(priority: str = INTERACTIVE, tenant: Optional[str] = None,
+                        timeout: Optional[float] = None):
+    """
+    Tag the LLM calls made inside the block with a priority class, a tenant
+    (company_id) and an optional deadline `timeout` seconds from now. Worker
+    threads inherit the tags when run through contextvars.copy_context().
+    """
+    context = {
+        'priority': priority,
+        'tenant': str(tenant) if tenant is not None else None,
+        'deadline': time.monotonic() + timeout if timeout else None
+    }
+    token = _request_context.set(context)
+    try:
+        yield context
+    finally:
+        _request_context.reset(token)
+
+
+def current_request_context() -> Dict[str, Any]:
+    return _request_context.get() or {'priority': INTERACTIVE, 'tenant': None, 'deadline': None}
+
+
+def raise_priority(context: Dict[str, Any], priority: str = INTERACTIVE):
+    """
+    Make the calls tagged with `context` at least as urgent as `priority`,
+    including the ones already waiting in the queue.
+    """
+    if PRIORITIES[priority] < PRIORITIES.get(context['priority'], PRIORITIES[BULK]):
+        context['priority'] = priority
+        get_request_queue().reschedule()
+
+
+class _Waiter:
+    __slots__ = ('rank', 'context', 'tenant', 'deadline', 'seq', 'granted')
+
+    def __init__(self, rank, context, tenant, deadline, seq):
+        self.rank = rank
+        # Shared with the caller's request context, so raise_priority() reaches queued calls
+        self.context = context
+        self.tenant = tenant
+        self.deadline = deadline
+        self.seq = seq
+        self.granted = None
+
+    @property
+    def priority(self) -> str:
+        return self.context['priority']
+
+
+class LLMRequestQueue:
+    """
+    Admission queue in front of the LLM backends.
+
+    Every backend has a fixed number of slots; a call holds one slot while it
+    runs. When a slot frees up it goes to the waiting request with the
+    smallest (priority class, tenant in-flight count, deadline, arrival)
+    key, so interactive calls overtake bulk ones, tenants share capacity
+    evenly, and earlier deadlines go first. Requests close to their deadline
+    are promoted to interactive, and requests past it fail with
+    DeadlineExceeded instead of occupying a backend. Bulk and background
+    calls leave `interactive_reserve` slots per backend free.
+    """
+
+    def __init__(self, slots: Optional[Dict[str, int]] = None):
+        self.slots = {}
+        self.in_use = {}
+        self._tenant_in_flight = {}
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self.add_backends(slots or {})
+
+    def add_backends(self, slots: Dict[str, int]):
+        """Register backends; one already known keeps its slots, so routers can share a host"""
+        with self._cond:
+            for name, count in slots.items():
+                if name not in self.slots:
+                    self.slots[name] = count
+                    self.in_use[name] = 0
+
+    def _effective_priority(self, waiter: _Waiter, now: float) -> int:
+        if waiter.deadline is not None and waiter.deadline - now <= QUEUE_CONFIG['promote_within']:
+            return PRIORITIES[INTERACTIVE]
+        return PRIORITIES.get(waiter.priority, PRIORITIES[BULK])
+
+    def _key(self, waiter: _Waiter, now: float):
+        return (self._effective_priority(waiter, now),
+                self._tenant_in_flight.get(waiter.tenant, 0),
+                waiter.deadline if waiter.deadline is not None else float('inf'),
+                waiter.seq)
+
+    def _has_room(self, name: str, priority: int) -> bool:
+        limit = self.slots[name]
+        if priority != PRIORITIES[INTERACTIVE]:
+            limit = max(1, limit - QUEUE_CONFIG['interactive_reserve'])
+        return self.in_use[name] < limit
+
+    def _grant(self):
+        """Hand free slots to waiters in key order; called with the condition held"""
+        now = time.monotonic()
+        for waiter in sorted(self._waiters, key=lambda waiter: self._key(waiter, now)):
+            priority = self._effective_priority(waiter, now)
+            name = next((name for name in waiter.rank() if name in self.slots and self._has_room(name, priority)), None)
+            if name is None:
+                continue
+            self._take(name, waiter.tenant)
+            waiter.granted = name
+            self._waiters.remove(waiter)
+        self._cond.notify_all()
+
+    def _take(self, name: str, tenant: Optional[str]):
+        self.in_use[name] += 1
+        self._tenant_in_flight[tenant] = self._tenant_in_flight.get(tenant, 0) + 1
+
+    def acquire(self, rank: Callable[[], List[str]], priority: str = INTERACTIVE,
+                tenant: Optional[str] = None, deadline: Optional[float] = None,
+                context: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Wait for a slot on one of the backends returned by `rank` (best first)
+        and return that backend's name. A request `context` overrides
+        `priority` and is re-read while waiting.
+        """
+        with self._cond:
+            waiter = _Waiter(rank, context or {'priority': priority}, tenant, deadline, next(self._seq))
+            self._waiters.append(waiter)
+            self._grant()
+            while waiter.granted is None:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._waiters.remove(waiter)
+                    raise DeadlineExceeded(f"{waiter.priority} request for tenant {tenant} expired in the LLM queue")
+                # Re-check periodically: promotion and ranking change with time
+                self._cond.wait(timeout=min(remaining, 1.0) if remaining is not None else 1.0)
+                if waiter.granted is None:
+                    self._grant()
+            return waiter.granted
+
+    def try_acquire(self, name: str, tenant: Optional[str] = None) -> bool:
+        """Take a slot on `name` only if it is free and nobody is waiting (used for hedging)"""
+        with self._cond:
+            if self._waiters or name not in self.slots or not self._has_room(name, PRIORITIES[BULK]):
+                return False
+            self._take(name, tenant)
+            return True
+
+    def reschedule(self):
+        """Re-run slot assignment after waiter priorities changed"""
+        with self._cond:
+            self._grant()
+
+    def release(self, name: str, tenant: Optional[str] = None):
+        with self._cond:
+            self.in_use[name] -= 1
+            self._tenant_in_flight[tenant] = self._tenant_in_flight.get(tenant, 1) - 1
+            if self._tenant_in_flight[tenant] <= 0:
+                del self._tenant_in_flight[tenant]
+            self._grant()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            waiting = {}
+            for waiter in self._waiters:
+                waiting[waiter.priority] = waiting.get(waiter.priority, 0) + 1
+            return {
+                'slots': dict(self.slots),
+                'in_use': dict(self.in_use),
+                'waiting': waiting,
+                'tenants_in_flight': {str(tenant): count for tenant, count in self._tenant_in_flight.items()}
+            }
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # Slot counts of the parent's in-flight calls mean nothing in a forked worker
+    global _queue, _queue_lock
+    _queue = None
+    _queue_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_request_queue() -> LLMRequestQueue:
+    """The process-wide queue every router admits its calls through"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = LLMRequestQueue()
+        return _queue
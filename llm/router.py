@@ -0,0 +1,289 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+from . import client as llm_client
+from .metrics import metrics
+from .request_queue import get_request_queue, current_request_context
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationBackend:
+    """
+    A text generation endpoint. generate() returns an Ollama-style response
+    body: at least 'response', plus any eval counters the backend reports.
+
+    `prefix` is a stable instruction block shared by many calls; backends that
+    cannot reuse it simply prepend it to the prompt.
+    """
+
+    name = 'backend'
+    supports_streaming = False
+
+    def generate(self, prompt: str, options: Optional[Dict[str, Any]] = None,
+                 format: Optional[Any] = None, timeout: float = 60,
+                 prefix: Optional[str] = None) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class OllamaBackend(GenerationBackend):
+    """
+    One Ollama host serving one model.
+
+    The shared prefix always leads the prompt, so consecutive calls start
+    with the same tokens and the runner's prompt cache skips re-evaluating
+    it; keep num_ctx stable across calls or the model reloads and the cache
+    is lost.
+    """
+
+    supports_streaming = True
+
+    def __init__(self, host: str, model: str):
+        self.host = host.rstrip('/')
+        self.model = model
+        self.url = f"{self.host}/api/generate"
+        self.name = f"ollama:{self.host}"
+
+    def build_payload(self, prompt: str, options: Optional[Dict[str, Any]] = None,
+                      format: Optional[Any] = None, timeout: float = 60,
+                      prefix: Optional[str] = None, stream: bool = False) -> Dict[str, Any]:
+        options = options or {}
+        payload = {"model": self.model, "prompt": (prefix or '') + prompt, "options": options, "stream": stream}
+        if format is not None:
+            payload["format"] = format
+        return payload
+
+    def generate(self, prompt, options=None, format=None, timeout=60, prefix=None):
+        payload = self.build_payload(prompt, options, format, timeout, prefix)
+        response = llm_client.post(self.url, payload, timeout=timeout)
+        if response.status_code != 200:
+            raise Exception(f"Ollama error from {self.host}: {response.status_code} {response.text}")
+        return response.json()
+
+
+class CohereBackend(GenerationBackend):
+    """Cohere generate API; the JSON-schema format option is not supported and is ignored"""
+
+    def __init__(self, api_key: str, model: str = 'command'):
+        self.api_key = api_key
+        self.model = model
+        self.name = f"cohere:{model}"
+
+    def generate(self, prompt, options=None, format=None, timeout=60, prefix=None):
+        options = options or {}
+        response = llm_client.get_cohere_client(self.api_key).generate(
+            model=self.model,
+            prompt=(prefix or '') + prompt,
+            max_tokens=options.get('num_predict', 200),
+            temperature=options.get('temperature', 0.2)
+        )
+        return {"response": response.generations[0].text}
+
+
+class StaticBackend(GenerationBackend):
+    """Local stand-in that answers from a callable, with optional delay and failures"""
+
+    def __init__(self, name: str, responder: Callable[[str], str], delay: float = 0.0, fail: bool = False):
+        self.name = name
+        self.responder = responder
+        self.delay = delay
+        self.fail = fail
+
+    def generate(self, prompt, options=None, format=None, timeout=60, prefix=None):
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise Exception(f"{self.name} is configured to fail")
+        return {"response": self.responder((prefix or '') + prompt)}
+
+
+class BackendStats:
+    """EWMA latency and error rate plus a window of recent latencies for one backend"""
+
+    def __init__(self, alpha: float = 0.2, window: int = 200):
+        self.alpha = alpha
+        self.latency = None
+        self.error_rate = 0.0
+        self.in_flight = 0
+        self.latencies = deque(maxlen=window)
+
+    def record(self, latency: Optional[float], error: bool):
+        if latency is not None:
+            self.latency = latency if self.latency is None else (1 - self.alpha) * self.latency + self.alpha * latency
+            self.latencies.append(latency)
+        self.error_rate = (1 - self.alpha) * self.error_rate + self.alpha * (1.0 if error else 0.0)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if len(self.latencies) < 5:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(fraction * (len(ordered) - 1))]
+
+    def score(self) -> float:
+        """Lower is better: expected latency inflated by queued work and recent errors"""
+        if self.latency is None:
+            # Unmeasured backends go first so every backend gets sampled,
+            # unless all they have produced so far are errors
+            return 0.0 if self.error_rate == 0 else float('inf')
+        return self.latency * (1 + self.in_flight) / (1 - min(self.error_rate, 0.9))
+
+
+class LLMRouter:
+    """
+    Routes each generation call to the backend with the best EWMA latency/error
+    score. With hedging enabled, a call still running after the primary's
+    latency percentile is duplicated on the next-best backend and whichever
+    answers first wins. Failed calls move on to the remaining backends.
+
+    Every call first takes one of the backend's `concurrency` slots from the
+    shared request queue, which orders waiting calls by the priority, tenant
+    and deadline set with llm_request_context(). Routers pointing at the same
+    host share its slots.
+    """
+
+    def __init__(self, backends: List[GenerationBackend], hedge: bool = True,
+                 hedge_percentile: float = 0.95, min_hedge_delay: float = 2.0,
+                 concurrency: int = 2):
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.backends = list(backends)
+        self.queue = get_request_queue()
+        self.queue.add_backends({backend.name: concurrency for backend in self.backends})
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay = min_hedge_delay
+        self.stats = {backend.name: BackendStats() for backend in self.backends}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(4, 2 * len(self.backends)),
+                                            thread_name_prefix='llm-router')
+
+    def ranked(self, streaming: bool = False) -> List[GenerationBackend]:
+        """Backends ordered best first"""
+        with self._lock:
+            candidates = [backend for backend in self.backends if backend.supports_streaming or not streaming]
+            return sorted(candidates, key=lambda backend: self.stats[backend.name].score())
+
+    def pick(self, streaming: bool = False) -> Optional[GenerationBackend]:
+        ranked = self.ranked(streaming)
+        return ranked[0] if ranked else None
+
+    def acquire(self, streaming: bool = False, exclude: Tuple[str, ...] = ()) -> GenerationBackend:
+        """
+        Wait in the request queue for a slot on the best available backend.
+        The caller must release() the backend when its call is done.
+        """
+        context = current_request_context()
+        name = self.queue.acquire(
+            lambda: [backend.name for backend in self.ranked(streaming) if backend.name not in exclude],
+            context['priority'], context['tenant'], context['deadline'], context
+        )
+        return next(backend for backend in self.backends if backend.name == name)
+
+    def release(self, backend: GenerationBackend):
+        self.queue.release(backend.name, current_request_context()['tenant'])
+
+    def record(self, backend: GenerationBackend, latency: Optional[float], error: bool):
+        """Feed an externally made call (e.g. a stream) into the backend stats"""
+        with self._lock:
+            self.stats[backend.name].record(latency, error)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: {
+                    'latency': stats.latency,
+                    'error_rate': round(stats.error_rate, 4),
+                    'in_flight': stats.in_flight,
+                    'p95': stats.percentile(0.95)
+                }
+                for name, stats in self.stats.items()
+            }
+
+    def queue_snapshot(self) -> Dict[str, Any]:
+        return self.queue.snapshot()
+
+    def _call(self, backend: GenerationBackend, prompt, options, format, timeout, prefix,
+              submitted: float, labels: Dict[str, Any], tenant: Optional[str], hedged: bool = False) -> Dict[str, Any]:
+        try:
+            return self._call_backend(backend, prompt, options, format, timeout, prefix, submitted, labels, hedged)
+        finally:
+            self.queue.release(backend.name, tenant)
+
+    def _call_backend(self, backend: GenerationBackend, prompt, options, format, timeout, prefix,
+                      submitted: float, labels: Dict[str, Any], hedged: bool) -> Dict[str, Any]:
+        stats = self.stats[backend.name]
+        with self._lock:
+            stats.in_flight += 1
+        started = time.monotonic()
+        record = dict(backend=backend.name, model=getattr(backend, 'model', None),
+                      queue_seconds=started - submitted, hedged=hedged, **labels)
+        try:
+            data = backend.generate(prompt, options=options, format=format, timeout=timeout, prefix=prefix)
+        except Exception:
+            with self._lock:
+                stats.in_flight -= 1
+                stats.record(None, True)
+            metrics.record_call(error=True, total_seconds=time.monotonic() - started, **record)
+            raise
+        latency = time.monotonic() - started
+        with self._lock:
+            stats.in_flight -= 1
+            stats.record(latency, False)
+        metrics.record_call(response=data, total_seconds=latency, **record)
+        return {**data, 'backend': backend.name}
+
+    def _hedge_delay(self, backend: GenerationBackend) -> float:
+        with self._lock:
+            deadline = self.stats[backend.name].percentile(self.hedge_percentile)
+        return max(deadline or 0.0, self.min_hedge_delay)
+
+    def generate(self, prompt: str, options: Optional[Dict[str, Any]] = None,
+                 format: Optional[Any] = None, timeout: float = 60,
+                 labels: Optional[Dict[str, Any]] = None, prefix: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Generate on the best backend. Returns the backend's response body with
+        a 'backend' key naming who answered; raises the last error if every
+        backend failed. `labels` (operation, batch_size, attempt) are passed
+        through to the call metrics; `prefix` is the shared instruction block
+        placed before `prompt`.
+        """
+        labels = {**labels} if labels else {}
+        labels.setdefault('priority', current_request_context()['priority'])
+        tenant = current_request_context()['tenant']
+        tried = set()
+        last_error = None
+
+        while len(tried) < len(self.backends):
+            submitted = time.monotonic()
+            primary = self.acquire(exclude=tuple(tried))
+            tried.add(primary.name)
+            futures = {self._executor.submit(self._call, primary, prompt, options, format, timeout, prefix,
+                                             submitted, labels, tenant): primary}
+
+            if self.hedge and len(tried) < len(self.backends):
+                done, _ = wait(futures, timeout=self._hedge_delay(primary))
+                # Hedges only use idle capacity, never a slot another request is waiting for
+                secondary = next((backend for backend in self.ranked()
+                                  if backend.name not in tried and self.queue.try_acquire(backend.name, tenant)),
+                                 None) if not done else None
+                if secondary is not None:
+                    tried.add(secondary.name)
+                    logger.info(f"Hedging slow request on {primary.name} with {secondary.name}")
+                    futures[self._executor.submit(self._call, secondary, prompt, options, format, timeout, prefix,
+                                                  time.monotonic(), labels, tenant, hedged=True)] = secondary
+
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        return future.result()
+                    except Exception as e:
+                        last_error = e
+                        logger.warning(f"Backend {futures[future].name} failed: {e}")
+
+        raise last_error
@@ -0,0 +1,52 @@
+from data_dictionary.description_index import DescriptionIndex, HashingEmbedder, INDEX_CONFIG, description_entry
+
+
+def stored_row(table_name, column_name, purpose=None):
+    # Shape of a column_descriptions row as load_stored_descriptions_into_index reads it
+    return {
+        'table_name': table_name,
+        'column_name': column_name,
+        'business_purpose': purpose or f"Date the {table_name} record was created, stored in {table_name}.{column_name}.",
+        'data_quality_rules': 'Must not be in the future.',
+        'example_usage': 'Filter recent records.',
+        'issues': 'Time zone is not recorded.'
+    }
+
+
+def test_stored_description_is_reused_for_a_column_with_type_and_samples(tmp_path):
+    index = DescriptionIndex(HashingEmbedder(), index_dir=str(tmp_path))
+    index.add([description_entry(stored_row('orders', 'created_at'), 'datetime')])
+
+    column = ('invoices', {'COLUMN_NAME': 'CreatedAt', 'DATA_TYPE': 'datetime'},
+              ['2024-01-02 10:00:00', '2024-02-03 11:30:00'])
+    reused = index.find_reusable([column], INDEX_CONFIG['reuse_threshold'])
+
+    assert 'invoices.CreatedAt' in reused
+    # The qualified reference is rewritten, the prose mention of the source table is not
+    assert reused['invoices.CreatedAt']['business_purpose'] == \
+        'Date the orders record was created, stored in invoices.CreatedAt.'
+
+
+def test_generated_description_is_not_reused_across_type_families(tmp_path):
+    index = DescriptionIndex(HashingEmbedder(), index_dir=str(tmp_path))
+    index.add([description_entry(stored_row('orders', 'status'), 'varchar', ['OPEN', 'CLOSED'])])
+
+    column = ('invoices', {'COLUMN_NAME': 'status', 'DATA_TYPE': 'int'}, [1, 2, 3])
+    assert index.find_reusable([column], INDEX_CONFIG['reuse_threshold']) == {}
+
+
+def test_stored_description_is_not_reused_for_a_same_named_column_of_another_type(tmp_path):
+    index = DescriptionIndex(HashingEmbedder(), index_dir=str(tmp_path))
+    purpose = 'Order fulfilment state of the orders row (OPEN/SHIPPED).'
+    index.add([description_entry(stored_row('orders', 'status', purpose), 'varchar')])
+
+    column = ('employees', {'COLUMN_NAME': 'status', 'DATA_TYPE': 'int'}, [1, 2, 3])
+    assert index.find_reusable([column], INDEX_CONFIG['reuse_threshold']) == {}
+
+
+def test_stored_description_without_a_type_is_not_reused(tmp_path):
+    index = DescriptionIndex(HashingEmbedder(), index_dir=str(tmp_path))
+    index.add([description_entry(stored_row('orders', 'created_at'))])
+
+    column = ('invoices', {'COLUMN_NAME': 'created_at', 'DATA_TYPE': 'datetime'}, ['2024-01-02 10:00:00'])
+    assert index.find_reusable([column], INDEX_CONFIG['reuse_threshold']) == {}
@@ -0,0 +1,105 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+from data_dictionary.write_behind import WriteBehindQueue, WRITE_BEHIND_CONFIG
+
+
+def started_queue(spill_dir, writer):
+    queue = WriteBehindQueue(str(spill_dir))
+    queue.register('rows', writer, key=lambda item: item['id'])
+    queue.start()
+    return queue
+
+
+def test_failing_item_is_isolated_and_dead_lettered(tmp_path, monkeypatch):
+    monkeypatch.setitem(WRITE_BEHIND_CONFIG, 'flush_interval', 60)
+    monkeypatch.setitem(WRITE_BEHIND_CONFIG, 'max_attempts', 2)
+    written = []
+
+    def writer(items):
+        if any(item.get('bad') for item in items):
+            raise RuntimeError('constraint violation')
+        written.extend(item['id'] for item in items)
+
+    queue = started_queue(tmp_path, writer)
+    queue.enqueue('rows', [{'id': i, 'bad': i == 3} for i in range(6)])
+
+    assert not queue.flush()
+    assert sorted(written) == [0, 1, 2, 4, 5]
+    assert queue.pending('rows') == [{'id': 3, 'bad': True}]
+
+    assert not queue.flush()
+    assert queue.pending('rows') == []
+    with open(tmp_path / WRITE_BEHIND_CONFIG['dead_letter_file']) as f:
+        dead = [json.loads(line) for line in f]
+    assert [(record['item']['id'], record['attempts']) for record in dead] == [(3, 2)]
+    # Nothing is left to replay
+    assert os.listdir(queue.spill_dir) == ['owner.lock']
+    queue.stop()
+
+
+def test_enqueue_refuses_invalid_items(tmp_path, monkeypatch):
+    monkeypatch.setitem(WRITE_BEHIND_CONFIG, 'flush_interval', 60)
+    queue = started_queue(tmp_path, lambda items: None)
+
+    with pytest.raises(ValueError):
+        queue.enqueue('rows', [{'id': 1}, {'no_id': 2}])
+    with pytest.raises(ValueError):
+        queue.enqueue('unregistered', [{'id': 1}])
+    assert queue.pending('rows') == []
+    queue.stop()
+
+
+def test_enqueue_refuses_mappings_of_an_unknown_type(tmp_path, monkeypatch):
+    monkeypatch.setitem(WRITE_BEHIND_CONFIG, 'flush_interval', 60)
+    # Load the module on its own; the harmonizer package imports the whole blueprint
+    path = os.path.join(os.path.dirname(__file__), '..', 'harmonizer', 'database.py')
+    spec = importlib.util.spec_from_file_location('harmonizer_database', path)
+    database = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(database)
+
+    queue = WriteBehindQueue(str(tmp_path))
+    queue.register('column_mappings', lambda items: None, key=database.mapping_key,
+                   validate=database.validate_mapping)
+    queue.start()
+    mapping = {'source_table': 'orders', 'source_column': 'status',
+               'target_table': 'sales', 'target_column': 'state'}
+
+    queue.enqueue('column_mappings', [{**mapping, 'mapping_type': 'fuzzy'}])
+    with pytest.raises(ValueError):
+        queue.enqueue('column_mappings', [{**mapping, 'mapping_type': 'guessed'}])
+    assert [item['mapping_type'] for item in queue.pending('column_mappings')] == ['fuzzy']
+    queue.stop()
+
+
+def test_spill_of_an_exited_process_is_replayed_once(tmp_path, monkeypatch):
+    monkeypatch.setitem(WRITE_BEHIND_CONFIG, 'flush_interval', 60)
+
+    def failing(items):
+        raise RuntimeError('database down')
+
+    crashed = started_queue(tmp_path, failing)
+    crashed.enqueue('rows', [{'id': 1}])
+    # Stop its flush thread without the final flush or cleanup of stop()
+    crashed._stop.set()
+    with crashed._cond:
+        crashed._cond.notify_all()
+    crashed._thread.join()
+
+    # Its owner lock is still held, so another process leaves the spill alone
+    written = []
+    running = WriteBehindQueue(str(tmp_path))
+    running.register('rows', lambda items: written.extend(item['id'] for item in items))
+    running.start()
+    assert running.snapshot()['replayed'] == 0
+    running.stop()
+
+    crashed._owner_lock.close()
+    adopter = started_queue(tmp_path, lambda items: written.extend(item['id'] for item in items))
+    assert adopter.flush()
+    assert written == [1]
+    assert not os.path.exists(crashed.spill_dir)
+    adopter.stop()